@@ -2,7 +2,7 @@
 AI每日灵感卡片 - 服务端应用
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 try:
@@ -17,22 +17,58 @@ except ImportError:
         return func
 
 from app.config import settings
-from app.database import engine
-from app.models.user import Base
+from app.database import check_schema_version, close_db, engine, read_engine
+from app import models  # noqa: F401  注册所有模型到Base.metadata
+from app.utils.http_client import upstream_clients
+from app.utils.content_pool import content_pool
+from app.utils.dedup import content_dedup
+from app.utils.admission import ai_admission
+from app.utils.telemetry import ai_telemetry
+from app.utils.likes import like_buffer
+from app.utils.user_stats import user_stats
+from app.utils.resilience import deadline_scope
+from app.utils.sql_metrics import route_template, sql_metrics
 
 
-def lifespan(app: FastAPI):
-    """应用生命周期管理 - 兼容旧版本Python"""
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期管理"""
     # 启动时执行
     print("🚀 AI每日灵感卡片服务启动中...")
     
-    # 创建数据库表
-    Base.metadata.create_all(bind=engine)
+    # 数据库结构由迁移管理，版本不一致时直接启动失败
+    await check_schema_version()
+    
+    # 打开上游HTTP连接池
+    await upstream_clients.open()
+    
+    # 定期写入AI用量按天汇总
+    await ai_telemetry.start()
+    
+    # 点赞增量定期批量写入（LIKE_BUFFER_ENABLED）
+    await like_buffer.start()
+    
+    # 用户统计事件定期批量写入
+    await user_stats.start()
+    
+    # 后台构建近似重复检测索引
+    await content_dedup.start()
+    
+    # 后台预热内容池
+    await content_pool.start()
     
     yield
     
     # 关闭时执行
     print("🛑 服务关闭中...")
+    await content_pool.stop()
+    await content_dedup.stop()
+    await like_buffer.stop()
+    await user_stats.stop()
+    await ai_admission.stop()
+    await ai_telemetry.stop()
+    await upstream_clients.close()
+    await close_db()
 
 
 def create_app() -> FastAPI:
@@ -47,10 +83,38 @@ def create_app() -> FastAPI:
     # 配置CORS
     app.add_middleware(
         CORSMiddleware,
-        allow_origins=settings.ALLOWED_ORIGINS,
+        allow_origins=settings.allowed_origins,
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
     )
     
+    @app.middleware("http")
+    async def request_deadline(request: Request, call_next):
+        """为每个请求设置截止时间，客户端可通过 X-Request-Timeout 请求更短的时间预算"""
+        seconds = settings.request_deadline
+        header = request.headers.get("X-Request-Timeout")
+        if header:
+            try:
+                seconds = min(seconds, float(header))
+            except ValueError:
+                pass
+        with deadline_scope(seconds if seconds > 0 else None):
+            return await call_next(request)
+    
+    # 按请求统计SQL查询次数与耗时
+    sql_metrics.install(engine, read_engine)
+    
+    @app.middleware("http")
+    async def sql_instrumentation(request: Request, call_next):
+        """统计本次请求的SQL查询，按路由模板汇总；DEBUG模式下返回 Server-Timing 头"""
+        token = sql_metrics.begin_request()
+        try:
+            response = await call_next(request)
+        finally:
+            stats = sql_metrics.end_request(token, route_template(request))
+        if settings.debug:
+            response.headers["Server-Timing"] = stats.server_timing()
+        return response
+    
     return app
\ No newline at end of file
@@ -15,20 +15,86 @@ class Settings:
         self.secret_key = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
         self.host = os.getenv("HOST", "0.0.0.0")
         self.port = int(os.getenv("PORT", "8000"))
+        self.allowed_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
         
         # 数据库配置
         self.database_url = os.getenv("DATABASE_URL", "sqlite:///./daily_inspiration.db")
         
+        # SQLite生产配置（WAL、读写连接分离、写锁重试）
+        self.sqlite_tuning = os.getenv("SQLITE_TUNING", "True").lower() == "true"
+        self.sqlite_busy_timeout_ms = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+        self.sqlite_cache_size_kb = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+        self.sqlite_mmap_size = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+        self.sqlite_read_pool_size = int(os.getenv("SQLITE_READ_POOL_SIZE", "8"))
+        self.sqlite_read_max_overflow = int(os.getenv("SQLITE_READ_MAX_OVERFLOW", "8"))
+        self.sqlite_write_retries = int(os.getenv("SQLITE_WRITE_RETRIES", "5"))
+        self.sqlite_write_retry_backoff = float(os.getenv("SQLITE_WRITE_RETRY_BACKOFF", "0.05"))
+        
+        # SQL语句日志与请求级查询统计（慢查询阈值单位：毫秒；DEBUG时响应带 Server-Timing 头）
+        self.sql_echo = os.getenv("SQL_ECHO", "False").lower() == "true"
+        self.sql_slow_query_ms = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+        
         # Redis配置
         self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
         
+        # Celery配置（生产使用Redis；测试可设置 CELERY_BROKER_URL=memory:// 与 CELERY_TASK_ALWAYS_EAGER=True）
+        self.celery_enabled = os.getenv("CELERY_ENABLED", "False").lower() == "true"  # 内容池补充等后台任务交给Celery执行
+        self.celery_broker_url = os.getenv("CELERY_BROKER_URL", self.redis_url)
+        self.celery_result_backend = os.getenv("CELERY_RESULT_BACKEND", self.redis_url)
+        self.celery_task_always_eager = os.getenv("CELERY_TASK_ALWAYS_EAGER", "False").lower() == "true"
+        self.push_batch_size = int(os.getenv("PUSH_BATCH_SIZE", "100"))
+        self.timezone = os.getenv("TIMEZONE", "Asia/Shanghai")  # 定时任务与推送时间使用的时区
+        
         # 微信小程序配置
         self.wechat_app_id = os.getenv("WECHAT_APP_ID", "")
         self.wechat_app_secret = os.getenv("WECHAT_APP_SECRET", "")
+        self.wechat_push_template_id = os.getenv("WECHAT_PUSH_TEMPLATE_ID", "")  # 每日卡片订阅消息模板
         
         # 通义千问API配置
         self.dashscope_api_key = os.getenv("DASHSCOPE_API_KEY", "")
         self.qwen_base_url = os.getenv("QWEN_BASE_URL", "https://dashscope.aliyuncs.com/api/v1")
+        self.ai_batch_mode = os.getenv("AI_BATCH_MODE", "delimited")  # delimited, choices
+        self.ai_batch_size = int(os.getenv("AI_BATCH_SIZE", "8"))
+        
+        # AI调用弹性策略（熔断、自适应超时、对冲请求，时间单位：秒）
+        self.ai_breaker_failure_threshold = int(os.getenv("AI_BREAKER_FAILURE_THRESHOLD", "5"))
+        self.ai_breaker_reset_timeout = float(os.getenv("AI_BREAKER_RESET_TIMEOUT", "30"))
+        self.ai_latency_window = int(os.getenv("AI_LATENCY_WINDOW", "200"))
+        self.ai_latency_min_samples = int(os.getenv("AI_LATENCY_MIN_SAMPLES", "20"))
+        self.ai_timeout_percentile = float(os.getenv("AI_TIMEOUT_PERCENTILE", "99"))
+        self.ai_timeout_multiplier = float(os.getenv("AI_TIMEOUT_MULTIPLIER", "2"))
+        self.ai_timeout_min = float(os.getenv("AI_TIMEOUT_MIN", "2"))
+        self.ai_hedge_enabled = os.getenv("AI_HEDGE_ENABLED", "False").lower() == "true"
+        self.ai_hedge_percentile = float(os.getenv("AI_HEDGE_PERCENTILE", "95"))
+        self.request_deadline = float(os.getenv("REQUEST_DEADLINE", "20"))
+        
+        # AI调用准入控制（令牌桶限流与优先级排队，0表示不限制）
+        self.ai_rate_limit_qps = float(os.getenv("AI_RATE_LIMIT_QPS", "5"))
+        self.ai_rate_limit_burst = float(os.getenv("AI_RATE_LIMIT_BURST", "10"))
+        self.ai_token_limit_per_minute = float(os.getenv("AI_TOKEN_LIMIT_PER_MINUTE", "100000"))
+        self.ai_admission_queue_size = int(os.getenv("AI_ADMISSION_QUEUE_SIZE", "100"))
+        
+        # AI调用遥测（按天汇总写入数据库的间隔，单位：秒）
+        self.ai_telemetry_flush_interval = float(os.getenv("AI_TELEMETRY_FLUSH_INTERVAL", "60"))
+        
+        # 生成内容近似重复检测（字符n-gram的Jaccard相似度不低于阈值视为重复，重复时重新生成）
+        self.content_dedup_enabled = os.getenv("CONTENT_DEDUP_ENABLED", "True").lower() == "true"
+        self.content_dedup_threshold = float(os.getenv("CONTENT_DEDUP_THRESHOLD", "0.5"))
+        self.content_dedup_ngram = int(os.getenv("CONTENT_DEDUP_NGRAM", "2"))
+        self.content_dedup_max_attempts = int(os.getenv("CONTENT_DEDUP_MAX_ATTEMPTS", "3"))
+        self.content_dedup_window_days = int(os.getenv("CONTENT_DEDUP_WINDOW_DAYS", "0"))  # 启动时加载最近几天的卡片，0为全部
+        
+        # 上游HTTP客户端配置（连接池与超时，单位：秒）
+        self.http_max_connections = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+        self.http_max_keepalive_connections = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+        self.http_keepalive_expiry = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+        self.http2_enabled = os.getenv("HTTP2_ENABLED", "True").lower() == "true"
+        self.http_connect_timeout = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+        self.http_default_timeout = float(os.getenv("HTTP_DEFAULT_TIMEOUT", "10"))
+        self.upstream_timeouts = {
+            "dashscope": float(os.getenv("DASHSCOPE_TIMEOUT", "30")),
+            "wechat": float(os.getenv("WECHAT_TIMEOUT", "10")),
+        }
         
         # JWT配置
         self.algorithm = os.getenv("JWT_ALGORITHM", "HS256")
@@ -39,6 +105,22 @@ class Settings:
         self.max_content_length = 500
         self.default_content_type = "inspirational"
         
+        # 内容池配置（预生成内容，/generate 直接取用）
+        self.content_pool_enabled = os.getenv("CONTENT_POOL_ENABLED", "True").lower() == "true"
+        self.content_pool_size = int(os.getenv("CONTENT_POOL_SIZE", "20"))
+        self.content_pool_low_water = int(os.getenv("CONTENT_POOL_LOW_WATER", "5"))
+        self.content_pool_refill_concurrency = int(os.getenv("CONTENT_POOL_REFILL_CONCURRENCY", "2"))
+        
+        # 点赞写缓冲（按卡片在内存中合并点赞增量，定期批量写入；时间单位：秒）
+        self.like_buffer_enabled = os.getenv("LIKE_BUFFER_ENABLED", "False").lower() == "true"
+        self.like_buffer_flush_interval = float(os.getenv("LIKE_BUFFER_FLUSH_INTERVAL", "0.3"))
+        
+        # 每日卡片进程内缓存（按日期与类型缓存，次日零点过期）
+        self.daily_card_cache_enabled = os.getenv("DAILY_CARD_CACHE_ENABLED", "True").lower() == "true"
+        
+        # 用户统计计数（浏览/点赞/收藏事件按用户合并后定期批量写入；时间单位：秒）
+        self.user_stats_flush_interval = float(os.getenv("USER_STATS_FLUSH_INTERVAL", "1.0"))
+        
         # 定时任务配置
         self.daily_card_time = os.getenv("DAILY_CARD_TIME", "08:00")
         self.daily_card_hour = 8
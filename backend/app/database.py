@@ -2,37 +2,207 @@
 数据库配置
 """
 
-from sqlalchemy import create_engine
+import os
+import asyncio
+
+from sqlalchemy import Delete, Insert, Update, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from app.config import settings
 
-# 创建数据库引擎
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-    echo=settings.debug,
-    connect_args={"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
+
+# 迁移脚本位于backend/migrations，配置文件为backend/alembic.ini
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class SchemaVersionError(RuntimeError):
+    """数据库结构版本与代码中的迁移版本不一致"""
+
+
+def get_async_database_url(url: str) -> str:
+    """将同步驱动的数据库URL转换为对应的异步驱动"""
+    async_drivers = {
+        "sqlite://": "sqlite+aiosqlite://",
+        "postgresql://": "postgresql+asyncpg://",
+        "mysql://": "mysql+aiomysql://",
+    }
+    for prefix, async_prefix in async_drivers.items():
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
+
+DATABASE_URL = get_async_database_url(settings.database_url)
+
+# 文件型SQLite启用生产配置：WAL、读写连接分离、写事务串行化
+SQLITE_TUNED = (
+    settings.sqlite_tuning
+    and DATABASE_URL.startswith("sqlite")
+    and ":memory:" not in DATABASE_URL
+    and "mode=memory" not in DATABASE_URL
 )
 
-# 创建会话工厂
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if SQLITE_TUNED:
+    # 写引擎只有一个连接：进程内的写事务排队执行，不会相互争抢SQLite写锁
+    engine = create_async_engine(
+        DATABASE_URL,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=60,
+        echo=settings.sql_echo,
+    )
+    # 读引擎为连接池，WAL模式下读不会被写阻塞；
+    # 保留溢出连接，突发的并发读（如当天首批 /daily 请求）超过常驻连接数时不必排队等待
+    read_engine = create_async_engine(
+        DATABASE_URL,
+        pool_size=settings.sqlite_read_pool_size,
+        max_overflow=settings.sqlite_read_max_overflow,
+        echo=settings.sql_echo,
+    )
+else:
+    # 创建异步数据库引擎
+    engine = create_async_engine(
+        DATABASE_URL,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        echo=settings.sql_echo,
+    )
+    read_engine = engine
+
+
+def _is_locked_error(error: Exception) -> bool:
+    return "database is locked" in str(error) or "database is busy" in str(error)
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """每个新连接设置PRAGMA（journal_mode=WAL写入数据库文件，其余为连接级设置）"""
+    # 由SQLAlchemy发出BEGIN，写连接据此使用 BEGIN IMMEDIATE
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+    cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_size_kb}")
+    cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _begin_immediate(conn):
+    """
+    写事务以 BEGIN IMMEDIATE 开始，在事务开头获取写锁：
+    等待由busy_timeout处理，仍被其他进程占用时退避重试；
+    避免读事务中途升级为写事务时立即报 database is locked
+    """
+    for attempt in range(settings.sqlite_write_retries + 1):
+        try:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            return
+        except OperationalError as e:
+            if not _is_locked_error(e) or attempt == settings.sqlite_write_retries:
+                raise
+            print(f"⚠️ SQLite写锁被占用，第{attempt + 1}次重试")
+            await_only(asyncio.sleep(settings.sqlite_write_retry_backoff * 2 ** attempt))
+
+
+def _begin_deferred(conn):
+    conn.exec_driver_sql("BEGIN")
+
+
+if SQLITE_TUNED:
+    event.listen(engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    event.listen(engine.sync_engine, "begin", _begin_immediate)
+    event.listen(read_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    event.listen(read_engine.sync_engine, "begin", _begin_deferred)
+
+
+class RoutingSession(Session):
+    """
+    读写分离的会话：INSERT/UPDATE/DELETE与flush使用写引擎，
+    同一事务中发生写之后的读也走写连接（读到自己未提交的修改），其余读使用读引擎
+    """
+    
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.info.get("writing") or self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            self.info["writing"] = True
+            return engine.sync_engine
+        return read_engine.sync_engine
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_writing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("writing", None)
+
+
+# 创建异步会话工厂（提交后不过期，避免在响应序列化时触发隐式IO）
+AsyncSessionLocal = async_sessionmaker(
+    engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession if SQLITE_TUNED else Session,
+    autoflush=False,
+    expire_on_commit=False,
+)
 
 # 创建基类
 Base = declarative_base()
 
 
-def get_db():
+async def get_db():
     """获取数据库会话"""
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def init_db():
-    """初始化数据库"""
-    Base.metadata.create_all(bind=engine)
-    print("✅ 数据库表创建完成")
\ No newline at end of file
+async def close_db():
+    """关闭读写连接池"""
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+
+def get_alembic_config():
+    """加载迁移配置（脚本目录使用绝对路径，不依赖当前工作目录）"""
+    from alembic.config import Config
+    
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.attributes["configure_logger"] = False
+    return config
+
+
+async def init_db():
+    """初始化数据库：执行迁移升级到最新版本"""
+    from alembic import command
+    
+    config = get_alembic_config()
+    
+    def upgrade(connection):
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+    
+    async with engine.begin() as conn:
+        await conn.run_sync(upgrade)
+    print("✅ 数据库已升级到最新版本")
+
+
+async def check_schema_version():
+    """校验数据库迁移版本与代码一致，不一致时拒绝启动"""
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+    
+    expected = set(ScriptDirectory.from_config(get_alembic_config()).get_heads())
+    async with engine.connect() as conn:
+        current = set(await conn.run_sync(
+            lambda sync_conn: MigrationContext.configure(sync_conn).get_current_heads()
+        ))
+    
+    if current != expected:
+        raise SchemaVersionError(
+            f"数据库结构版本 {sorted(current) or '未初始化'} 与代码 {sorted(expected)} 不一致，"
+            "请先执行 alembic upgrade head"
+        )
+    print(f"✅ 数据库结构版本校验通过: {', '.join(sorted(current))}")
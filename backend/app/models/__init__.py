@@ -5,5 +5,8 @@
 from .user import User
 from .card import Card
 from .favorite import Favorite
+from .content_pool import PooledContent
+from .ai_usage import AIUsageDaily
+from .interaction import UserCardInteraction
 
-__all__ = ["User", "Card", "Favorite"]
\ No newline at end of file
+__all__ = ["User", "Card", "Favorite", "PooledContent", "AIUsageDaily", "UserCardInteraction"]
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""
+AI调用用量模型
+"""
+
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class AIUsageDaily(Base):
+    """按天、内容类型汇总的AI调用量与token开销，用于成本跟踪"""
+    __tablename__ = "ai_usage_daily"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    date = Column(Date, nullable=False)
+    type = Column(String(20), nullable=False)  # inspirational, poetry, philosophy
+    calls = Column(Integer, default=0, nullable=False)  # 上游调用次数
+    errors = Column(Integer, default=0, nullable=False)  # 失败（含超时、熔断、限流拒绝）次数
+    generations = Column(Integer, default=0, nullable=False)  # 对外产出的内容条数
+    fallbacks = Column(Integer, default=0, nullable=False)  # 其中使用备用内容的条数
+    prompt_tokens = Column(Integer, default=0, nullable=False)
+    completion_tokens = Column(Integer, default=0, nullable=False)
+    latency_ms_total = Column(Float, default=0, nullable=False)  # 成功调用的累计耗时
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("date", "type", name="uq_ai_usage_daily_date_type"),
+    )
+    
+    def to_dict(self):
+        return {
+            "date": self.date.isoformat() if self.date else None,
+            "type": self.type,
+            "calls": self.calls,
+            "errors": self.errors,
+            "generations": self.generations,
+            "fallbacks": self.fallbacks,
+            "fallback_rate": round(self.fallbacks / self.generations, 4) if self.generations else 0.0,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "avg_latency_ms": round(self.latency_ms_total / (self.calls - self.errors), 1)
+            if self.calls > self.errors else None
+        }
@@ -2,11 +2,34 @@
 卡片模型
 """
 
-from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Boolean, ForeignKey
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Boolean, ForeignKey, Index
+from sqlalchemy.sql import false, func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
+# 卡片响应字段：列表接口可按这些列直接投影查询，用card_response序列化结果行，与to_dict输出一致
+CARD_RESPONSE_FIELDS = (
+    "id", "content", "type", "background_style", "generate_date",
+    "likes", "is_generated", "is_daily", "created_at"
+)
+
+
+def card_response(source) -> dict:
+    """将Card实例或包含卡片响应字段的查询结果行序列化为响应字典"""
+    generate_date = source.generate_date
+    created_at = source.created_at
+    return {
+        "id": source.id,
+        "content": source.content,
+        "type": source.type,
+        "background_style": source.background_style,
+        "generate_date": generate_date.isoformat() if generate_date else None,
+        "likes": source.likes,
+        "is_generated": source.is_generated,
+        "is_daily": source.is_daily,
+        "created_at": created_at.isoformat() if created_at else None
+    }
+
 
 class Card(Base):
     __tablename__ = "cards"
@@ -18,19 +41,26 @@ class Card(Base):
     generate_date = Column(Date, nullable=False)
     likes = Column(Integer, default=0)
     is_generated = Column(Boolean, default=True)
+    is_daily = Column(Boolean, default=False, server_default=false(), nullable=False)  # 是否为当日卡片（每天每种类型唯一）
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    __table_args__ = (
+        # 同一天同一类型只允许存在一张每日卡片，防止并发生成时重复插入
+        Index(
+            "uq_cards_daily_date_type",
+            "generate_date",
+            "type",
+            unique=True,
+            sqlite_where=is_daily.is_(True),
+            postgresql_where=is_daily.is_(True)
+        ),
+        # 按日期查当日卡片；按（类型）日期倒序的游标分页
+        Index("ix_cards_generate_date_id", "generate_date", "id"),
+        Index("ix_cards_type_generate_date_id", "type", "generate_date", "id"),
+    )
+    
     # 关系
     favorites = relationship("Favorite", back_populates="card")
     
     def to_dict(self):
-        return {
-            "id": self.id,
-            "content": self.content,
-            "type": self.type,
-            "background_style": self.background_style,
-            "generate_date": self.generate_date.isoformat() if self.generate_date else None,
-            "likes": self.likes,
-            "is_generated": self.is_generated,
-            "created_at": self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
+        return card_response(self)
\ No newline at end of file
@@ -0,0 +1,22 @@
+"""
+内容池模型
+"""
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class PooledContent(Base):
+    """预生成、待取用的卡片内容"""
+    __tablename__ = "content_pool"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    type = Column(String(20), nullable=False)  # inspirational, poetry, philosophy
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # 按类型先进先出取用
+        Index("ix_content_pool_type_id", "type", "id"),
+    )
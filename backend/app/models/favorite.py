@@ -2,7 +2,8 @@
 收藏模型
 """
 
-from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index, inspect
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -14,7 +15,18 @@ class Favorite(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     card_id = Column(Integer, ForeignKey("cards.id"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # SQLite默认值精确到秒，比较参数也按秒格式化，游标分页才能与存储值精确比较
+    created_at = Column(
+        DateTime(timezone=True).with_variant(sqlite.DATETIME(truncate_microseconds=True), "sqlite"),
+        server_default=func.now()
+    )
+    
+    __table_args__ = (
+        # 同一用户对同一卡片只能收藏一次，同时用于查询收藏状态
+        Index("uq_favorites_user_card", "user_id", "card_id", unique=True),
+        # 按收藏时间倒序的收藏列表（游标分页）
+        Index("ix_favorites_user_created_at_id", "user_id", "created_at", "id"),
+    )
     
     # 关系
     user = relationship("User", back_populates="favorites")
@@ -26,5 +38,6 @@ class Favorite(Base):
             "user_id": self.user_id,
             "card_id": self.card_id,
             "created_at": self.created_at.isoformat() if self.created_at else None,
-            "card": self.card.to_dict() if self.card else None
+            # 只序列化已加载的卡片，不在此处触发懒加载查询
+            "card": self.card.to_dict() if "card" not in inspect(self).unloaded and self.card else None
         }
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""
+用户与卡片交互模型
+"""
+
+from sqlalchemy import Column, Integer, Boolean, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class UserCardInteraction(Base):
+    """用户对卡片的浏览与点赞状态，每个用户每张卡片一行"""
+    __tablename__ = "user_card_interactions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    card_id = Column(Integer, ForeignKey("cards.id"), nullable=False)
+    viewed = Column(Boolean, default=False, nullable=False)
+    liked = Column(Boolean, default=False, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        # 同一用户对同一卡片只有一条记录，点赞/取消点赞据此保持幂等，同时用于批量查询点赞状态
+        Index("uq_user_card_interactions_user_card", "user_id", "card_id", unique=True),
+    )
+    
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "card_id": self.card_id,
+            "viewed": self.viewed,
+            "liked": self.liked,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -2,7 +2,7 @@
 用户模型
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, Date, DateTime, Text, Boolean
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -23,6 +23,7 @@ class User(Base):
     favorite_count = Column(Integer, default=0)
     consecutive_days = Column(Integer, default=0)
     total_likes = Column(Integer, default=0)
+    last_active_date = Column(Date, nullable=True)  # 最近一次浏览卡片的日期，用于计算连续天数
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -2,18 +2,32 @@
 卡片相关路由
 """
 
+import json
+
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, Field
 from datetime import date, datetime
-from typing import Optional, List
+from typing import Optional, List, Set
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, AsyncSessionLocal
 from app.models.card import Card
 from app.models.favorite import Favorite
 from app.models.user import User
-from app.utils.ai_generator import generate_card_content
+from app.utils.ai_generator import ai_generator, generate_card_content
 from app.utils.auth import get_current_user
+from app.utils.daily_card import daily_card_cache, get_daily_card_dict, get_or_create_daily_card
+from app.utils.content_pool import content_pool
+from app.utils.dedup import content_dedup
+from app.utils.telemetry import ai_telemetry
+from app.utils.pagination import paginate
+from app.utils.favorites import favorite_cards_page
+from app.utils.likes import apply_like_delta, like_buffer, liked_card_ids, set_liked
+from app.utils.user_stats import user_stats
 
 router = APIRouter()
 
@@ -33,40 +47,38 @@ class GenerateRequest(BaseModel):
     type: str = "inspirational"  # inspirational, poetry, philosophy
 
 
+class BatchGenerateRequest(BaseModel):
+    type: str = "inspirational"  # inspirational, poetry, philosophy
+    count: int = Field(5, ge=1, le=20)
+
+
 class LikeRequest(BaseModel):
     action: str  # like, unlike
 
 
 @router.get("/daily")
 async def get_daily_card(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """获取今日卡片"""
+    """获取今日卡片（卡片内容来自进程内缓存，只查询用户的收藏与点赞状态）"""
     today = date.today()
-    card = db.query(Card).filter(Card.generate_date == today).first()
+    preference = current_user.type_preference if current_user.type_preference != "all" else None
+    card_dict = await get_daily_card_dict(db, today, preference)
     
-    if not card:
-        # 根据用户偏好生成卡片
-        card_type = current_user.type_preference if current_user.type_preference != "all" else "inspirational"
-        content = await generate_card_content(card_type)
-        card = Card(
-            content=content,
-            type=card_type,
-            generate_date=today
-        )
-        db.add(card)
-        db.commit()
-        db.refresh(card)
-    
-    # 检查是否已收藏
-    is_favorited = db.query(Favorite).filter(
-        Favorite.user_id == current_user.id,
-        Favorite.card_id == card.id
-    ).first() is not None
+    if card_dict is None:
+        # 等待生成期间不占用连接：结束当前读事务，连接归还连接池
+        await db.commit()
+        # 根据用户偏好生成卡片（并发的首次请求只会触发一次生成）
+        card_type = preference or "inspirational"
+        card = await get_or_create_daily_card(card_type, today)
+        card_dict = card.to_dict()
     
-    card_dict = card.to_dict()
-    card_dict["is_favorited"] = is_favorited
+    # 检查是否已收藏、已点赞
+    card_id = card_dict["id"]
+    card_dict["is_favorited"] = await check_if_favorited(db, current_user.id, card_id)
+    card_dict["is_liked"] = bool(await liked_card_ids(db, current_user.id, [card_id]))
+    user_stats.record_view(current_user.id, card_id, today)
     
     return {
         "success": True,
@@ -75,39 +87,17 @@ async def get_daily_card(
     }
 
 
-@router.get("/{card_id}")
-async def get_card_detail(
-    card_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """获取卡片详情"""
-    card = db.query(Card).filter(Card.id == card_id).first()
-    
-    if not card:
-        raise HTTPException(status_code=404, detail="卡片不存在")
-    
-    # 检查是否已收藏
-    is_favorited = db.query(Favorite).filter(
-        Favorite.user_id == current_user.id,
-        Favorite.card_id == card.id
-    ).first() is not None
-    
-    card_dict = card.to_dict()
-    card_dict["is_favorited"] = is_favorited
-    
-    return {
-        "success": True,
-        "message": "获取卡片详情成功",
-        "data": card_dict
-    }
-
-
 @router.post("/generate")
-async def generate_card(request: GenerateRequest, db: Session = Depends(get_db)):
+async def generate_card(request: GenerateRequest, db: AsyncSession = Depends(get_db)):
     """生成新卡片"""
+    check_card_type(request.type)
     try:
-        content = await generate_card_content(request.type)
+        # 优先从预生成内容池取用，池为空时再同步调用AI
+        content = await content_pool.pop(request.type)
+        # 内容池中的内容入池时已登记到去重索引
+        generated = content is None
+        if generated:
+            content = await generate_card_content(request.type)
         
         card = Card(
             content=content,
@@ -116,8 +106,10 @@ async def generate_card(request: GenerateRequest, db: Session = Depends(get_db))
         )
         
         db.add(card)
-        db.commit()
-        db.refresh(card)
+        await db.commit()
+        await db.refresh(card)
+        if generated:
+            content_dedup.register(content)
         
         return {
             "success": True,
@@ -129,93 +121,223 @@ async def generate_card(request: GenerateRequest, db: Session = Depends(get_db))
         return {"success": False, "message": str(e), "data": None}
 
 
+def _sse_event(event: str, data) -> str:
+    """格式化一条SSE事件"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.get("/generate/stream")
+async def generate_card_stream(type: str = Query("inspirational", description="卡片类型")):
+    """流式生成新卡片（SSE）
+    
+    事件: delta 增量文本；reset 上游中断或内容与已有卡片重复，客户端应清空已显示内容；
+    done 生成完成并保存的卡片。
+    """
+    check_card_type(type)
+    
+    async def event_stream():
+        content = ""
+        for _ in range(max(1, settings.content_dedup_max_attempts)):
+            pieces = []
+            try:
+                async for text in ai_generator.stream_content(type):
+                    pieces.append(text)
+                    yield _sse_event("delta", {"text": text})
+            except Exception as e:
+                print(f"AI流式生成错误: {e}")
+                if pieces:
+                    yield _sse_event("reset", {})
+                break
+            
+            content = "".join(pieces).strip()
+            if not content or not content_dedup.is_duplicate(content):
+                break
+            # 与已有卡片近似重复，清空后重新生成
+            content = ""
+            yield _sse_event("reset", {})
+        
+        ai_telemetry.record_generation(type, fallback=not content)
+        if not content:
+            content = ai_generator.get_fallback_content(type)
+            yield _sse_event("delta", {"text": content})
+        
+        # 流式响应期间请求级会话可能已关闭，使用独立会话保存
+        async with AsyncSessionLocal() as db:
+            card = Card(content=content, type=type, generate_date=date.today())
+            db.add(card)
+            await db.commit()
+        # 保存成功后才登记到去重索引；客户端中途断开时生成器在此之前被关闭，内容不会登记
+        content_dedup.register(content)
+        
+        yield _sse_event("done", card.to_dict())
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/generate/batch")
+async def generate_cards_batch(request: BatchGenerateRequest, db: AsyncSession = Depends(get_db)):
+    """批量生成卡片（一次AI调用生成多条内容，逐条保存）"""
+    check_card_type(request.type)
+    contents = await ai_generator.generate_batch(request.type, request.count)
+    if not contents:
+        return {"success": False, "message": "AI生成失败，请稍后重试", "data": None}
+    
+    today = date.today()
+    cards = [Card(content=content, type=request.type, generate_date=today) for content in contents]
+    db.add_all(cards)
+    await db.commit()
+    for content in contents:
+        content_dedup.register(content)
+    
+    return {
+        "success": True,
+        "message": f"批量生成卡片成功，共{len(cards)}张",
+        "data": [card.to_dict() for card in cards]
+    }
+
+
+@router.get("/pool/stats")
+async def get_content_pool_stats():
+    """获取内容池状态"""
+    return {
+        "success": True,
+        "message": "获取内容池状态成功",
+        "data": content_pool.stats()
+    }
+
+
+@router.get("/dedup/stats")
+async def get_content_dedup_stats():
+    """获取近似重复检测索引状态"""
+    return {
+        "success": True,
+        "message": "获取去重索引状态成功",
+        "data": content_dedup.stats()
+    }
+
+
+@router.get("/likes/stats")
+async def get_like_buffer_stats():
+    """获取点赞写缓冲状态"""
+    return {
+        "success": True,
+        "message": "获取点赞写缓冲状态成功",
+        "data": like_buffer.stats()
+    }
+
+
+@router.get("/daily/stats")
+async def get_daily_card_cache_stats():
+    """获取每日卡片缓存状态"""
+    return {
+        "success": True,
+        "message": "获取每日卡片缓存状态成功",
+        "data": daily_card_cache.stats()
+    }
+
+
 @router.get("/history")
 async def get_history_cards(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
     type: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor，提供时忽略page"),
+    prefetch: bool = Query(False, description="同时返回下一页（prefetched字段）"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """获取历史卡片"""
-    query = db.query(Card).order_by(Card.generate_date.desc())
+    """获取历史卡片（按生成日期倒序，游标分页）"""
+    query = select(Card)
     
     if type:
-        query = query.filter(Card.type == type)
+        query = query.where(Card.type == type)
     
-    offset = (page - 1) * limit
-    cards = query.offset(offset).limit(limit).all()
+    cards, prefetched, next_cursor = await paginate(
+        db, query, [Card.generate_date, Card.id], limit, cursor, page, prefetch
+    )
     
-    result = []
-    for card in cards:
-        card_dict = card.to_dict()
-        is_favorited = db.query(Favorite).filter(
-            Favorite.user_id == current_user.id,
-            Favorite.card_id == card.id
-        ).first() is not None
-        card_dict["is_favorited"] = is_favorited
-        result.append(card_dict)
+    # 整页卡片的收藏、点赞状态各一次查询
+    card_ids = [card.id for card in cards + prefetched]
+    favorited = await favorited_card_ids(db, current_user.id, card_ids)
+    liked = await liked_card_ids(db, current_user.id, card_ids)
     
-    return {
+    def serialize(page_cards: List[Card]) -> List[dict]:
+        result = []
+        for card in page_cards:
+            card_dict = card.to_dict()
+            card_dict["is_favorited"] = card.id in favorited
+            card_dict["is_liked"] = card.id in liked
+            result.append(card_dict)
+        return result
+    
+    response = {
         "success": True,
         "message": "获取历史卡片成功",
-        "data": result
+        "data": serialize(cards),
+        "next_cursor": next_cursor
     }
+    if prefetch:
+        response["prefetched"] = serialize(prefetched)
+    return response
 
 
 @router.post("/{card_id}/favorite")
 async def favorite_card(
-    card_id: int, 
-    db: Session = Depends(get_db),
+    card_id: int,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """收藏卡片"""
     # 检查卡片是否存在
-    card = db.query(Card).filter(Card.id == card_id).first()
+    card = await db.get(Card, card_id)
     if not card:
         return {"success": False, "message": "卡片不存在", "data": None}
     
     # 检查是否已经收藏
-    existing = db.query(Favorite).filter(
-        Favorite.user_id == current_user.id,
-        Favorite.card_id == card_id
-    ).first()
-    
-    if existing:
+    if await check_if_favorited(db, current_user.id, card_id):
         return {"success": False, "message": "已经收藏过了", "data": None}
     
     favorite = Favorite(user_id=current_user.id, card_id=card_id)
     db.add(favorite)
     
-    # 更新用户收藏计数
-    current_user.favorite_count += 1
+    try:
+        await db.commit()
+    except IntegrityError:
+        # 并发的重复收藏请求被唯一索引拦截
+        await db.rollback()
+        return {"success": False, "message": "已经收藏过了", "data": None}
     
-    db.commit()
+    # 更新用户收藏计数（合并后批量写入）
+    user_stats.add(current_user.id, "favorite_count", 1)
     
     return {"success": True, "message": "收藏成功", "data": None}
 
 
 @router.delete("/{card_id}/favorite")
 async def unfavorite_card(
-    card_id: int, 
-    db: Session = Depends(get_db),
+    card_id: int,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """取消收藏"""
-    favorite = db.query(Favorite).filter(
-        Favorite.user_id == current_user.id,
-        Favorite.card_id == card_id
-    ).first()
+    result = await db.execute(
+        delete(Favorite).where(
+            Favorite.user_id == current_user.id,
+            Favorite.card_id == card_id
+        )
+    )
     
-    if not favorite:
+    if result.rowcount == 0:
         return {"success": False, "message": "未找到收藏记录", "data": None}
     
-    db.delete(favorite)
+    await db.commit()
     
-    # 更新用户收藏计数
-    current_user.favorite_count = max(0, current_user.favorite_count - 1)
-    
-    db.commit()
+    # 更新用户收藏计数（合并后批量写入）；并发的重复取消只有一个请求删除成功
+    user_stats.add(current_user.id, "favorite_count", -1)
     
     return {"success": True, "message": "取消收藏成功", "data": None}
 
@@ -224,29 +346,46 @@ async def unfavorite_card(
 async def like_card(
     card_id: int,
     request: LikeRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """点赞/取消点赞卡片"""
-    card = db.query(Card).filter(Card.id == card_id).first()
-    if not card:
-        return {"success": False, "message": "卡片不存在", "data": None}
-    
     if request.action == "like":
-        card.likes += 1
-        message = "点赞成功"
+        delta, message = 1, "点赞成功"
     elif request.action == "unlike":
-        card.likes = max(0, card.likes - 1)
-        message = "取消点赞成功"
+        delta, message = -1, "取消点赞成功"
     else:
         return {"success": False, "message": "无效的操作", "data": None}
     
-    db.commit()
+    card = await db.get(Card, card_id)
+    if not card:
+        return {"success": False, "message": "卡片不存在", "data": None}
+    
+    # 重复点赞/取消点赞不改变计数
+    changed = await set_liked(db, current_user.id, card_id, delta > 0)
+    if changed and not like_buffer.enabled:
+        likes = await apply_like_delta(db, card_id, delta)
+    else:
+        likes = card.likes or 0
+    await db.commit()
+    
+    if changed:
+        user_stats.add(current_user.id, "total_likes", delta)
+        if not like_buffer.enabled:
+            # 点赞数已写入数据库，缓存的每日卡片失效后重新读取
+            daily_card_cache.invalidate(card_id)
+    
+    if like_buffer.enabled:
+        # 增量合并后批量写入，返回的点赞数包含尚未写入的增量；写入前缓存的卡片按增量同步
+        if changed:
+            like_buffer.add(card_id, delta)
+            daily_card_cache.adjust_likes(card_id, delta)
+        likes = max(0, likes + like_buffer.pending(card_id))
     
     return {
         "success": True,
         "message": message,
-        "data": {"likes": card.likes}
+        "data": {"likes": likes, "is_liked": delta > 0}
     }
 
 
@@ -254,23 +393,79 @@ async def like_card(
 async def get_favorites(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor，提供时忽略page"),
+    prefetch: bool = Query(False, description="同时返回下一页（prefetched字段）"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """获取收藏卡片"""
-    offset = (page - 1) * limit
-    favorites = db.query(Favorite).filter(
-        Favorite.user_id == current_user.id
-    ).join(Card).order_by(Favorite.created_at.desc()).offset(offset).limit(limit).all()
-    
-    result = []
-    for favorite in favorites:
-        card_dict = favorite.card.to_dict()
-        card_dict["is_favorited"] = True
-        result.append(card_dict)
+    """获取收藏卡片（按收藏时间倒序，游标分页；卡片字段与点赞状态由一条投影查询取得）"""
+    cards, prefetched, next_cursor = await favorite_cards_page(
+        db, current_user.id, limit, cursor, page, prefetch, with_liked=True
+    )
     
-    return {
+    response = {
         "success": True,
         "message": "获取收藏卡片成功",
-        "data": result
-    }
\ No newline at end of file
+        "data": cards,
+        "next_cursor": next_cursor
+    }
+    if prefetch:
+        response["prefetched"] = prefetched
+    return response
+
+
+# 路径参数路由需放在静态路由之后，否则会拦截 /history、/favorites
+@router.get("/{card_id}")
+async def get_card_detail(
+    card_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """获取卡片详情"""
+    card = await db.get(Card, card_id)
+    
+    if not card:
+        raise HTTPException(status_code=404, detail="卡片不存在")
+    
+    # 检查是否已收藏、已点赞
+    card_dict = card.to_dict()
+    card_dict["is_favorited"] = await check_if_favorited(db, current_user.id, card.id)
+    card_dict["is_liked"] = bool(await liked_card_ids(db, current_user.id, [card.id]))
+    user_stats.record_view(current_user.id, card.id)
+    
+    return {
+        "success": True,
+        "message": "获取卡片详情成功",
+        "data": card_dict
+    }
+
+
+# 辅助函数
+def check_card_type(card_type: str):
+    """生成接口的卡片类型须为支持的内容类型，否则返回400"""
+    if card_type not in settings.content_types:
+        raise HTTPException(status_code=400, detail=f"不支持的卡片类型: {card_type}")
+
+
+async def check_if_favorited(db: AsyncSession, user_id: int, card_id: int) -> bool:
+    """检查用户是否已收藏卡片"""
+    result = await db.execute(
+        select(Favorite.id).where(
+            Favorite.user_id == user_id,
+            Favorite.card_id == card_id
+        ).limit(1)
+    )
+    return result.first() is not None
+
+
+async def favorited_card_ids(db: AsyncSession, user_id: int, card_ids: List[int]) -> Set[int]:
+    """返回card_ids中用户已收藏的卡片ID集合（单次IN查询）"""
+    if not card_ids:
+        return set()
+    result = await db.execute(
+        select(Favorite.card_id).where(
+            Favorite.user_id == user_id,
+            Favorite.card_id.in_(card_ids)
+        )
+    )
+    return set(result.scalars())
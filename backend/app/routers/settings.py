@@ -3,7 +3,7 @@
 """
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import Optional
 
@@ -30,7 +30,7 @@ class SettingsResponse(BaseModel):
 @router.get("/preferences", response_model=SettingsResponse)
 async def get_preferences(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """获取用户偏好设置"""
     return SettingsResponse(
@@ -45,7 +45,7 @@ async def get_preferences(
 async def update_preferences(
     settings: SettingsRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """更新用户偏好设置"""
     if settings.type_preference is not None:
@@ -55,8 +55,8 @@ async def update_preferences(
     if settings.push_time is not None:
         current_user.push_time = settings.push_time
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
     
     return SettingsResponse(
         type_preference=current_user.type_preference,
@@ -2,16 +2,18 @@
 用户相关路由
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import Optional
 
 from app.database import get_db
 from app.models.user import User
-from app.models.favorite import Favorite
 from app.utils.wechat import get_openid_by_code
 from app.utils.auth import create_access_token, get_current_user
+from app.utils.favorites import favorite_cards_page
+from app.utils.user_stats import current_streak, user_stats
 
 router = APIRouter()
 
@@ -45,7 +47,7 @@ class UserStats(BaseModel):
 
 
 @router.post("/login")
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
     """微信登录"""
     try:
         # 通过code获取openid
@@ -54,12 +56,13 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
             return {"success": False, "message": "无效的登录凭证", "data": None}
         
         # 查找或创建用户
-        user = db.query(User).filter(User.openid == openid).first()
+        result = await db.execute(select(User).where(User.openid == openid))
+        user = result.scalar_one_or_none()
         if not user:
             user = User(openid=openid)
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            await db.refresh(user)
         
         # 生成JWT token
         token = create_access_token(data={"user_id": str(user.id)})
@@ -92,7 +95,7 @@ async def get_profile(current_user: User = Depends(get_current_user)):
 async def update_profile(
     profile: UserProfile, 
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """更新用户信息"""
     if profile.nickname:
@@ -100,8 +103,8 @@ async def update_profile(
     if profile.avatar:
         current_user.avatar_url = profile.avatar
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
     
     return {
         "success": True,
@@ -128,7 +131,7 @@ async def get_preferences(current_user: User = Depends(get_current_user)):
 async def update_preferences(
     preferences: UserPreferences,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """更新用户偏好设置"""
     if preferences.type_preference is not None:
@@ -138,8 +141,8 @@ async def update_preferences(
     if preferences.push_time is not None:
         current_user.push_time = preferences.push_time
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
     
     return {
         "success": True,
@@ -154,31 +157,32 @@ async def update_preferences(
 
 @router.get("/favorites")
 async def get_favorites(
-    page: int = 1,
-    limit: int = 20,
+    response: Response,
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值，提供时忽略page"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """获取用户收藏列表"""
-    offset = (page - 1) * limit
+    """获取用户收藏列表（按收藏时间倒序；下一页游标在 X-Next-Cursor 响应头中）"""
+    cards, _, next_cursor = await favorite_cards_page(db, current_user.id, limit, cursor, page)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
-    favorites = db.query(Favorite).filter(
-        Favorite.user_id == current_user.id
-    ).join(User).order_by(Favorite.created_at.desc()).offset(offset).limit(limit).all()
-    
-    return [favorite.card.to_dict() for favorite in favorites]
+    return cards
 
 
 @router.get("/stats")
 async def get_user_stats(current_user: User = Depends(get_current_user)):
-    """获取用户统计数据"""
+    """获取用户统计数据（计数由事件增量维护，只读取当前用户一行并叠加尚未写入的增量）"""
+    pending = user_stats.pending(current_user.id)
     return {
         "success": True,
         "message": "获取用户统计数据成功",
         "data": {
-            "total_cards": current_user.total_cards,
-            "favorite_count": current_user.favorite_count,
-            "consecutive_days": current_user.consecutive_days,
-            "total_likes": current_user.total_likes
+            "total_cards": current_user.total_cards or 0,
+            "favorite_count": max(0, (current_user.favorite_count or 0) + pending.get("favorite_count", 0)),
+            "consecutive_days": current_streak(current_user),
+            "total_likes": max(0, (current_user.total_likes or 0) + pending.get("total_likes", 0))
         }
     }
\ No newline at end of file
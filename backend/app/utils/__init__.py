@@ -6,6 +6,7 @@ from .ai_generator import ai_generator, generate_card_content
 from .auth import get_current_user, get_current_user_optional, create_access_token
 from .wechat import wechat_client, get_openid_by_code
 from .scheduler import scheduler_manager, start_scheduler, stop_scheduler
+from .http_client import upstream_clients, get_upstream_client
 
 __all__ = [
     "ai_generator",
@@ -17,5 +18,7 @@ __all__ = [
     "get_openid_by_code",
     "scheduler_manager",
     "start_scheduler",
-    "stop_scheduler"
+    "stop_scheduler",
+    "upstream_clients",
+    "get_upstream_client"
 ]
\ No newline at end of file
@@ -0,0 +1,268 @@
+"""
+AI调用准入控制
+
+所有DashScope调用在发出前向准入控制器申请配额：
+- 令牌桶：每秒请求数（QPS）与每分钟token数两个维度限流
+- 优先级：定时/每日卡片 > 用户请求 > 内容池后台补充，配额不足时按优先级排队
+- 有界队列：每个优先级的排队长度有上限，队满直接拒绝
+- 截止时间：预计排队时间超过请求剩余时间时立即拒绝，调用方走降级内容
+"""
+
+import time
+import asyncio
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Deque, Dict, Optional
+from app.config import settings
+from app.utils.resilience import LatencyTracker, remaining_time
+
+
+class AdmissionRejectedError(Exception):
+    """配额不足且无法在截止时间前获得，拒绝调用"""
+
+
+class Priority(IntEnum):
+    """调用优先级，数值越小越优先"""
+    DAILY = 0
+    USER = 1
+    BACKGROUND = 2
+
+
+_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar("ai_priority", default=Priority.USER)
+
+
+@contextmanager
+def ai_priority(priority: Priority):
+    """在上下文中设置AI调用的优先级"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """令牌桶，rate<=0 表示不限制"""
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+    
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def wait_time(self, amount: float) -> float:
+        """获得amount个令牌还需等待的秒数"""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        return max(0.0, (amount - self.tokens) / self.rate)
+    
+    def take(self, amount: float):
+        if not self.unlimited:
+            self._refill()
+            self.tokens -= amount
+    
+    def adjust(self, amount: float):
+        """按实际用量修正（正数归还，负数追加扣除，可透支）"""
+        if not self.unlimited:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class _Waiter:
+    __slots__ = ("future", "cost", "enqueued_at")
+    
+    def __init__(self, future: asyncio.Future, cost: float):
+        self.future = future
+        self.cost = cost
+        self.enqueued_at = time.monotonic()
+
+
+class AdmissionController:
+    """按优先级排队的AI调用准入控制器"""
+    
+    def __init__(self):
+        self.request_bucket = TokenBucket(settings.ai_rate_limit_qps, settings.ai_rate_limit_burst)
+        self.token_bucket = TokenBucket(
+            settings.ai_token_limit_per_minute / 60,
+            settings.ai_token_limit_per_minute
+        )
+        self._queues: Dict[Priority, Deque[_Waiter]] = {priority: deque() for priority in Priority}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.admitted: Dict[Priority, int] = {priority: 0 for priority in Priority}
+        self.rejected: Dict[Priority, int] = {priority: 0 for priority in Priority}
+        self.queue_wait: Dict[Priority, LatencyTracker] = {
+            priority: LatencyTracker(settings.ai_latency_window) for priority in Priority
+        }
+    
+    def _clamp(self, cost: float) -> float:
+        # 单次估算超过桶容量时按容量计，避免永远无法获得配额
+        return min(cost, self.token_bucket.capacity)
+    
+    def _wait_time(self, cost: float) -> float:
+        return max(self.request_bucket.wait_time(1), self.token_bucket.wait_time(cost))
+    
+    def _take(self, cost: float):
+        self.request_bucket.take(1)
+        self.token_bucket.take(cost)
+    
+    def _waiters_ahead(self, priority: Priority):
+        for level in Priority:
+            if level > priority:
+                break
+            for waiter in self._queues[level]:
+                if not waiter.future.done():
+                    yield waiter
+    
+    def _estimate_wait(self, priority: Priority, cost: float) -> float:
+        """按排在前面的请求估算获得配额的等待时间"""
+        ahead = list(self._waiters_ahead(priority))
+        wait = 0.0
+        if not self.request_bucket.unlimited:
+            wait = max(wait, (len(ahead) + 1 - self.request_bucket.tokens) / self.request_bucket.rate)
+        if not self.token_bucket.unlimited:
+            needed = sum(waiter.cost for waiter in ahead) + cost
+            wait = max(wait, (needed - self.token_bucket.tokens) / self.token_bucket.rate)
+        return wait
+    
+    def _reject(self, priority: Priority, reason: str):
+        self.rejected[priority] += 1
+        raise AdmissionRejectedError(reason)
+    
+    async def acquire(self, cost: float):
+        """申请一次调用的配额（cost为预估token数），无法获得时抛出AdmissionRejectedError"""
+        priority = _priority.get()
+        cost = self._clamp(cost)
+        
+        # 没有同级或更高优先级的排队者且配额充足时直接放行
+        if next(self._waiters_ahead(priority), None) is None and self._wait_time(cost) <= 0:
+            self._take(cost)
+            self.admitted[priority] += 1
+            self.queue_wait[priority].record(0.0)
+            return
+        
+        queue = self._queues[priority]
+        if len(queue) >= settings.ai_admission_queue_size:
+            self._reject(priority, f"AI调用排队已满: {priority.name}")
+        remaining = remaining_time()
+        if remaining is not None and self._estimate_wait(priority, cost) > remaining:
+            self._reject(priority, f"截止时间前无法获得AI调用配额: {priority.name}")
+        
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), cost)
+        queue.append(waiter)
+        self._kick()
+        try:
+            await asyncio.wait_for(waiter.future, remaining)
+        except asyncio.TimeoutError:
+            self._reject(priority, f"等待AI调用配额超时: {priority.name}")
+        self.admitted[priority] += 1
+        self.queue_wait[priority].record(time.monotonic() - waiter.enqueued_at)
+    
+    def try_acquire(self, cost: float) -> bool:
+        """不排队申请一次配额：配额充足且没有同级或更高优先级的排队者时扣除并返回True
+        
+        用于对冲请求这类可有可无的额外调用，不占用排队者的配额。
+        """
+        priority = _priority.get()
+        cost = self._clamp(cost)
+        if next(self._waiters_ahead(priority), None) is not None or self._wait_time(cost) > 0:
+            return False
+        self._take(cost)
+        return True
+    
+    def settle(self, estimated: float, actual: float, attempts: int = 1):
+        """调用结束后按实际token用量修正预估（成功、失败都需调用；失败时actual为0即全部归还）
+        
+        attempts为本次调用获得配额的次数（含对冲请求），每次均按estimated预留。
+        """
+        self.token_bucket.adjust(self._clamp(estimated) * attempts - actual)
+        if self._dispatcher is not None and not self._dispatcher.done():
+            self._wakeup.set()
+    
+    def _kick(self):
+        """唤醒或启动分发任务"""
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+        else:
+            self._wakeup.set()
+    
+    def _head(self) -> Optional[Deque[_Waiter]]:
+        """队首有有效等待者的最高优先级队列（跳过已取消的等待者）"""
+        for priority in Priority:
+            queue = self._queues[priority]
+            while queue and queue[0].future.done():
+                queue.popleft()
+            if queue:
+                return queue
+        return None
+    
+    async def _dispatch(self):
+        """按优先级依次为排队者发放配额，配额不足时等待令牌补充或新的排队者到达"""
+        while True:
+            queue = self._head()
+            if queue is None:
+                return
+            delay = self._wait_time(queue[0].cost)
+            if delay <= 0:
+                waiter = queue.popleft()
+                self._take(waiter.cost)
+                waiter.future.set_result(None)
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def stop(self):
+        """应用关闭时停止分发任务，拒绝所有排队者"""
+        if self._dispatcher is not None and not self._dispatcher.done():
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+        for queue in self._queues.values():
+            while queue:
+                waiter = queue.popleft()
+                if not waiter.future.done():
+                    waiter.future.set_exception(AdmissionRejectedError("服务关闭中"))
+    
+    def snapshot(self) -> dict:
+        """令牌余量、各优先级排队与等待时间，用于监控"""
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 1) if value is not None else None
+        
+        self.request_bucket.wait_time(0)
+        self.token_bucket.wait_time(0)
+        return {
+            "qps_limit": self.request_bucket.rate,
+            "tokens_per_minute_limit": settings.ai_token_limit_per_minute,
+            "request_tokens": None if self.request_bucket.unlimited else round(self.request_bucket.tokens, 2),
+            "token_budget": None if self.token_bucket.unlimited else round(self.token_bucket.tokens),
+            "priorities": {
+                priority.name.lower(): {
+                    "queued": sum(1 for waiter in self._queues[priority] if not waiter.future.done()),
+                    "admitted": self.admitted[priority],
+                    "rejected": self.rejected[priority],
+                    "queue_wait_p50_ms": ms(self.queue_wait[priority].percentile(50)),
+                    "queue_wait_p95_ms": ms(self.queue_wait[priority].percentile(95)),
+                    "queue_wait_max_ms": ms(self.queue_wait[priority].percentile(100))
+                }
+                for priority in Priority
+            }
+        }
+
+
+# DashScope调用准入控制的全局实例
+ai_admission = AdmissionController()
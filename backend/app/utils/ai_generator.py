@@ -2,96 +2,326 @@
 AI内容生成工具
 """
 
-import httpx
 import json
+import time
 import random
-from typing import Dict, Any
+import re
+from typing import AsyncIterator, Dict, Any, List, Optional
 from app.config import settings
+from app.utils.http_client import get_upstream_client
+from app.utils.resilience import dashscope_guard, CircuitOpenError, DeadlineExceededError
+from app.utils.dedup import content_dedup
+from app.utils.admission import ai_admission, AdmissionRejectedError
+from app.utils.telemetry import ai_telemetry
+
+
+class AIUpstreamError(RuntimeError):
+    """AI接口返回错误"""
+
+
+# 批量生成时每条内容之间的分隔符
+BATCH_DELIMITER = "###"
+
+BATCH_PROMPT_TEMPLATE = """
+{prompt}
+
+请一次生成{count}条互不相同的内容，每条满足以上要求。
+每条内容之间单独一行输出 {delimiter} 作为分隔，不要编号，不要添加其他说明。
+"""
+
+# 各类型内容的有效长度范围（字符数）
+CONTENT_LENGTH_LIMITS = {
+    "inspirational": (8, 80),
+    "poetry": (10, 200),
+    "philosophy": (20, 150)
+}
+
+# 模型偶尔仍会输出的序号前缀，如 "1." "2、" "(3)" "第4条："
+_NUMBERING_PATTERN = re.compile(r"^\s*(?:第?\d+[条首]?[.、:：)）]|[(（]\d+[)）])\s*")
+
+
+def parse_batch_content(text: str) -> List[str]:
+    """按分隔符拆分批量生成的回复"""
+    items = []
+    for part in text.split(BATCH_DELIMITER):
+        item = _NUMBERING_PATTERN.sub("", part.strip()).strip().strip("\"“”")
+        if item:
+            items.append(item)
+    return items
+
+
+def validate_contents(content_type: str, contents: List[str]) -> List[str]:
+    """过滤长度不合规的内容并去重（保持原有顺序）"""
+    min_length, max_length = CONTENT_LENGTH_LIMITS.get(content_type, (1, settings.max_content_length))
+    seen = set()
+    valid = []
+    for content in contents:
+        if not min_length <= len(content) <= max_length or content in seen:
+            continue
+        seen.add(content)
+        valid.append(content)
+    return valid
 
 
 class AIGenerator:
     """AI内容生成器"""
     
+    PROMPTS = {
+        "inspirational": """
+        请生成一条简短的中文励志语录，要求：
+        1. 积极向上，充满正能量
+        2. 简短精炼，20-50字
+        3. 富有哲理，能给人启发
+        4. 适合制作成精美卡片分享
+        请直接返回语录内容，不要添加其他说明。
+        """,
+        
+        "poetry": """
+        请创作一首简短的中文现代诗，要求：
+        1. 意境优美，富有诗意
+        2. 4-6行，每行10-20字
+        3. 主题积极向上
+        4. 适合制作成精美卡片分享
+        请直接返回诗歌内容，不要添加其他说明。
+        """,
+        
+        "philosophy": """
+        请生成一段简短的中文哲理短文，要求：
+        1. 富有哲理，引人深思
+        2. 50-80字
+        3. 语言优美，有文学性
+        4. 适合制作成精美卡片分享
+        请直接返回短文内容，不要添加其他说明。
+        """
+    }
+    
     def __init__(self):
         self.api_key = settings.dashscope_api_key
         self.base_url = settings.qwen_base_url
-        
+    
     async def generate_content(self, content_type: str) -> str:
-        """生成内容"""
-        
-        prompts = {
-            "inspirational": """
-            请生成一条简短的中文励志语录，要求：
-            1. 积极向上，充满正能量
-            2. 简短精炼，20-50字
-            3. 富有哲理，能给人启发
-            4. 适合制作成精美卡片分享
-            请直接返回语录内容，不要添加其他说明。
-            """,
-            
-            "poetry": """
-            请创作一首简短的中文现代诗，要求：
-            1. 意境优美，富有诗意
-            2. 4-6行，每行10-20字
-            3. 主题积极向上
-            4. 适合制作成精美卡片分享
-            请直接返回诗歌内容，不要添加其他说明。
-            """,
-            
-            "philosophy": """
-            请生成一段简短的中文哲理短文，要求：
-            1. 富有哲理，引人深思
-            2. 50-80字
-            3. 语言优美，有文学性
-            4. 适合制作成精美卡片分享
-            请直接返回短文内容，不要添加其他说明。
-            """
-        }
+        """生成内容，AI调用失败时返回备用内容
+        
+        生成结果与已有卡片近似重复时重新生成，超过重试次数后保留最后一次的结果。
+        内容不在这里登记到去重索引，调用方保存成功后调用 content_dedup.register()。
+        """
+        content = None
+        for _ in range(max(1, settings.content_dedup_max_attempts)):
+            content = await self.request_content(content_type)
+            if not content:
+                ai_telemetry.record_generation(content_type, fallback=True)
+                return self.get_fallback_content(content_type)
+            if not content_dedup.is_duplicate(content):
+                break
+            print(f"⚠️ 生成内容与已有卡片近似重复，重新生成: {content_type}")
+        ai_telemetry.record_generation(content_type, fallback=False)
+        return content
+    
+    async def generate_batch(self, content_type: str, count: int) -> List[str]:
+        """批量生成不与已有卡片近似重复的内容，重复被过滤的部分重新生成补足
+        
+        同generate_content，调用方保存成功后逐条登记到去重索引。
+        """
+        contents: List[str] = []
+        for _ in range(max(1, settings.content_dedup_max_attempts)):
+            batch = await self.request_batch(content_type, count - len(contents))
+            if not batch:
+                break
+            contents.extend(content_dedup.filter(batch, pending=contents))
+            if len(contents) >= count:
+                break
+        for _ in contents:
+            ai_telemetry.record_generation(content_type, fallback=False)
+        return contents
+    
+    async def request_content(self, content_type: str) -> Optional[str]:
+        """调用AI生成内容，失败时返回None"""
+        prompt = self.PROMPTS.get(content_type, self.PROMPTS["inspirational"])
+        
+        result = await self._post_generation(prompt, {"max_tokens": 200}, content_type)
+        if result is None:
+            return None
+        
+        content = result.get("output", {}).get("choices", [{}])[0].get("message", {}).get("content", "")
+        return content.strip() or None
+    
+    async def request_batch(self, content_type: str, count: int) -> List[str]:
+        """一次AI调用生成多条内容，返回校验、去重后的内容列表（失败时为空）
+        
+        delimited模式在一次回复中要求按分隔符输出多条；choices模式使用接口的n参数
+        让模型返回多个候选（qwen系列单次最多4个）。
+        """
+        prompt = self.PROMPTS.get(content_type, self.PROMPTS["inspirational"])
+        
+        if settings.ai_batch_mode == "choices":
+            parameters = {"max_tokens": 200, "n": min(count, 4)}
+        else:
+            prompt = BATCH_PROMPT_TEMPLATE.format(prompt=prompt.strip(), count=count, delimiter=BATCH_DELIMITER)
+            parameters = {"max_tokens": min(200 * count, 2000)}
         
-        prompt = prompts.get(content_type, prompts["inspirational"])
+        result = await self._post_generation(prompt, parameters, content_type)
+        if result is None:
+            return []
         
+        contents = []
+        for choice in result.get("output", {}).get("choices", []):
+            text = choice.get("message", {}).get("content", "")
+            contents.extend(parse_batch_content(text))
+        return validate_contents(content_type, contents)[:count]
+    
+    async def stream_content(self, content_type: str) -> AsyncIterator[str]:
+        """流式调用AI生成内容，逐段产出增量文本
+        
+        使用DashScope的SSE增量输出模式；连接或接口失败、配额不足、熔断或截止时间不足时抛出异常，
+        由调用方决定是否降级。流式调用只参与熔断判定，不计入延迟统计。
+        """
+        prompt = self.PROMPTS.get(content_type, self.PROMPTS["inspirational"])
+        headers = self._build_headers()
+        headers["X-DashScope-SSE"] = "enable"
+        payload = self._build_payload(prompt, {"max_tokens": 200, "incremental_output": True})
+        
+        estimated = self._estimate_tokens(prompt, payload["parameters"])
+        usage = {}
         try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "model": "qwen-turbo",
-                "input": {
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ]
-                },
-                "parameters": {
-                    "result_format": "message",
-                    "temperature": 0.8,
-                    "max_tokens": 200
-                }
-            }
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/services/aigc/text-generation/generation",
-                    headers=headers,
-                    json=payload,
-                    timeout=30.0
-                )
+            await ai_admission.acquire(estimated)
+        except Exception as e:
+            ai_telemetry.record_call(content_type, 0.0, error=e)
+            raise
+        try:
+            timeout = dashscope_guard.before_call()
+        except Exception as e:
+            # 熔断或截止时间不足，未发出调用，归还预留的配额
+            ai_admission.settle(estimated, 0)
+            ai_telemetry.record_call(content_type, 0.0, error=e)
+            raise
+        
+        start = time.monotonic()
+        error: Optional[BaseException] = None
+        succeeded = False
+        try:
+            client = get_upstream_client("dashscope")
+            async with client.stream(
+                "POST", self.generation_url, headers=headers, json=payload, timeout=timeout
+            ) as response:
+                if response.status_code != 200:
+                    raise AIUpstreamError(f"AI API调用失败: {response.status_code}")
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    content = result.get("output", {}).get("choices", [{}])[0].get("message", {}).get("content", "")
-                    return content.strip()
-                else:
-                    print(f"AI API调用失败: {response.status_code}")
-                    return self.get_fallback_content(content_type)
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    chunk = json.loads(line[len("data:"):])
+                    if "code" in chunk and "output" not in chunk:
+                        raise AIUpstreamError(f"AI API流式输出错误: {chunk.get('code')} {chunk.get('message')}")
                     
+                    usage = chunk.get("usage", usage)
+                    text = chunk.get("output", {}).get("choices", [{}])[0].get("message", {}).get("content", "")
+                    if text:
+                        yield text
+            succeeded = True
         except Exception as e:
-            print(f"AI内容生成错误: {e}")
-            return self.get_fallback_content(content_type)
+            error = e
+            dashscope_guard.record_failure(e)
+            raise
+        finally:
+            # 失败且上游未返回用量时全部归还；被取消时用量未知，按预估计
+            ai_admission.settle(estimated, usage.get("total_tokens", 0 if error is not None else estimated))
+            if succeeded or error is not None:
+                ai_telemetry.record_call(content_type, time.monotonic() - start, usage, error)
+            if succeeded:
+                dashscope_guard.breaker.record_success()
+            else:
+                dashscope_guard.breaker.release()
+    
+    @property
+    def generation_url(self) -> str:
+        return f"{self.base_url}/services/aigc/text-generation/generation"
+    
+    def _build_headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+    
+    def _build_payload(self, prompt: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "model": "qwen-turbo",
+            "input": {
+                "messages": [
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ]
+            },
+            "parameters": {
+                "result_format": "message",
+                "temperature": 0.8,
+                **parameters
+            }
+        }
+    
+    async def _post_generation(self, prompt: str, parameters: Dict[str, Any],
+                               content_type: str = "unknown") -> Optional[Dict[str, Any]]:
+        """调用DashScope文本生成接口，返回响应JSON，失败时返回None
+        
+        调用经过熔断器与自适应超时保护：上游不可用时立即返回None，不再等待完整超时。
+        每次调用的耗时、token用量与错误类型按content_type记录到遥测。
+        """
+        async def send(timeout: float) -> Dict[str, Any]:
+            client = get_upstream_client("dashscope")
+            response = await client.post(
+                self.generation_url,
+                headers=self._build_headers(),
+                json=self._build_payload(prompt, parameters),
+                timeout=timeout
+            )
+            if response.status_code != 200:
+                raise AIUpstreamError(f"AI API调用失败: {response.status_code}")
+            return response.json()
+        
+        estimated = self._estimate_tokens(prompt, parameters)
+        start = time.monotonic()
+        try:
+            await ai_admission.acquire(estimated)
+        except AdmissionRejectedError as e:
+            ai_telemetry.record_call(content_type, time.monotonic() - start, error=e)
+            print(f"AI调用已降级: {e}")
+            return None
+        
+        hedges = 0
+        
+        def admit_hedge() -> bool:
+            # 对冲请求另外申请一份配额，不排队；配额不足时不对冲
+            nonlocal hedges
+            if not ai_admission.try_acquire(estimated):
+                return False
+            hedges += 1
+            return True
+        
+        usage: Optional[Dict[str, Any]] = None
+        start = time.monotonic()
+        try:
+            result = await dashscope_guard.call(send, admit_hedge)
+            usage = result.get("usage", {})
+        except (CircuitOpenError, DeadlineExceededError) as e:
+            ai_telemetry.record_call(content_type, time.monotonic() - start, error=e)
+            print(f"AI调用已降级: {e}")
+            return None
+        except Exception as e:
+            ai_telemetry.record_call(content_type, time.monotonic() - start, error=e)
+            print(f"AI内容生成错误: {e!r}")
+            return None
+        finally:
+            # 失败时没有实际用量，预留全部归还；对冲中被取消的一方用量未知，按预估计
+            actual = 0 if usage is None else usage.get("total_tokens", estimated) + estimated * hedges
+            ai_admission.settle(estimated, actual, attempts=1 + hedges)
+        
+        ai_telemetry.record_call(content_type, time.monotonic() - start, usage)
+        return result
+    
+    def _estimate_tokens(self, prompt: str, parameters: Dict[str, Any]) -> int:
+        """预估一次调用的token用量（中文约每字一个token），用于准入控制"""
+        return len(prompt) + parameters.get("max_tokens", 200) * parameters.get("n", 1)
     
     def get_fallback_content(self, content_type: str) -> str:
         """获取备用内容"""
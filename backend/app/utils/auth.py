@@ -7,7 +7,8 @@ from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.models.user import User
 from app.config import settings
@@ -40,7 +41,7 @@ def verify_token(token: str) -> dict:
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
     """获取当前用户"""
     
@@ -53,7 +54,8 @@ async def get_current_user(
     if not user_id:
         raise HTTPException(status_code=401, detail="用户ID无效")
     
-    user = db.query(User).filter(User.id == user_id).first()
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
     
@@ -62,7 +64,7 @@ async def get_current_user(
 
 async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Optional[User]:
     """可选获取当前用户"""
     
@@ -76,8 +78,8 @@ async def get_current_user_optional(
         if not user_id:
             return None
         
-        user = db.query(User).filter(User.id == user_id).first()
-        return user
+        result = await db.execute(select(User).where(User.id == user_id))
+        return result.scalar_one_or_none()
         
     except HTTPException:
         return None
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+预生成内容池
+
+按内容类型在数据库中保留一批已生成的内容，/generate 直接取用，
+库存低于低水位时在后台并发补充，避免每次请求都同步等待AI接口。
+"""
+
+import time
+import asyncio
+from typing import Dict, Optional
+from sqlalchemy import select, delete, func
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.content_pool import PooledContent
+from app.utils.ai_generator import ai_generator
+from app.utils.dedup import content_dedup
+from app.utils.resilience import deadline_scope
+from app.utils.admission import ai_priority, Priority
+
+
+class ContentPool:
+    """按类型管理的预生成内容池"""
+    
+    # 交给Celery补充时，同一类型两次派发之间的最小间隔（秒）
+    DISPATCH_INTERVAL = 30
+    
+    def __init__(self):
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.generated: Dict[str, int] = {}
+        self.failures: Dict[str, int] = {}
+        self._depth: Dict[str, int] = {}
+        self._refill_tasks: Dict[str, asyncio.Task] = {}
+        self._dispatched_at: Dict[str, float] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+    
+    @property
+    def enabled(self) -> bool:
+        return settings.content_pool_enabled and settings.content_pool_size > 0
+    
+    def _count(self, counter: Dict[str, int], content_type: str, n: int = 1):
+        counter[content_type] = counter.get(content_type, 0) + n
+    
+    async def pop(self, content_type: str) -> Optional[str]:
+        """取出一条指定类型的内容，池为空时返回None"""
+        if not self.enabled or content_type not in settings.content_types:
+            return None
+        
+        async with AsyncSessionLocal() as db:
+            # 并发请求可能取到同一行，删除失败时重试下一行
+            for _ in range(3):
+                result = await db.execute(
+                    select(PooledContent.id, PooledContent.content)
+                    .where(PooledContent.type == content_type)
+                    .order_by(PooledContent.id)
+                    .limit(1)
+                )
+                row = result.first()
+                if row is None:
+                    break
+                
+                deleted = await db.execute(delete(PooledContent).where(PooledContent.id == row.id))
+                await db.commit()
+                if deleted.rowcount == 1:
+                    self._count(self.hits, content_type)
+                    self._depth[content_type] = max(0, self._depth.get(content_type, 1) - 1)
+                    self.ensure_refill(content_type)
+                    return row.content
+        
+        self._count(self.misses, content_type)
+        self._depth[content_type] = 0
+        self.ensure_refill(content_type)
+        return None
+    
+    def ensure_refill(self, content_type: str):
+        """库存低于低水位时启动后台补充（同一类型同时只有一个补充任务）"""
+        if not self.enabled:
+            return
+        depth = self._depth.get(content_type)
+        if depth is not None and depth > settings.content_pool_low_water:
+            return
+        if settings.celery_enabled:
+            self._dispatch_refill(content_type)
+            return
+        task = self._refill_tasks.get(content_type)
+        if task is not None and not task.done():
+            return
+        # 后台补充不受触发它的请求的截止时间限制，并以最低优先级申请AI调用配额
+        with deadline_scope(None), ai_priority(Priority.BACKGROUND):
+            self._refill_tasks[content_type] = asyncio.get_running_loop().create_task(
+                self.refill(content_type)
+            )
+    
+    def _dispatch_refill(self, content_type: str):
+        """把补充任务交给Celery worker执行，避免占用API进程"""
+        now = time.monotonic()
+        if now - self._dispatched_at.get(content_type, float("-inf")) < self.DISPATCH_INTERVAL:
+            return
+        self._dispatched_at[content_type] = now
+        # 延迟导入，避免与tasks模块循环依赖
+        from tasks import refill_content_pool
+        
+        def on_done(future):
+            if future.exception() is not None:
+                print(f"⚠️ 内容池补充任务派发失败: {content_type} {future.exception()}")
+                self._dispatched_at.pop(content_type, None)
+        
+        # 投递消息是同步网络调用，放到线程池执行
+        future = asyncio.get_running_loop().run_in_executor(None, refill_content_pool.delay, content_type)
+        future.add_done_callback(on_done)
+    
+    async def refill(self, content_type: str) -> int:
+        """补充指定类型的内容至目标数量，返回新增条数"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(1, settings.content_pool_refill_concurrency))
+        
+        async with AsyncSessionLocal() as db:
+            depth = await db.scalar(
+                select(func.count(PooledContent.id)).where(PooledContent.type == content_type)
+            )
+        self._depth[content_type] = depth
+        
+        needed = settings.content_pool_size - depth
+        if needed <= 0:
+            return 0
+        
+        # 上游失败后不再继续发起本轮剩余的生成请求
+        upstream_failed = False
+        
+        async def produce(count: int) -> int:
+            nonlocal upstream_failed
+            async with self._semaphore:
+                if upstream_failed:
+                    return 0
+                contents = await ai_generator.generate_batch(content_type, count)
+            if not contents:
+                upstream_failed = True
+                self._count(self.failures, content_type)
+                return 0
+            async with AsyncSessionLocal() as db:
+                db.add_all([PooledContent(type=content_type, content=content) for content in contents])
+                await db.commit()
+            for content in contents:
+                content_dedup.register(content)
+            self._count(self.generated, content_type, len(contents))
+            self._depth[content_type] = self._depth.get(content_type, 0) + len(contents)
+            return len(contents)
+        
+        # 每次AI调用批量生成多条，减少往返开销
+        batch_size = max(1, settings.ai_batch_size)
+        batches = [min(batch_size, needed - start) for start in range(0, needed, batch_size)]
+        results = await asyncio.gather(*[produce(count) for count in batches], return_exceptions=True)
+        added = sum(r for r in results if isinstance(r, int))
+        if added < needed:
+            print(f"⚠️ 内容池补充未完成: {content_type} {added}/{needed}")
+        return added
+    
+    async def start(self):
+        """应用启动时为所有类型预热内容池"""
+        for content_type in settings.content_types:
+            self.ensure_refill(content_type)
+    
+    async def stop(self):
+        """应用关闭时取消未完成的补充任务"""
+        tasks, self._refill_tasks = list(self._refill_tasks.values()), {}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def stats(self) -> dict:
+        """内容池运行状态"""
+        return {
+            "enabled": self.enabled,
+            "size": settings.content_pool_size,
+            "low_water": settings.content_pool_low_water,
+            "refill_concurrency": settings.content_pool_refill_concurrency,
+            "types": {
+                content_type: {
+                    "depth": self._depth.get(content_type),
+                    "hits": self.hits.get(content_type, 0),
+                    "misses": self.misses.get(content_type, 0),
+                    "generated": self.generated.get(content_type, 0),
+                    "failures": self.failures.get(content_type, 0),
+                    "refilling": content_type in self._refill_tasks
+                    and not self._refill_tasks[content_type].done()
+                }
+                for content_type in settings.content_types
+            }
+        }
+
+
+# 创建全局实例
+content_pool = ContentPool()
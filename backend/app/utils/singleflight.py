@@ -0,0 +1,35 @@
+"""
+请求合并（single-flight）工具
+
+同一个key的并发调用只会真正执行一次，其余调用者等待并共享同一个结果。
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """按key合并并发的异步调用"""
+    
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+    
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """执行或加入key对应的调用并返回其结果
+        
+        实际执行放在独立任务中并通过shield等待，单个调用者被取消不会中断共享的执行。
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(func())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(flight)
+    
+    def _forget(self, key: Hashable, flight: asyncio.Future):
+        """调用结束后移除记录，之后的调用将重新执行"""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            # 标记异常已被获取，避免所有等待者都取消时打印未处理异常警告
+            flight.exception()
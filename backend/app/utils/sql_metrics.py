@@ -0,0 +1,169 @@
+"""
+请求级SQL统计
+
+通过引擎的 before/after_cursor_execute 事件记录每条语句的耗时，按contextvar归属到当前HTTP请求：
+每个请求统计查询次数、数据库总耗时与最慢的语句。请求结束后按路由模板汇总，通过 /metrics/db 暴露；
+DEBUG模式下以 Server-Timing 响应头返回（浏览器开发者工具可直接查看）。
+超过 SQL_SLOW_QUERY_MS 的语句打印日志，绑定参数只保留类型，不输出具体值。
+列表接口出现N+1查询时，对应路由的每请求查询次数会随分页大小增长，在汇总中一眼可见。
+"""
+
+import time
+import contextvars
+from typing import Dict, Optional
+from sqlalchemy import event
+from app.config import settings
+
+# 汇总中保留的语句最大长度
+MAX_STATEMENT_LENGTH = 300
+
+
+class RequestQueryStats:
+    """单个请求内的SQL统计"""
+    
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_statement: Optional[str] = None
+    
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_statement = statement
+    
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.total_ms:.1f};desc="{self.count} queries", '
+            f"db-slowest;dur={self.slowest_ms:.1f}"
+        )
+
+
+class RouteQueryStats:
+    """单个路由的累计SQL统计"""
+    
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.db_ms_total = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_statement: Optional[str] = None
+    
+    def add(self, stats: RequestQueryStats):
+        self.requests += 1
+        self.queries += stats.count
+        self.max_queries = max(self.max_queries, stats.count)
+        self.db_ms_total += stats.total_ms
+        if stats.slowest_ms > self.slowest_ms:
+            self.slowest_ms = stats.slowest_ms
+            self.slowest_statement = stats.slowest_statement
+    
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "queries_per_request": round(self.queries / self.requests, 2) if self.requests else 0.0,
+            "max_queries_per_request": self.max_queries,
+            "db_ms_per_request": round(self.db_ms_total / self.requests, 2) if self.requests else 0.0,
+            "slowest_ms": round(self.slowest_ms, 2),
+            "slowest_statement": self.slowest_statement
+        }
+
+
+def redact_parameters(parameters) -> object:
+    """将绑定参数替换为类型名，慢查询日志中不出现用户数据"""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            # executemany：只描述第一组参数与总组数
+            return {"rows": len(parameters), "first": redact_parameters(parameters[0])}
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def route_template(request) -> Optional[str]:
+    """请求对应的路由模板（如 GET /api/cards/{card_id}），未匹配到路由时返回None
+    
+    路径参数的值替换回参数名，同一路由的请求汇总到一起。
+    """
+    if request.scope.get("route") is None:
+        return None
+    segments = request.url.path.split("/")
+    for name, value in request.path_params.items():
+        value = str(value)
+        for index in range(len(segments) - 1, -1, -1):
+            if segments[index] == value:
+                segments[index] = f"{{{name}}}"
+                break
+    return f"{request.method} {'/'.join(segments)}"
+
+
+def _compact(statement: str) -> str:
+    statement = " ".join(statement.split())
+    if len(statement) > MAX_STATEMENT_LENGTH:
+        statement = statement[:MAX_STATEMENT_LENGTH] + "..."
+    return statement
+
+
+class SQLMetrics:
+    """SQL语句计时与按路由汇总"""
+    
+    def __init__(self):
+        self._current: contextvars.ContextVar[Optional[RequestQueryStats]] = contextvars.ContextVar(
+            "sql_request_stats", default=None
+        )
+        self.routes: Dict[str, RouteQueryStats] = {}
+        self.slow_queries = 0
+    
+    def install(self, *engines):
+        """在引擎上注册计时事件（重复调用不会重复注册）"""
+        for target in {engine.sync_engine for engine in engines}:
+            if not event.contains(target, "before_cursor_execute", self._before_execute):
+                event.listen(target, "before_cursor_execute", self._before_execute)
+                event.listen(target, "after_cursor_execute", self._after_execute)
+    
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._sql_metrics_started = time.perf_counter()
+    
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_sql_metrics_started", None)
+        if started is None:
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        
+        stats = self._current.get()
+        if stats is not None:
+            stats.record(_compact(statement), elapsed_ms)
+        
+        if elapsed_ms >= settings.sql_slow_query_ms:
+            self.slow_queries += 1
+            print(f"🐢 慢查询 {elapsed_ms:.1f}ms: {_compact(statement)} 参数: {redact_parameters(parameters)}")
+    
+    def begin_request(self) -> contextvars.Token:
+        """开始统计当前请求，返回用于结束统计的token"""
+        return self._current.set(RequestQueryStats())
+    
+    def end_request(self, token: contextvars.Token, route: Optional[str]) -> RequestQueryStats:
+        """结束统计并计入路由汇总；route为None（未匹配路由）时不计入"""
+        stats = self._current.get()
+        self._current.reset(token)
+        if route is not None:
+            route_stats = self.routes.get(route)
+            if route_stats is None:
+                route_stats = self.routes[route] = RouteQueryStats()
+            route_stats.add(stats)
+        return stats
+    
+    def snapshot(self) -> dict:
+        return {
+            "slow_query_threshold_ms": settings.sql_slow_query_ms,
+            "slow_queries": self.slow_queries,
+            "routes": {route: stats.to_dict() for route, stats in sorted(self.routes.items())}
+        }
+
+
+# 创建全局实例
+sql_metrics = SQLMetrics()
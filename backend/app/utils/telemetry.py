@@ -0,0 +1,199 @@
+"""
+AI调用遥测
+
+在内存中按内容类型聚合每次上游生成调用的耗时直方图、token用量、错误类型与降级情况，
+通过 /metrics/ai 暴露；按天汇总的增量定期写入 ai_usage_daily 表用于成本跟踪。
+记录只做字典与计数器更新，不在调用路径上访问数据库。
+"""
+
+import asyncio
+from bisect import bisect_left
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.ai_usage import AIUsageDaily
+
+# 延迟直方图的桶上界（毫秒），最后一个桶为 +Inf
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+_DAILY_FIELDS = (
+    "calls", "errors", "generations", "fallbacks",
+    "prompt_tokens", "completion_tokens", "latency_ms_total"
+)
+
+
+class TypeStats:
+    """单个内容类型的累计指标"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.errors: Dict[str, int] = {}
+        self.generations = 0
+        self.fallbacks = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.latency_ms_total = 0.0
+    
+    def to_dict(self) -> dict:
+        succeeded = self.calls - sum(self.errors.values())
+        cumulative = 0
+        histogram = {}
+        for bound, count in zip(LATENCY_BUCKETS_MS + ["+Inf"], self.latency_buckets):
+            cumulative += count
+            histogram[str(bound)] = cumulative
+        return {
+            "calls": self.calls,
+            "errors": dict(self.errors),
+            "generations": self.generations,
+            "fallbacks": self.fallbacks,
+            "fallback_rate": round(self.fallbacks / self.generations, 4) if self.generations else 0.0,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "avg_latency_ms": round(self.latency_ms_total / succeeded, 1) if succeeded else None,
+            "latency_histogram_ms": histogram
+        }
+
+
+class AITelemetry:
+    """AI调用指标的内存聚合与按天持久化"""
+    
+    def __init__(self):
+        self.types: Dict[str, TypeStats] = {}
+        # 尚未写入数据库的按天增量：(日期, 类型) -> 字段 -> 增量
+        self._pending: Dict[Tuple[date, str], Dict[str, float]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+    
+    def _stats(self, content_type: str) -> TypeStats:
+        stats = self.types.get(content_type)
+        if stats is None:
+            stats = self.types[content_type] = TypeStats()
+        return stats
+    
+    def _add_pending(self, content_type: str, **deltas: float):
+        pending = self._pending.setdefault((date.today(), content_type), dict.fromkeys(_DAILY_FIELDS, 0))
+        for field, delta in deltas.items():
+            pending[field] += delta
+    
+    def record_call(self, content_type: str, elapsed: float, usage: Optional[dict] = None,
+                    error: Optional[BaseException] = None):
+        """记录一次上游调用：耗时、token用量（DashScope usage字段）与错误类型"""
+        stats = self._stats(content_type)
+        stats.calls += 1
+        usage = usage or {}
+        prompt_tokens = usage.get("input_tokens", 0)
+        completion_tokens = usage.get("output_tokens", 0)
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+        
+        if error is not None:
+            error_class = type(error).__name__
+            stats.errors[error_class] = stats.errors.get(error_class, 0) + 1
+            self._add_pending(content_type, calls=1, errors=1,
+                              prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+            return
+        
+        elapsed_ms = elapsed * 1000
+        stats.latency_buckets[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        stats.latency_ms_total += elapsed_ms
+        self._add_pending(content_type, calls=1, prompt_tokens=prompt_tokens,
+                          completion_tokens=completion_tokens, latency_ms_total=elapsed_ms)
+    
+    def record_generation(self, content_type: str, fallback: bool):
+        """记录一次对外产出的内容，fallback表示使用了备用内容而非AI生成结果"""
+        stats = self._stats(content_type)
+        stats.generations += 1
+        if fallback:
+            stats.fallbacks += 1
+        self._add_pending(content_type, generations=1, fallbacks=1 if fallback else 0)
+    
+    def snapshot(self) -> dict:
+        """当前进程启动以来的累计指标"""
+        total = TypeStats()
+        for stats in self.types.values():
+            total.calls += stats.calls
+            total.generations += stats.generations
+            total.fallbacks += stats.fallbacks
+            total.prompt_tokens += stats.prompt_tokens
+            total.completion_tokens += stats.completion_tokens
+            total.latency_ms_total += stats.latency_ms_total
+            for error_class, count in stats.errors.items():
+                total.errors[error_class] = total.errors.get(error_class, 0) + count
+            total.latency_buckets = [a + b for a, b in zip(total.latency_buckets, stats.latency_buckets)]
+        return {
+            "total": total.to_dict(),
+            "types": {content_type: stats.to_dict() for content_type, stats in self.types.items()}
+        }
+    
+    async def flush(self) -> int:
+        """将按天增量累加写入数据库，返回写入的行数"""
+        pending, self._pending = list(self._pending.items()), {}
+        written = 0
+        try:
+            async with AsyncSessionLocal() as db:
+                for (day, content_type), deltas in pending:
+                    await self._upsert(db, day, content_type, deltas)
+                    written += 1
+        except Exception as e:
+            # 未写入的增量放回，下次再试
+            for key, deltas in pending[written:]:
+                merged = self._pending.setdefault(key, dict.fromkeys(_DAILY_FIELDS, 0))
+                for field, delta in deltas.items():
+                    merged[field] += delta
+            print(f"⚠️ AI用量汇总写入失败: {e}")
+        return written
+    
+    async def _upsert(self, db, day: date, content_type: str, deltas: Dict[str, float]):
+        # 以增量方式累加，多个进程同时写入同一行也不会互相覆盖
+        statement = (
+            update(AIUsageDaily)
+            .where(AIUsageDaily.date == day, AIUsageDaily.type == content_type)
+            .values({field: getattr(AIUsageDaily, field) + delta for field, delta in deltas.items()})
+        )
+        result = await db.execute(statement)
+        if result.rowcount == 0:
+            db.add(AIUsageDaily(date=day, type=content_type, **deltas))
+            try:
+                await db.commit()
+                return
+            except IntegrityError:
+                # 其他进程已插入同一天的记录
+                await db.rollback()
+                await db.execute(statement)
+        await db.commit()
+    
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(settings.ai_telemetry_flush_interval)
+            await self.flush()
+    
+    async def start(self):
+        """应用启动时开始定期写入按天汇总"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+    
+    async def stop(self):
+        """应用关闭时停止定期写入，并写入剩余增量"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+    
+    async def daily_summary(self, days: int) -> List[dict]:
+        """最近days天的按天汇总（先写入当前进程的未写入增量）"""
+        await self.flush()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(AIUsageDaily)
+                .where(AIUsageDaily.date > date.today() - timedelta(days=days))
+                .order_by(AIUsageDaily.date.desc(), AIUsageDaily.type)
+            )
+            return [row.to_dict() for row in result.scalars()]
+
+
+# 创建全局实例
+ai_telemetry = AITelemetry()
@@ -0,0 +1,239 @@
+"""
+用户统计计数
+
+/api/users/stats 返回的浏览数、点赞数、收藏数与连续天数由事件增量维护，请求路径上不做聚合查询：
+- 浏览卡片：首次浏览某张卡片时 total_cards + 1，并按浏览日期推进 consecutive_days
+- 点赞/取消点赞：点赞状态变化时 total_likes ± 1
+- 收藏/取消收藏：favorite_count ± 1
+
+事件先按用户在内存中合并，每隔 USER_STATS_FLUSH_INTERVAL 秒在一个写事务内批量写入，
+计数以SQL原子增量更新（不低于0）。已写入的浏览（用户, 卡片）与活跃（用户, 日期）记在进程内，
+重复浏览不再产生写入，/daily 高峰期的重复访问不占用写连接。进程异常退出最多丢失一个写入间隔内的事件，
+每晚的 reconcile_user_stats 按明细表整体重算计数，修正此类偏差并让中断的连续天数归零。
+"""
+
+import asyncio
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from collections import Counter
+from sqlalchemy import bindparam, case, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.user import User
+from app.models.favorite import Favorite
+from app.models.interaction import UserCardInteraction
+
+COUNTERS = ("total_cards", "total_likes", "favorite_count")
+
+# 进程内记录的已写入浏览/活跃日期条数上限，超过后清空重新积累（只影响是否跳过写入，不影响计数正确性）
+KNOWN_VIEWS_LIMIT = 200000
+
+# 每条INSERT语句写入的浏览记录数（SQLite单条语句的参数个数有上限）
+VIEW_INSERT_BATCH = 500
+
+
+def _counter_after(column, delta):
+    """column + delta，结果不低于0"""
+    value = func.coalesce(column, 0) + delta
+    return case((value < 0, 0), else_=value)
+
+
+def current_streak(user: User, today: Optional[date] = None) -> int:
+    """连续天数：最近一次浏览早于昨天时连续已中断"""
+    today = today or date.today()
+    if user.last_active_date is None or user.last_active_date < today - timedelta(days=1):
+        return 0
+    return user.consecutive_days or 0
+
+
+class UserStatsCounter:
+    """按用户合并统计事件，定期批量写入数据库"""
+    
+    def __init__(self):
+        self._deltas: Dict[int, Dict[str, int]] = {}
+        self._views: Set[Tuple[int, int, date]] = set()
+        # 已确认写入数据库的浏览 (user_id, card_id) 与活跃日期 (user_id, day)
+        self._known_views: Set[Tuple[int, int]] = set()
+        self._known_days: Set[Tuple[int, date]] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.flushed_users = 0
+    
+    def add(self, user_id: int, counter: str, delta: int):
+        """记录计数变化，counter为 total_likes / favorite_count"""
+        deltas = self._deltas.setdefault(user_id, {})
+        deltas[counter] = deltas.get(counter, 0) + delta
+    
+    def record_view(self, user_id: int, card_id: int, day: Optional[date] = None):
+        """记录一次卡片浏览，同一用户同一卡片同一天的重复浏览合并为一次；已写入过的浏览直接忽略"""
+        day = day or date.today()
+        if (user_id, card_id) in self._known_views and (user_id, day) in self._known_days:
+            return
+        self._views.add((user_id, card_id, day))
+    
+    def pending(self, user_id: int) -> Dict[str, int]:
+        """尚未写入数据库的计数增量"""
+        return dict(self._deltas.get(user_id, {}))
+    
+    def _restore(self, deltas: Dict[int, Dict[str, int]], views: Set[Tuple[int, int, date]]):
+        for user_id, counters in deltas.items():
+            for counter, delta in counters.items():
+                self.add(user_id, counter, delta)
+        self._views |= views
+    
+    async def _first_views(self, db: AsyncSession, pairs: List[Tuple[int, int]]) -> Counter:
+        """批量写入浏览状态，返回每个用户首次浏览的卡片数
+        
+        INSERT ... ON CONFLICT(user_id, card_id)：新记录直接插入；已有记录（如先点赞）只在未浏览时置为已浏览，
+        RETURNING只返回插入或更新的行，即首次浏览。
+        """
+        table = UserCardInteraction.__table__
+        dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+        first_views = Counter()
+        for start in range(0, len(pairs), VIEW_INSERT_BATCH):
+            statement = dialect.insert(table).values([
+                {"user_id": user_id, "card_id": card_id, "viewed": True, "liked": False}
+                for user_id, card_id in pairs[start:start + VIEW_INSERT_BATCH]
+            ])
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.c.user_id, table.c.card_id],
+                set_={"viewed": True, "updated_at": func.now()},
+                where=table.c.viewed.is_(False)
+            ).returning(table.c.user_id)
+            first_views.update((await db.execute(statement)).scalars())
+        return first_views
+    
+    async def _write(self, db: AsyncSession, deltas: Dict[int, Dict[str, int]], views: Set[Tuple[int, int, date]]):
+        # 浏览状态按 (user_id, card_id) 幂等记录，只有首次浏览计入 total_cards；进程内已知的浏览跳过
+        deltas = {user_id: dict(counters) for user_id, counters in deltas.items()}
+        pairs = sorted({(user_id, card_id) for user_id, card_id, _ in views} - self._known_views)
+        if pairs:
+            for user_id, first_views in (await self._first_views(db, pairs)).items():
+                counters = deltas.setdefault(user_id, {})
+                counters["total_cards"] = counters.get("total_cards", 0) + first_views
+        
+        table = User.__table__
+        rows = [
+            {"user": user_id, **{f"delta_{counter}": counters.get(counter, 0) for counter in COUNTERS}}
+            for user_id, counters in deltas.items() if any(counters.values())
+        ]
+        if rows:
+            await db.execute(
+                update(table)
+                .where(table.c.id == bindparam("user"))
+                .values({counter: _counter_after(table.c[counter], bindparam(f"delta_{counter}")) for counter in COUNTERS}),
+                rows
+            )
+        
+        # 连续天数：前一天活跃则+1，当天已记录则不变，否则从1重新开始；按日期顺序推进
+        active_days = sorted({(day, user_id) for user_id, _, day in views if (user_id, day) not in self._known_days})
+        if active_days:
+            last = table.c.last_active_date
+            await db.execute(
+                update(table)
+                .where(table.c.id == bindparam("user"))
+                .values(
+                    consecutive_days=case(
+                        (last == bindparam("previous"), func.coalesce(table.c.consecutive_days, 0) + 1),
+                        (last >= bindparam("day"), table.c.consecutive_days),
+                        else_=1
+                    ),
+                    last_active_date=case((last >= bindparam("day"), last), else_=bindparam("day"))
+                ),
+                [{"user": user_id, "day": day, "previous": day - timedelta(days=1)} for day, user_id in active_days]
+            )
+        return len(rows) + len(active_days)
+    
+    def _remember(self, views: Set[Tuple[int, int, date]]):
+        """事务提交后记录已写入的浏览与活跃日期"""
+        if len(self._known_views) + len(views) > KNOWN_VIEWS_LIMIT:
+            self._known_views.clear()
+            self._known_days.clear()
+        for user_id, card_id, day in views:
+            self._known_views.add((user_id, card_id))
+            self._known_days.add((user_id, day))
+    
+    async def flush(self) -> int:
+        """在一个写事务内写入合并后的事件，返回写入的用户行数"""
+        deltas, views = self._deltas, self._views
+        self._deltas, self._views = {}, set()
+        if not deltas and not views:
+            return 0
+        
+        try:
+            async with AsyncSessionLocal() as db:
+                written = await self._write(db, deltas, views)
+                await db.commit()
+            self._remember(views)
+        except asyncio.CancelledError:
+            # 关闭时写入被取消，事件放回由stop()再次写入
+            self._restore(deltas, views)
+            raise
+        except Exception as e:
+            # 事务整体回滚，事件放回下次再试（浏览状态幂等，不会重复计数）
+            self._restore(deltas, views)
+            print(f"⚠️ 用户统计写入失败: {e}")
+            return 0
+        
+        self.flushes += 1
+        self.flushed_users += written
+        return written
+    
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(settings.user_stats_flush_interval)
+            await self.flush()
+    
+    async def start(self):
+        """应用启动时开始定期写入"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+    
+    async def stop(self):
+        """应用关闭时停止定期写入，并写入剩余事件"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+    
+    def stats(self) -> dict:
+        return {
+            "pending_users": len(self._deltas),
+            "pending_views": len(self._views),
+            "flushes": self.flushes,
+            "flushed_users": self.flushed_users
+        }
+
+
+async def reconcile_user_stats(db: AsyncSession, today: Optional[date] = None) -> int:
+    """按明细表整体重算所有用户的统计计数（一条UPDATE，不提交），返回更新的用户数"""
+    today = today or date.today()
+    table = User.__table__
+    
+    def count(model, *conditions):
+        return (
+            select(func.count())
+            .select_from(model)
+            .where(model.user_id == table.c.id, *conditions)
+            .scalar_subquery()
+        )
+    
+    result = await db.execute(
+        update(table).values(
+            total_cards=count(UserCardInteraction, UserCardInteraction.viewed.is_(True)),
+            total_likes=count(UserCardInteraction, UserCardInteraction.liked.is_(True)),
+            favorite_count=count(Favorite),
+            consecutive_days=case(
+                (table.c.last_active_date >= today - timedelta(days=1), table.c.consecutive_days),
+                else_=0
+            )
+        )
+    )
+    return result.rowcount
+
+
+# 创建全局实例
+user_stats = UserStatsCounter()
@@ -2,9 +2,10 @@
 微信小程序工具类
 """
 
-import httpx
+import time
 from typing import Optional, Dict, Any
 from app.config import settings
+from app.utils.http_client import get_upstream_client
 
 
 class WeChatClient:
@@ -14,6 +15,8 @@ class WeChatClient:
         self.app_id = settings.wechat_app_id
         self.app_secret = settings.wechat_app_secret
         self.base_url = "https://api.weixin.qq.com"
+        self._access_token: Optional[str] = None
+        self._access_token_expires_at = 0.0
     
     async def get_openid_by_code(self, code: str) -> Optional[str]:
         """通过code获取openid"""
@@ -31,21 +34,21 @@ class WeChatClient:
                 "grant_type": "authorization_code"
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    openid = data.get("openid")
-                    if openid:
-                        return openid
-                    else:
-                        print(f"微信API返回错误: {data}")
-                        return None
+            client = get_upstream_client("wechat")
+            response = await client.get(url, params=params)
+            
+            if response.status_code == 200:
+                data = response.json()
+                openid = data.get("openid")
+                if openid:
+                    return openid
                 else:
-                    print(f"微信API调用失败: {response.status_code}")
+                    print(f"微信API返回错误: {data}")
                     return None
-                    
+            else:
+                print(f"微信API调用失败: {response.status_code}")
+                return None
+        
         except Exception as e:
             print(f"微信API调用异常: {e}")
             return None
@@ -59,18 +62,86 @@ class WeChatClient:
                 "openid": openid
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params)
-                
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    print(f"获取用户信息失败: {response.status_code}")
-                    return None
-                    
+            client = get_upstream_client("wechat")
+            response = await client.get(url, params=params)
+            
+            if response.status_code == 200:
+                return response.json()
+            else:
+                print(f"获取用户信息失败: {response.status_code}")
+                return None
+        
         except Exception as e:
             print(f"获取用户信息异常: {e}")
             return None
+    
+    
+    async def get_access_token(self) -> Optional[str]:
+        """获取接口调用凭证，过期前复用"""
+        if self._access_token and time.monotonic() < self._access_token_expires_at:
+            return self._access_token
+        
+        try:
+            url = f"{self.base_url}/cgi-bin/token"
+            params = {
+                "grant_type": "client_credential",
+                "appid": self.app_id,
+                "secret": self.app_secret
+            }
+            
+            client = get_upstream_client("wechat")
+            response = await client.get(url, params=params)
+            data = response.json() if response.status_code == 200 else {}
+            token = data.get("access_token")
+            if not token:
+                print(f"获取access_token失败: {response.status_code} {data}")
+                return None
+            
+            # 提前5分钟刷新
+            self._access_token = token
+            self._access_token_expires_at = time.monotonic() + data.get("expires_in", 7200) - 300
+            return token
+        
+        except Exception as e:
+            print(f"获取access_token异常: {e}")
+            return None
+    
+    async def send_subscribe_message(self, openid: str, template_id: str, data: Dict[str, Any],
+                                     page: Optional[str] = None) -> bool:
+        """发送订阅消息，返回是否成功"""
+        
+        if not self.app_id or not self.app_secret or not template_id:
+            print(f"⚠️ 微信推送配置未设置，模拟推送: {openid}")
+            return True
+        
+        access_token = await self.get_access_token()
+        if not access_token:
+            return False
+        
+        try:
+            url = f"{self.base_url}/cgi-bin/message/subscribe/send"
+            payload = {
+                "touser": openid,
+                "template_id": template_id,
+                "data": {key: {"value": value} for key, value in data.items()}
+            }
+            if page:
+                payload["page"] = page
+            
+            client = get_upstream_client("wechat")
+            response = await client.post(url, params={"access_token": access_token}, json=payload)
+            result = response.json() if response.status_code == 200 else {}
+            if result.get("errcode") == 0:
+                return True
+            if result.get("errcode") in (40001, 42001):
+                # access_token失效，下次重新获取
+                self._access_token = None
+            print(f"订阅消息发送失败: {response.status_code} {result}")
+            return False
+        
+        except Exception as e:
+            print(f"订阅消息发送异常: {e}")
+            return False
 
 
 # 创建全局实例
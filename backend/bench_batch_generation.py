@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+批量生成基准测试脚本
+对比单条生成与批量生成的吞吐量（卡片/秒）与token开销（token/卡片）
+
+用法:
+    python bench_batch_generation.py --type inspirational --cards 40 --batch-size 8
+    python bench_batch_generation.py --upstream http://127.0.0.1:8001/api/v1   # 使用已启动的模拟服务
+    python bench_batch_generation.py --real-upstream   # 请求真实DashScope（需设置 DASHSCOPE_API_KEY）
+
+默认在进程内启动模拟服务（按字符计延迟，批量回复越长耗时越久），不访问外网也不消耗配额。
+"""
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class UsageRecorder:
+    """包装AI调用，累计请求数与token用量"""
+    
+    def __init__(self, ai_generator):
+        self.requests = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self._post_generation = ai_generator._post_generation
+    
+    async def __call__(self, prompt, parameters, *args):
+        result = await self._post_generation(prompt, parameters, *args)
+        self.requests += 1
+        if result:
+            usage = result.get("usage", {})
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+        return result
+    
+    def reset(self):
+        self.requests = self.input_tokens = self.output_tokens = 0
+
+
+async def run_single(ai_generator, content_type: str, cards: int, concurrency: int) -> int:
+    """单条模式：每张卡片一次AI调用"""
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def one():
+        async with semaphore:
+            return await ai_generator.request_content(content_type)
+    
+    results = await asyncio.gather(*[one() for _ in range(cards)])
+    return sum(1 for r in results if r)
+
+
+async def run_batch(ai_generator, content_type: str, cards: int, batch_size: int, concurrency: int) -> int:
+    """批量模式：每次AI调用生成batch_size张卡片"""
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def one(count):
+        async with semaphore:
+            return await ai_generator.request_batch(content_type, count)
+    
+    batches = [min(batch_size, cards - start) for start in range(0, cards, batch_size)]
+    results = await asyncio.gather(*[one(count) for count in batches])
+    return sum(len(r) for r in results)
+
+
+def report(name: str, produced: int, elapsed: float, recorder: UsageRecorder):
+    """打印单项结果"""
+    total_tokens = recorder.input_tokens + recorder.output_tokens
+    print(f"📊 {name}")
+    print(f"   AI调用次数: {recorder.requests}")
+    print(f"   有效卡片数: {produced}")
+    print(f"   耗时: {elapsed:.2f}s")
+    print(f"   吞吐量: {produced / elapsed if elapsed else 0:.2f} 卡片/秒")
+    if produced:
+        print(f"   token开销: {total_tokens / produced:.1f} token/卡片 "
+              f"(输入 {recorder.input_tokens}, 输出 {recorder.output_tokens})")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="单条生成 vs 批量生成 基准测试")
+    parser.add_argument("--type", default="inspirational", help="内容类型")
+    parser.add_argument("--cards", type=int, default=40, help="每种模式生成的卡片数")
+    parser.add_argument("--batch-size", type=int, default=8, help="批量模式每次调用生成的条数")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发AI调用数")
+    parser.add_argument("--upstream", default=None, help="已启动的模拟服务地址，不指定时在进程内启动")
+    parser.add_argument("--real-upstream", action="store_true",
+                        help="请求 QWEN_BASE_URL 指定的真实服务（需设置 DASHSCOPE_API_KEY）")
+    parser.add_argument("--token-delay", type=float, default=0.03, help="模拟服务每个字符的输出耗时（秒）")
+    args = parser.parse_args()
+    
+    if args.real_upstream and not os.getenv("DASHSCOPE_API_KEY"):
+        parser.error("--real-upstream 需要设置环境变量 DASHSCOPE_API_KEY")
+    
+    server = None
+    server_task = None
+    if not args.real_upstream:
+        if args.upstream is None:
+            import uvicorn
+            import fake_dashscope
+            fake_dashscope.configure("token", args.token_delay)
+            port = free_port()
+            server = uvicorn.Server(uvicorn.Config(fake_dashscope.app, host="127.0.0.1", port=port, log_level="warning"))
+            server_task = asyncio.create_task(server.serve())
+            while not server.started:
+                await asyncio.sleep(0.05)
+            args.upstream = f"http://127.0.0.1:{port}/api/v1"
+        # 配置需在导入app之前写入环境变量
+        os.environ["QWEN_BASE_URL"] = args.upstream
+        os.environ["DASHSCOPE_API_KEY"] = "bench"
+    os.environ.setdefault("AI_RATE_LIMIT_QPS", "0")
+    os.environ.setdefault("AI_TOKEN_LIMIT_PER_MINUTE", "0")
+    
+    from app.utils.ai_generator import ai_generator
+    from app.utils.http_client import upstream_clients
+    
+    recorder = UsageRecorder(ai_generator)
+    ai_generator._post_generation = recorder
+    
+    print("🚀 开始生成基准测试...")
+    print(f"   上游: {ai_generator.base_url}")
+    print("=" * 50)
+    
+    try:
+        start = time.perf_counter()
+        produced = await run_single(ai_generator, args.type, args.cards, args.concurrency)
+        report("单条生成", produced, time.perf_counter() - start, recorder)
+        
+        recorder.reset()
+        start = time.perf_counter()
+        produced = await run_batch(ai_generator, args.type, args.cards, args.batch_size, args.concurrency)
+        report(f"批量生成 (每次{args.batch_size}条)", produced, time.perf_counter() - start, recorder)
+    finally:
+        await upstream_clients.close()
+        if server is not None:
+            server.should_exit = True
+            await server_task
+    
+    print("=" * 50)
+    print("🎉 基准测试完成！")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
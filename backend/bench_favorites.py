@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+收藏列表基准测试脚本
+在临时SQLite数据库上对比收藏列表的两种查询方式，按页统计耗时与内存峰值：
+- orm: 查询Favorite实体并selectinload卡片，再单独查询点赞状态，逐个to_dict
+- projection: 一条JOIN投影查询取出响应字段与点赞状态，结果行直接序列化
+
+用法:
+    python bench_favorites.py --favorites 5000 --pages 50 --page-sizes 20 100
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 配置需在导入app之前写入环境变量
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_favorites_'), 'bench.db')}"
+os.environ["DEBUG"] = "False"
+
+from datetime import date, datetime, timedelta
+from sqlalchemy import insert, select
+from sqlalchemy.orm import selectinload
+
+from app.database import AsyncSessionLocal, init_db, close_db
+from app.models.card import Card
+from app.models.favorite import Favorite
+from app.models.interaction import UserCardInteraction
+from app.models.user import User
+from app.utils.favorites import favorite_cards_page
+from app.utils.likes import liked_card_ids
+from app.utils.pagination import paginate
+
+USER_ID = 1
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="收藏列表：ORM实体 vs 列投影")
+    parser.add_argument("--favorites", type=int, default=5000, help="测试用户的收藏数")
+    parser.add_argument("--cards", type=int, default=20000)
+    parser.add_argument("--pages", type=int, default=50, help="每种方式连续翻页的页数")
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[20, 100])
+    return parser.parse_args()
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+async def seed(args):
+    """写入卡片与一个用户的收藏（其中约三分之一已点赞）"""
+    rng = random.Random(0)
+    today = date.today()
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(User.__table__), [{"id": USER_ID, "openid": "bench-favorites"}])
+        await db.execute(insert(Card.__table__), [
+            {"id": i, "content": f"基准测试卡片{i}，生活不会辜负每一个努力的人。", "type": "poetry",
+             "background_style": "gradient-blue", "generate_date": today - timedelta(days=i // 3),
+             "likes": rng.randint(0, 500), "is_generated": True, "is_daily": False,
+             "created_at": datetime.now()}
+            for i in range(1, args.cards + 1)
+        ])
+        card_ids = rng.sample(range(1, args.cards + 1), args.favorites)
+        await db.execute(insert(Favorite.__table__), [
+            {"user_id": USER_ID, "card_id": card_id, "created_at": datetime.now() - timedelta(minutes=i)}
+            for i, card_id in enumerate(card_ids)
+        ])
+        await db.execute(insert(UserCardInteraction.__table__), [
+            {"user_id": USER_ID, "card_id": card_id, "viewed": True, "liked": True}
+            for card_id in card_ids[::3]
+        ])
+        await db.commit()
+
+
+async def orm_page(db, limit, cursor):
+    """原实现：实体查询 + selectinload + 点赞状态IN查询"""
+    query = (
+        select(Favorite)
+        .where(Favorite.user_id == USER_ID)
+        .join(Card)
+        .options(selectinload(Favorite.card))
+    )
+    favorites, _, next_cursor = await paginate(db, query, [Favorite.created_at, Favorite.id], limit, cursor)
+    liked = await liked_card_ids(db, USER_ID, [favorite.card_id for favorite in favorites])
+    cards = []
+    for favorite in favorites:
+        card_dict = favorite.card.to_dict()
+        card_dict["is_favorited"] = True
+        card_dict["is_liked"] = favorite.card_id in liked
+        cards.append(card_dict)
+    return cards, next_cursor
+
+
+async def projection_page(db, limit, cursor):
+    cards, _, next_cursor = await favorite_cards_page(db, USER_ID, limit, cursor, with_liked=True)
+    return cards, next_cursor
+
+
+async def walk(fetch, limit, pages, trace_memory=False):
+    """连续翻页，每页一个会话（与请求级会话一致），返回每页耗时、内存峰值与各页结果"""
+    timings, peaks, results = [], [], []
+    cursor = None
+    for _ in range(pages):
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            cards, cursor = await fetch(db, limit, cursor)
+        timings.append(time.perf_counter() - start)
+        if trace_memory:
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        results.append(cards)
+        if cursor is None:
+            break
+    return timings, peaks, results
+
+
+async def main():
+    args = parse_args()
+    print("🚀 开始收藏列表基准测试...")
+    print(f"   卡片 {args.cards}, 收藏 {args.favorites}, 每种方式翻 {args.pages} 页")
+    await init_db()
+    await seed(args)
+    
+    print("=" * 50)
+    for limit in args.page_sizes:
+        print(f"📊 每页 {limit} 条")
+        baseline = None
+        for name, fetch in [("orm", orm_page), ("projection", projection_page)]:
+            # 预热一次，排除首次编译语句的开销
+            await walk(fetch, limit, 1)
+            timings, _, results = await walk(fetch, limit, args.pages)
+            _, peaks, _ = await walk(fetch, limit, args.pages, trace_memory=True)
+            if baseline is None:
+                baseline = results
+            else:
+                assert results == baseline, f"{name} 的结果与orm不一致"
+            print(f"   {name:<10} p50 {percentile(timings, 50) * 1000:.2f}ms, p95 {percentile(timings, 95) * 1000:.2f}ms, "
+                  f"内存峰值/页 p50 {percentile(peaks, 50) / 1024:.0f}KB")
+    print("=" * 50)
+    
+    await close_db()
+    print("🎉 基准测试完成！两种方式各页结果一致")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+生成链路吞吐量基准测试脚本
+在本地DashScope模拟服务上压测三条生成路径，输出吞吐量与p50/p95/p99延迟：
+
+    generator  直接调用 AIGenerator.request_content
+    daily      每日卡片路径 get_or_create_daily_card（每次使用不同日期，均触发真实生成）
+    api        POST /api/cards/generate（进程内ASGI调用，包含路由与数据库写入）
+
+用法:
+    python bench_generation.py --requests 200 --concurrency 20
+    python bench_generation.py --scenarios api --latency lognormal --latency-mean 0.3 --error-rate 0.05
+    python bench_generation.py --upstream http://127.0.0.1:8001/api/v1   # 使用已启动的模拟服务
+
+默认在进程内启动模拟服务，使用临时SQLite数据库，并关闭内容池、去重与准入限流，
+以便单独测量生成链路本身；可通过对应环境变量覆盖。
+"""
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ["generator", "daily", "api"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="生成链路吞吐量基准测试")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="逗号分隔: " + ", ".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="每个场景的请求数")
+    parser.add_argument("--concurrency", type=int, default=20, help="并发数")
+    parser.add_argument("--type", default="inspirational", help="内容类型")
+    parser.add_argument("--upstream", default=None, help="已启动的模拟服务地址，不指定时在进程内启动")
+    parser.add_argument("--latency", default="lognormal", choices=["token", "fixed", "uniform", "lognormal"])
+    parser.add_argument("--token-delay", type=float, default=0.03)
+    parser.add_argument("--latency-mean", type=float, default=0.2)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    return parser.parse_args()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+async def run_load(name: str, func, total: int, concurrency: int):
+    """以固定并发执行total次func，func返回是否成功"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+    
+    async def one(index: int):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                ok = await func(index)
+            except Exception as e:
+                print(f"   ❌ {name}: {e!r}")
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                failures += 1
+    
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(total)])
+    elapsed = time.perf_counter() - start
+    
+    print(f"📊 {name}")
+    print(f"   请求数: {total} (失败/降级 {failures})")
+    print(f"   耗时: {elapsed:.2f}s")
+    print(f"   吞吐量: {total / elapsed:.1f} 请求/秒")
+    print(f"   延迟: p50 {percentile(latencies, 50) * 1000:.0f}ms, "
+          f"p95 {percentile(latencies, 95) * 1000:.0f}ms, "
+          f"p99 {percentile(latencies, 99) * 1000:.0f}ms")
+
+
+async def main():
+    args = parse_args()
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    
+    server = None
+    server_task = None
+    if args.upstream is None:
+        import uvicorn
+        import fake_dashscope
+        fake_dashscope.configure(args.latency, args.token_delay, args.latency_mean,
+                                 args.latency_sigma, args.error_rate)
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(fake_dashscope.app, host="127.0.0.1", port=port, log_level="warning"))
+        server_task = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.05)
+        args.upstream = f"http://127.0.0.1:{port}/api/v1"
+    
+    # 配置需在导入app之前写入环境变量
+    db_dir = tempfile.mkdtemp(prefix="bench_generation_")
+    os.environ["QWEN_BASE_URL"] = args.upstream
+    os.environ.setdefault("DASHSCOPE_API_KEY", "bench")
+    os.environ.setdefault("DEBUG", "False")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(db_dir, 'bench.db')}")
+    os.environ.setdefault("CONTENT_POOL_ENABLED", "False")
+    os.environ.setdefault("CONTENT_DEDUP_ENABLED", "False")
+    os.environ.setdefault("AI_RATE_LIMIT_QPS", "0")
+    os.environ.setdefault("AI_TOKEN_LIMIT_PER_MINUTE", "0")
+    
+    import httpx
+    from main import app
+    from app.database import init_db
+    from app.utils.ai_generator import ai_generator
+    from app.utils.daily_card import get_or_create_daily_card
+    
+    print("🚀 开始生成链路基准测试...")
+    print(f"   上游: {args.upstream}")
+    print(f"   请求数: {args.requests}, 并发: {args.concurrency}")
+    print("=" * 50)
+    
+    async def call_generator(index: int) -> bool:
+        return await ai_generator.request_content(args.type) is not None
+    
+    async def call_daily(index: int) -> bool:
+        card = await get_or_create_daily_card(args.type, date.today() - timedelta(days=index + 1))
+        return card is not None
+    
+    await init_db()
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                async def call_api(index: int) -> bool:
+                    response = await client.post("/api/cards/generate", json={"type": args.type}, timeout=60)
+                    return response.status_code == 200 and response.json().get("success")
+                
+                handlers = {"generator": call_generator, "daily": call_daily, "api": call_api}
+                for name in scenarios:
+                    await run_load(name, handlers[name], args.requests, args.concurrency)
+    finally:
+        if server is not None:
+            server.should_exit = True
+            await server_task
+    
+    print("=" * 50)
+    print("🎉 基准测试完成！")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
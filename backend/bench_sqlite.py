@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+SQLite读写混合负载基准测试脚本
+分别在默认配置（SQLITE_TUNING=False）与生产配置（WAL、读写连接分离、写事务串行化）下，
+用多个进程并发执行历史列表读取与点赞/收藏写入，对比吞吐量、延迟与 database is locked 错误数；
+并在当天还没有每日卡片时由多个进程同时发起大量 /daily 请求（AI生成以固定耗时模拟），
+检查首批请求是否因连接池耗尽而超时，以及每个类型是否只生成了一张每日卡片。
+
+用法:
+    python bench_sqlite.py --processes 2 --concurrency 16 --duration 10 --write-ratio 0.2
+    python bench_sqlite.py --daily-requests 64 --ai-latency 1.0
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {"default": "False", "tuned": "True"}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="SQLite读写混合负载基准测试")
+    parser.add_argument("--processes", type=int, default=2, help="并发进程数（模拟API进程与worker）")
+    parser.add_argument("--concurrency", type=int, default=16, help="每个进程的并发协程数")
+    parser.add_argument("--duration", type=float, default=10, help="每种配置的压测时长（秒）")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="写操作占比")
+    parser.add_argument("--cards", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--daily-requests", type=int, default=64,
+                        help="每个进程并发的当天首次 /daily 请求数（0为跳过该场景）")
+    parser.add_argument("--ai-latency", type=float, default=1.0, help="模拟的每日卡片AI生成耗时（秒）")
+    parser.add_argument("--daily-timeout", type=float, default=30, help="单个 /daily 请求的超时时间（秒）")
+    parser.add_argument("--role", choices=["setup", "worker", "daily"], default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--seed", type=int, default=0, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+async def setup(args):
+    """执行迁移并写入测试数据"""
+    from datetime import date, timedelta
+    from app.database import AsyncSessionLocal, init_db, close_db
+    from app.models import Card, User
+    
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        db.add_all([User(openid=f"bench-{i}") for i in range(args.users)])
+        db.add_all([
+            Card(content=f"基准测试卡片{i}", type=random.choice(["inspirational", "poetry", "philosophy"]),
+                 generate_date=date.today() - timedelta(days=i // 3), likes=0)
+            for i in range(args.cards)
+        ])
+        await db.commit()
+    await close_db()
+
+
+async def worker(args):
+    """在限定时长内循环执行读写操作，输出JSON统计"""
+    from sqlalchemy import select, update, delete
+    from sqlalchemy.exc import IntegrityError, OperationalError
+    from app.database import AsyncSessionLocal, close_db
+    from app.models import Card, Favorite
+    
+    rng = random.Random(args.seed)
+    stats = {"read": [], "write": [], "locked": 0, "conflicts": 0}
+    deadline = time.perf_counter() + args.duration
+    
+    async def read_history(db):
+        offset = rng.randrange(0, args.cards // 2)
+        cards = (await db.execute(
+            select(Card).order_by(Card.generate_date.desc(), Card.id.desc()).offset(offset).limit(20)
+        )).scalars().all()
+        await db.execute(select(Favorite.card_id).where(
+            Favorite.user_id == rng.randint(1, args.users),
+            Favorite.card_id.in_([card.id for card in cards])
+        ))
+    
+    async def write_interaction(db):
+        user_id, card_id = rng.randint(1, args.users), rng.randint(1, args.cards)
+        if rng.random() < 0.5:
+            await db.execute(update(Card).where(Card.id == card_id).values(likes=Card.likes + 1))
+        else:
+            existing = (await db.execute(select(Favorite.id).where(
+                Favorite.user_id == user_id, Favorite.card_id == card_id
+            ))).scalar()
+            if existing:
+                await db.execute(delete(Favorite).where(Favorite.id == existing))
+            else:
+                db.add(Favorite(user_id=user_id, card_id=card_id))
+        await db.commit()
+    
+    async def loop():
+        while time.perf_counter() < deadline:
+            kind = "write" if rng.random() < args.write_ratio else "read"
+            start = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    await (write_interaction(db) if kind == "write" else read_history(db))
+                stats[kind].append(time.perf_counter() - start)
+            except IntegrityError:
+                stats["conflicts"] += 1
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                stats["locked"] += 1
+    
+    await asyncio.gather(*[loop() for _ in range(args.concurrency)])
+    await close_db()
+    print(json.dumps(stats))
+
+
+async def daily_worker(args):
+    """当天还没有每日卡片时并发发起 /daily 请求，输出JSON统计"""
+    import httpx
+    from app.utils import daily_card
+    from app.utils.auth import create_access_token
+    from main import app
+    
+    async def simulated_generation(card_type: str) -> str:
+        await asyncio.sleep(args.ai_latency)
+        return f"基准测试每日卡片（{card_type}）"
+    
+    # 只模拟AI耗时，数据库访问与生成合并逻辑保持原样
+    daily_card.generate_card_content = simulated_generation
+    stats = {"daily": [], "errors": 0, "timeouts": 0, "card_ids": []}
+    
+    async def request(client, user_id):
+        start = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(client.get(
+                "/api/cards/daily",
+                headers={"Authorization": f"Bearer {create_access_token({'user_id': user_id})}"}
+            ), args.daily_timeout)
+        except asyncio.TimeoutError:
+            stats["timeouts"] += 1
+            return
+        except Exception:
+            stats["errors"] += 1
+            return
+        if response.status_code != 200:
+            stats["errors"] += 1
+            return
+        stats["daily"].append(time.perf_counter() - start)
+        stats["card_ids"].append(response.json()["data"]["id"])
+    
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await asyncio.gather(*[
+                request(client, (args.seed * args.daily_requests + i) % args.users + 1)
+                for i in range(args.daily_requests)
+            ])
+    stats["card_ids"] = sorted(set(stats["card_ids"]))
+    print(json.dumps(stats))
+
+
+def run_mode(name: str, tuning: str, args, role: str = "worker") -> dict:
+    db_dir = tempfile.mkdtemp(prefix=f"bench_sqlite_{name}_")
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(db_dir, 'bench.db')}",
+        SQLITE_TUNING=tuning,
+        DEBUG="False",
+        DASHSCOPE_API_KEY="",
+        CONTENT_POOL_ENABLED="False",
+        CONTENT_DEDUP_ENABLED="False",
+        CELERY_ENABLED="False"
+    )
+    base = [sys.executable, os.path.abspath(__file__), "--cards", str(args.cards), "--users", str(args.users),
+            "--concurrency", str(args.concurrency), "--duration", str(args.duration),
+            "--write-ratio", str(args.write_ratio), "--daily-requests", str(args.daily_requests),
+            "--ai-latency", str(args.ai_latency), "--daily-timeout", str(args.daily_timeout)]
+    subprocess.run(base + ["--role", "setup"], env=env, check=True, stdout=subprocess.DEVNULL)
+    
+    workers = [
+        subprocess.Popen(base + ["--role", role, "--seed", str(i)], env=env, stdout=subprocess.PIPE, text=True)
+        for i in range(args.processes)
+    ]
+    if role == "daily":
+        merged = {"daily": [], "errors": 0, "timeouts": 0, "card_ids": []}
+    else:
+        merged = {"read": [], "write": [], "locked": 0, "conflicts": 0}
+    for process in workers:
+        output, _ = process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"{name} 压测进程异常退出")
+        stats = json.loads(output.strip().splitlines()[-1])
+        for key in merged:
+            merged[key] += stats[key]
+    return merged
+
+
+def report(name: str, stats: dict, duration: float):
+    total = len(stats["read"]) + len(stats["write"])
+    print(f"📊 {name}")
+    print(f"   吞吐量: {total / duration:.0f} 操作/秒 (读 {len(stats['read']) / duration:.0f}, 写 {len(stats['write']) / duration:.0f})")
+    for kind in ["read", "write"]:
+        samples = stats[kind]
+        print(f"   {kind}: p50 {percentile(samples, 50) * 1000:.1f}ms, "
+              f"p99 {percentile(samples, 99) * 1000:.1f}ms")
+    print(f"   database is locked: {stats['locked']}, 唯一约束冲突: {stats['conflicts']}")
+
+
+def report_daily(name: str, stats: dict, args):
+    samples = stats["daily"]
+    print(f"📊 {name}: 当天首批 /daily 请求（{args.processes} 进程 × {args.daily_requests} 并发，"
+          f"AI生成耗时 {args.ai_latency}s）")
+    print(f"   成功: {len(samples)}, 失败: {stats['errors']}, 超时: {stats['timeouts']}")
+    print(f"   p50 {percentile(samples, 50) * 1000:.1f}ms, p99 {percentile(samples, 99) * 1000:.1f}ms, "
+          f"最慢 {percentile(samples, 100) * 1000:.1f}ms")
+    # 所有进程的首批请求应拿到同一张每日卡片
+    print(f"   每日卡片数: {len(set(stats['card_ids']))}")
+
+
+def main():
+    args = parse_args()
+    if args.role == "setup":
+        asyncio.run(setup(args))
+        return
+    if args.role == "worker":
+        asyncio.run(worker(args))
+        return
+    if args.role == "daily":
+        asyncio.run(daily_worker(args))
+        return
+    
+    print("🚀 开始SQLite读写混合负载基准测试...")
+    print(f"   进程数: {args.processes}, 每进程并发: {args.concurrency}, 写占比: {args.write_ratio:.0%}, 时长: {args.duration}s")
+    print("=" * 50)
+    for name, tuning in MODES.items():
+        report(name, run_mode(name, tuning, args), args.duration)
+    if args.daily_requests > 0:
+        print("=" * 50)
+        for name, tuning in MODES.items():
+            report_daily(name, run_mode(name, tuning, args, role="daily"), args)
+    print("=" * 50)
+    print("🎉 基准测试完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+数据导入导出脚本
+以NDJSON或CSV格式流式导出/导入卡片、用户、收藏与交互记录，内存占用与数据量无关：
+导出按id分批读取，导入逐行解析并按批次executemany插入，每批一个事务。
+
+导入时每提交一批即记录进度到 <文件>.progress，中断后加 --resume 从断点继续
+（断点所在批次中已存在的id会被跳过）。导出保留id，按 users、cards、favorites、interactions 的顺序导入即可还原关联。
+
+用法:
+    python data_io.py export cards cards.ndjson
+    python data_io.py export favorites favorites.csv --batch-size 5000
+    python data_io.py import cards cards.ndjson
+    python data_io.py import cards cards.ndjson --resume
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import asyncio
+import argparse
+from datetime import date, datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import insert, select, text
+
+from app.database import AsyncSessionLocal, init_db, close_db
+from app.models.user import User
+from app.models.card import Card
+from app.models.favorite import Favorite
+from app.models.interaction import UserCardInteraction
+from app.utils.user_stats import reconcile_user_stats
+
+TABLES = {
+    "users": User.__table__,
+    "cards": Card.__table__,
+    "favorites": Favorite.__table__,
+    "interactions": UserCardInteraction.__table__
+}
+
+FORMATS = ("ndjson", "csv")
+
+# 进度输出间隔（秒）
+REPORT_INTERVAL = 2.0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="卡片、用户、收藏与交互记录的NDJSON/CSV导入导出")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("table", choices=list(TABLES))
+    parser.add_argument("path", help="数据文件路径")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="默认按文件扩展名判断（.csv为CSV，其余为NDJSON）")
+    parser.add_argument("--batch-size", type=int, default=10000, help="每批读取/插入的行数")
+    parser.add_argument("--resume", action="store_true", help="从上次导入中断的位置继续")
+    return parser.parse_args()
+
+
+def detect_format(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+class Progress:
+    """按时间间隔输出处理行数与速率"""
+    
+    def __init__(self, label: str, start_rows: int = 0):
+        self.label = label
+        self.rows = start_rows
+        self.start_rows = start_rows
+        self.started = time.perf_counter()
+        self.reported = self.started
+    
+    def add(self, rows: int):
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self.reported >= REPORT_INTERVAL:
+            self.reported = now
+            print(f"   {self.label}: {self.rows} 行, {self.rate():.0f} 行/秒")
+    
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return (self.rows - self.start_rows) / elapsed if elapsed > 0 else 0.0
+    
+    def finish(self):
+        elapsed = time.perf_counter() - self.started
+        print(f"✅ {self.label}完成: {self.rows - self.start_rows} 行, 耗时 {elapsed:.1f}s, {self.rate():.0f} 行/秒")
+
+
+# ---------- 值编码 ----------
+
+# 复用同一个编码器，避免每行json.dumps重新构造
+json_encoder = json.JSONEncoder(ensure_ascii=False)
+
+
+def _parse_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "t", "yes")
+    return bool(value)
+
+
+def _parse_temporal(python_type) -> Callable:
+    def parse(value):
+        return python_type.fromisoformat(value) if isinstance(value, str) else value
+    return parse
+
+
+def column_converters(table) -> Dict[str, Callable]:
+    """按列类型生成解析函数，NDJSON原生值与CSV字符串均可处理"""
+    converters = {}
+    for column in table.columns:
+        python_type = column.type.python_type
+        if python_type is bool:
+            parse = _parse_bool
+        elif python_type in (date, datetime):
+            parse = _parse_temporal(python_type)
+        else:
+            parse = python_type
+        # CSV中的空字符串：可空列与非文本列视为NULL，不可空的文本列保留空串
+        empty_is_null = column.nullable or python_type is not str
+        
+        def convert(value, parse=parse, empty_is_null=empty_is_null):
+            if value is None or (value == "" and empty_is_null):
+                return None
+            return parse(value)
+        
+        converters[column.name] = convert
+    return converters
+
+
+# ---------- 读写文件 ----------
+
+def read_records(path: str, fmt: str) -> Iterator[dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class RecordWriter:
+    def __init__(self, f, fmt: str, table):
+        self.f = f
+        self.fmt = fmt
+        self.columns = [column.name for column in table.columns]
+        # 只有日期时间列需要转换为ISO字符串
+        self.temporal = [
+            index for index, column in enumerate(table.columns)
+            if column.type.python_type in (date, datetime)
+        ]
+        if fmt == "csv":
+            # csv模块将None写为空串，日期时间写为str()，与导入时的解析对应
+            self.writer = csv.writer(f)
+            self.writer.writerow(self.columns)
+    
+    def _json_line(self, row) -> str:
+        values = list(row)
+        for index in self.temporal:
+            if values[index] is not None:
+                values[index] = values[index].isoformat()
+        return json_encoder.encode(dict(zip(self.columns, values))) + "\n"
+    
+    def write_rows(self, rows):
+        if self.fmt == "csv":
+            self.writer.writerows(rows)
+        else:
+            self.f.writelines(self._json_line(row) for row in rows)
+
+
+# ---------- 导出 ----------
+
+async def export_table(table_name: str, path: str, fmt: str, batch_size: int):
+    """按id分批读取并写出，内存中最多保留一批"""
+    table = TABLES[table_name]
+    progress = Progress(f"导出 {table_name}")
+    last_id = 0
+    
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = RecordWriter(f, fmt, table)
+        while True:
+            async with AsyncSessionLocal() as db:
+                rows = (await db.execute(
+                    select(table).where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+                )).all()
+            if not rows:
+                break
+            writer.write_rows(rows)
+            last_id = rows[-1].id
+            progress.add(len(rows))
+    progress.finish()
+
+
+# ---------- 导入 ----------
+
+def checkpoint_path(path: str) -> str:
+    return f"{path}.progress"
+
+
+def load_checkpoint(path: str, table_name: str) -> int:
+    try:
+        with open(checkpoint_path(path), encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return 0
+    if checkpoint.get("table") != table_name:
+        raise SystemExit(f"❌ 断点文件属于 {checkpoint.get('table')} 表，与本次导入的 {table_name} 不一致")
+    return int(checkpoint.get("rows", 0))
+
+
+def save_checkpoint(path: str, table_name: str, rows: int):
+    """先写临时文件再替换，中断时断点文件不会损坏"""
+    tmp = checkpoint_path(path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"table": table_name, "rows": rows}, f)
+    os.replace(tmp, checkpoint_path(path))
+
+
+def batched_rows(records: Iterator[dict], table, batch_size: int, skip: int) -> Iterator[List[dict]]:
+    """跳过已导入的行，将记录转换为列值并按batch_size分批；列以第一条记录为准"""
+    converters = column_converters(table)
+    columns: Optional[List[str]] = None
+    batch: List[dict] = []
+    for index, record in enumerate(records):
+        if index < skip:
+            continue
+        if columns is None:
+            columns = [name for name in record if name in converters]
+        batch.append({name: converters[name](record.get(name)) for name in columns})
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _drop_existing(db, table, batch: List[dict]) -> List[dict]:
+    """断点续传的第一批可能已在中断前提交，按id去掉已存在的行"""
+    ids = [row["id"] for row in batch if row.get("id") is not None]
+    if not ids:
+        return batch
+    existing = set((await db.execute(select(table.c.id).where(table.c.id.in_(ids)))).scalars())
+    return [row for row in batch if row.get("id") not in existing]
+
+
+async def reset_sequence(table):
+    """PostgreSQL下显式插入id后，将自增序列推进到当前最大id"""
+    async with AsyncSessionLocal() as db:
+        if db.bind.dialect.name != "postgresql":
+            return
+        await db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+        ))
+        await db.commit()
+
+
+async def import_table(table_name: str, path: str, fmt: str, batch_size: int, resume: bool):
+    table = TABLES[table_name]
+    done = load_checkpoint(path, table_name) if resume else 0
+    if done:
+        print(f"⏩ 从第 {done} 行之后继续导入")
+    progress = Progress(f"导入 {table_name}", done)
+    statement = insert(table)
+    
+    first = True
+    for batch in batched_rows(read_records(path, fmt), table, batch_size, done):
+        try:
+            async with AsyncSessionLocal() as db:
+                rows = await _drop_existing(db, table, batch) if first and done else batch
+                if rows:
+                    # 整批一次executemany，一个事务提交
+                    await db.execute(statement, rows)
+                await db.commit()
+        except Exception as e:
+            print(f"❌ 第 {progress.rows + 1} 行起的批次导入失败: {e}")
+            print(f"   已导入 {progress.rows} 行，修正后使用 --resume 继续")
+            raise SystemExit(1)
+        first = False
+        progress.add(len(batch))
+        save_checkpoint(path, table_name, progress.rows)
+    
+    await reset_sequence(table)
+    # 导入的用户、卡片、收藏与交互记录不经过计数事件，按明细表重算全部用户统计计数
+    async with AsyncSessionLocal() as db:
+        await reconcile_user_stats(db)
+        await db.commit()
+    
+    if os.path.exists(checkpoint_path(path)):
+        os.remove(checkpoint_path(path))
+    progress.finish()
+
+
+async def main():
+    args = parse_args()
+    fmt = detect_format(args.path, args.format)
+    await init_db()
+    try:
+        if args.action == "export":
+            print(f"📤 导出 {args.table} -> {args.path} ({fmt})")
+            await export_table(args.table, args.path, fmt, args.batch_size)
+        else:
+            print(f"📥 导入 {args.path} ({fmt}) -> {args.table}")
+            await import_table(args.table, args.path, fmt, args.batch_size, args.resume)
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+本地DashScope模拟服务
+实现 /services/aigc/text-generation/generation 接口（含SSE流式输出与usage字段），用于离线开发、压测与测试
+
+用法:
+    python fake_dashscope.py --port 8001
+    python fake_dashscope.py --latency lognormal --latency-mean 0.8 --latency-sigma 0.5 --error-rate 0.05
+    QWEN_BASE_URL=http://127.0.0.1:8001/api/v1 python main.py
+
+延迟分布（--latency）:
+    token      按输出字符数 × --token-delay（默认）
+    fixed      固定 --latency-mean 秒
+    uniform    [0, 2 × --latency-mean] 均匀分布
+    lognormal  均值为 --latency-mean、对数标准差为 --latency-sigma 的对数正态分布
+流式输出时按分布采样的总耗时平均分摊到每个字符。
+"""
+
+import re
+import json
+import math
+import uuid
+import random
+import asyncio
+import argparse
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+SAMPLE_CONTENTS = [
+    "今天的努力，是明天的实力。",
+    "每一次坚持，都是在为梦想铺路。",
+    "相信自己，你比想象中更强大。",
+    "风很轻，云很淡，\n心很静，梦很远。",
+    "把每一天都过成诗，\n把每一步都走成歌。",
+    "人生最精彩的不是实现梦想的瞬间，而是坚持梦想的过程。",
+    "有时候，放下不是失去，而是另一种获得。",
+    "真正的成长，是学会与自己和解。"
+]
+
+# 与 app.utils.ai_generator.BATCH_PROMPT_TEMPLATE 对应
+BATCH_COUNT_PATTERN = re.compile(r"一次生成(\d+)条")
+
+# 模拟错误：(HTTP状态码, DashScope错误码, 错误信息)
+ERROR_RESPONSES = [
+    (429, "Throttling.RateQuota", "Requests rate limit exceeded, please try again later."),
+    (500, "InternalError", "An internal error has occured, please try again later."),
+    (503, "ServiceUnavailable", "The service is temporarily unavailable.")
+]
+
+app = FastAPI(title="DashScope模拟服务")
+
+
+def configure(latency: str = "token", token_delay: float = 0.03, latency_mean: float = 0.5,
+              latency_sigma: float = 0.5, error_rate: float = 0.0):
+    """设置模拟服务的延迟分布与错误率（也供基准测试脚本在进程内调用）"""
+    app.state.latency = latency
+    app.state.token_delay = token_delay
+    app.state.latency_mean = latency_mean
+    app.state.latency_sigma = latency_sigma
+    app.state.error_rate = error_rate
+
+
+configure()
+
+
+def sample_latency(text: str) -> float:
+    """按配置的分布采样一次回复的总耗时（秒）"""
+    kind = app.state.latency
+    mean = app.state.latency_mean
+    if kind == "fixed":
+        return mean
+    if kind == "uniform":
+        return random.uniform(0, 2 * mean)
+    if kind == "lognormal":
+        sigma = app.state.latency_sigma
+        return random.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+    return app.state.token_delay * len(text)
+
+
+def build_text(prompt: str) -> str:
+    """根据提示词构造回复，批量提示词返回按分隔符拼接的多条内容"""
+    match = BATCH_COUNT_PATTERN.search(prompt)
+    if not match:
+        return random.choice(SAMPLE_CONTENTS)
+    count = int(match.group(1))
+    items = [f"{random.choice(SAMPLE_CONTENTS)}（{uuid.uuid4().hex[:6]}）" for _ in range(count)]
+    return "\n###\n".join(items)
+
+
+def build_usage(prompt: str, text: str) -> dict:
+    """按字符数近似估算token用量"""
+    input_tokens = len(prompt)
+    output_tokens = len(text)
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens
+    }
+
+
+def build_output(texts, finish_reason: str = "stop") -> dict:
+    return {
+        "choices": [
+            {"finish_reason": finish_reason, "message": {"role": "assistant", "content": text}}
+            for text in texts
+        ]
+    }
+
+
+@app.post("/api/v1/services/aigc/text-generation/generation")
+async def generation(request: Request):
+    body = await request.json()
+    prompt = body["input"]["messages"][-1]["content"]
+    parameters = body.get("parameters", {})
+    request_id = str(uuid.uuid4())
+    
+    if random.random() < app.state.error_rate:
+        status, code, message = random.choice(ERROR_RESPONSES)
+        return JSONResponse({"code": code, "message": message, "request_id": request_id}, status_code=status)
+    
+    if request.headers.get("X-DashScope-SSE") == "enable":
+        text = build_text(prompt)
+        incremental = parameters.get("incremental_output", False)
+        delay = sample_latency(text) / max(1, len(text))
+        
+        async def event_stream():
+            for index in range(len(text)):
+                await asyncio.sleep(delay)
+                done = index == len(text) - 1
+                content = text[index] if incremental else text[:index + 1]
+                chunk = {
+                    "output": build_output([content], "stop" if done else "null"),
+                    "usage": build_usage(prompt, text[:index + 1]),
+                    "request_id": request_id
+                }
+                yield f"id:{index + 1}\nevent:result\n:HTTP_STATUS/200\ndata:{json.dumps(chunk, ensure_ascii=False)}\n\n"
+        
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+    
+    texts = [build_text(prompt) for _ in range(int(parameters.get("n", 1)))]
+    await asyncio.sleep(sample_latency("".join(texts)))
+    usage = build_usage(prompt, "".join(texts))
+    return JSONResponse({"output": build_output(texts), "usage": usage, "request_id": request_id})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地DashScope模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", default="token", choices=["token", "fixed", "uniform", "lognormal"],
+                        help="延迟分布")
+    parser.add_argument("--token-delay", type=float, default=0.03, help="token分布下每个输出字符的模拟耗时（秒）")
+    parser.add_argument("--latency-mean", type=float, default=0.5, help="fixed/uniform/lognormal分布的平均耗时（秒）")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal分布的对数标准差")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回429/500/503错误的比例")
+    args = parser.parse_args()
+    
+    configure(args.latency, args.token_delay, args.latency_mean, args.latency_sigma, args.error_rate)
+    print(f"🤖 DashScope模拟服务: http://{args.host}:{args.port}/api/v1 "
+          f"(延迟: {args.latency}, 错误率: {args.error_rate:.0%})")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
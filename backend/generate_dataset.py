@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+基准测试数据集生成脚本
+按固定随机种子生成接近生产分布的数据，用于在生产规模下检查分页、收藏查询的性能与执行计划：
+- 卡片：覆盖数年，每天每种类型一张每日卡片，另有按类型偏斜分布的手动生成卡片
+- 用户：偏好类型、推送时间、自动推送开关按实际比例分布，注册时间分散在整个区间内
+- 浏览/点赞/收藏：每个用户的活跃度服从帕累托分布（少数重度用户贡献大部分交互），
+  卡片热度偏向近期与每日卡片；卡片点赞数与用户统计计数和明细记录一致
+
+数据以executemany分批写入，需在空数据库上运行。
+
+用法:
+    python generate_dataset.py --preset small
+    python generate_dataset.py --preset large --seed 7 --batch-size 20000
+    DATABASE_URL=sqlite:///./bench.db python generate_dataset.py --preset medium --users 500000
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+from array import array
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Dict, Iterator, List
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import bindparam, func, insert, select, update
+
+from app.config import settings
+from app.database import AsyncSessionLocal, init_db, close_db
+from app.models.user import User
+from app.models.card import Card
+from app.models.favorite import Favorite
+from app.models.interaction import UserCardInteraction
+from data_io import Progress, reset_sequence
+
+# 数据规模预设：每个用户的浏览/点赞/收藏数为均值，实际按帕累托分布抽样
+PRESETS = {
+    "small": {"users": 1000, "years": 1, "manual_per_day": 5, "views": 30, "likes": 8, "favorites": 5},
+    "medium": {"users": 100000, "years": 3, "manual_per_day": 30, "views": 20, "likes": 5, "favorites": 3},
+    "large": {"users": 2000000, "years": 5, "manual_per_day": 200, "views": 10, "likes": 3, "favorites": 2},
+}
+
+# 手动生成卡片的类型比例
+TYPE_WEIGHTS = {"inspirational": 0.5, "poetry": 0.3, "philosophy": 0.2}
+
+# 用户偏好类型比例（多数用户保持默认的all）
+PREFERENCE_WEIGHTS = {"all": 0.45, "inspirational": 0.25, "poetry": 0.18, "philosophy": 0.12}
+
+# 推送时间比例（与 /api/settings/push-times 的选项一致，默认08:00占多数）
+PUSH_TIME_WEIGHTS = {"07:00": 0.12, "08:00": 0.55, "09:00": 0.10, "12:00": 0.06, "18:00": 0.05, "20:00": 0.12}
+
+AUTO_UPDATE_RATIO = 0.85
+
+BACKGROUND_STYLES = ["gradient-blue", "gradient-purple", "gradient-orange", "gradient-green",
+                     "gradient-pink", "gradient-dark", "gradient-light"]
+
+# 帕累托分布形状参数：1.5时约20%的用户贡献一半以上的交互
+ACTIVITY_ALPHA = 1.5
+ACTIVITY_MEAN = ACTIVITY_ALPHA / (ACTIVITY_ALPHA - 1)
+MAX_INTERACTIONS_PER_USER = 2000
+
+# 卡片热度偏斜：越大越集中于近期卡片
+RECENCY_SKEW = 3.0
+DAILY_PICK_RATIO = 0.5
+
+FRAGMENTS = {
+    "inspirational": (
+        ["今天的努力，", "每一次坚持，", "相信自己，", "把握现在，", "别怕走得慢，", "心里有方向，"],
+        ["是明天的实力。", "都在为梦想铺路。", "你比想象中更强大。", "才能创造未来。", "只怕停下来。", "脚下就有路。"]
+    ),
+    "poetry": (
+        ["风很轻，云很淡，\n", "阳光正好，微风不燥，\n", "时光不语，\n", "山河远阔，\n", "一盏灯火，\n"],
+        ["心很静，梦很远。", "人间值得。", "静待花开。", "人间烟火。", "照亮归途。"]
+    ),
+    "philosophy": (
+        ["人生最精彩的，", "有时候放下，", "真正的成长，", "简单生活，", "看清了世界，"],
+        ["是坚持梦想的过程。", "是另一种获得。", "是学会与自己和解。", "快乐当下。", "依然热爱它。"]
+    ),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="生成基准测试数据集")
+    parser.add_argument("--preset", choices=list(PRESETS), default="small")
+    parser.add_argument("--users", type=int, default=None, help="覆盖预设的用户数")
+    parser.add_argument("--years", type=float, default=None, help="覆盖预设的卡片年数")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None, help="数据截止日期，默认为今天")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=10000, help="每批插入的行数")
+    return parser.parse_args()
+
+
+def weighted(rng: random.Random, weights: Dict[str, float]) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+class DatasetPlan:
+    """卡片按天连续编号：第d天依次为各类型的每日卡片与manual_per_day张手动卡片，id可由日期直接推算"""
+    
+    def __init__(self, config: dict, end_date: date, seed: int):
+        self.config = config
+        self.seed = seed
+        self.days = max(1, int(config["years"] * 365))
+        self.start_date = end_date - timedelta(days=self.days - 1)
+        self.end_date = end_date
+        self.daily_per_day = len(settings.content_types)
+        self.per_day = self.daily_per_day + config["manual_per_day"]
+        self.cards = self.days * self.per_day
+        self.users = config["users"]
+    
+    def card_day(self, card_id: int) -> int:
+        return (card_id - 1) // self.per_day
+    
+    def cards_rows(self) -> Iterator[dict]:
+        rng = random.Random(self.seed)
+        card_id = 0
+        for day in range(self.days):
+            day_date = self.start_date + timedelta(days=day)
+            for slot in range(self.per_day):
+                card_id += 1
+                is_daily = slot < self.daily_per_day
+                card_type = settings.content_types[slot] if is_daily else weighted(rng, TYPE_WEIGHTS)
+                heads, tails = FRAGMENTS[card_type]
+                yield {
+                    "id": card_id,
+                    "content": rng.choice(heads) + rng.choice(tails),
+                    "type": card_type,
+                    "background_style": rng.choice(BACKGROUND_STYLES),
+                    "generate_date": day_date,
+                    "likes": 0,
+                    "is_generated": True,
+                    "is_daily": is_daily,
+                    # 每日卡片在8点前生成，手动卡片分散在全天
+                    "created_at": datetime.combine(day_date, dt_time(7, 55) if is_daily else dt_time(
+                        rng.randrange(24), rng.randrange(60), rng.randrange(60)))
+                }
+    
+    def pick_card(self, rng: random.Random, first_day: int) -> int:
+        """按热度抽取用户注册后的一张卡片：偏向近期，一半概率落在每日卡片上"""
+        span = self.days - first_day
+        day = self.days - 1 - int(span * rng.random() ** RECENCY_SKEW)
+        if rng.random() < DAILY_PICK_RATIO:
+            slot = rng.randrange(self.daily_per_day)
+        else:
+            slot = rng.randrange(self.per_day)
+        return day * self.per_day + slot + 1
+    
+    def activity(self, rng: random.Random, mean: float, limit: int) -> int:
+        return min(limit, int(round(mean * rng.paretovariate(ACTIVITY_ALPHA) / ACTIVITY_MEAN)))
+    
+    def user_batch(self, rng: random.Random, first_id: int, count: int, likes: array):
+        """生成一批用户及其收藏、交互记录，累加卡片点赞数"""
+        users, favorites, interactions = [], [], []
+        for user_id in range(first_id, first_id + count):
+            signup_day = rng.randrange(self.days)
+            signup = datetime.combine(self.start_date + timedelta(days=signup_day), dt_time(rng.randrange(24), rng.randrange(60)))
+            available = (self.days - signup_day) * self.per_day
+            limit = min(MAX_INTERACTIONS_PER_USER, available)
+            
+            n_views = self.activity(rng, self.config["views"], limit)
+            n_likes = min(n_views, self.activity(rng, self.config["likes"], limit))
+            n_favorites = min(n_views, self.activity(rng, self.config["favorites"], limit))
+            
+            viewed: List[int] = []
+            seen = set()
+            attempts = 0
+            while len(viewed) < n_views and attempts < n_views * 20:
+                attempts += 1
+                card_id = self.pick_card(rng, signup_day)
+                if card_id not in seen:
+                    seen.add(card_id)
+                    viewed.append(card_id)
+            liked = set(viewed[:n_likes])
+            
+            for card_id in viewed:
+                interactions.append({"user_id": user_id, "card_id": card_id, "viewed": True, "liked": card_id in liked})
+                if card_id in liked:
+                    likes[card_id] += 1
+            favorited = rng.sample(viewed, min(n_favorites, len(viewed)))
+            for card_id in favorited:
+                day = max(signup_day, self.card_day(card_id))
+                favorites.append({
+                    "user_id": user_id,
+                    "card_id": card_id,
+                    "created_at": datetime.combine(self.start_date + timedelta(days=day), dt_time(
+                        rng.randrange(24), rng.randrange(60), rng.randrange(60)))
+                })
+            
+            # 活跃用户最近几天内有浏览，连续天数不超过注册天数
+            last_active = None
+            streak = 0
+            if viewed:
+                last_day = max(signup_day, self.days - 1 - int(rng.expovariate(1 / 3)))
+                last_active = self.start_date + timedelta(days=last_day)
+                streak = min(last_day - signup_day + 1, int(rng.expovariate(1 / 7)) + 1)
+            
+            users.append({
+                "id": user_id,
+                "openid": f"synthetic_{self.seed}_{user_id}",
+                "nickname": f"用户{user_id}",
+                "preference_type": "all",
+                "type_preference": weighted(rng, PREFERENCE_WEIGHTS),
+                "auto_update": rng.random() < AUTO_UPDATE_RATIO,
+                "push_time": weighted(rng, PUSH_TIME_WEIGHTS),
+                "total_cards": len(viewed),
+                "favorite_count": len(favorited),
+                "consecutive_days": streak,
+                "total_likes": len(liked),
+                "last_active_date": last_active,
+                "created_at": signup
+            })
+        return users, favorites, interactions
+
+
+async def bulk_insert(table, rows: List[dict], batch_size: int):
+    """按batch_size切分，每批一次executemany、一个事务"""
+    statement = insert(table)
+    for start in range(0, len(rows), batch_size):
+        async with AsyncSessionLocal() as db:
+            await db.execute(statement, rows[start:start + batch_size])
+            await db.commit()
+
+
+async def ensure_empty():
+    async with AsyncSessionLocal() as db:
+        for model in (User, Card, Favorite, UserCardInteraction):
+            if await db.scalar(select(func.count()).select_from(model)):
+                raise SystemExit(f"❌ {model.__tablename__} 表非空，请在空数据库上生成（设置新的 DATABASE_URL）")
+
+
+async def generate(plan: DatasetPlan, batch_size: int):
+    rng = random.Random(plan.seed + 1)
+    likes = array("i", bytes(4 * (plan.cards + 1)))
+    
+    # 卡片
+    progress = Progress("卡片")
+    batch = []
+    for row in plan.cards_rows():
+        batch.append(row)
+        if len(batch) >= batch_size:
+            await bulk_insert(Card.__table__, batch, batch_size)
+            progress.add(len(batch))
+            batch = []
+    if batch:
+        await bulk_insert(Card.__table__, batch, batch_size)
+        progress.add(len(batch))
+    progress.finish()
+    
+    # 用户及其收藏、交互（先写用户，外键约束生效时也能插入）
+    progress = Progress("用户")
+    totals = {"favorites": 0, "interactions": 0}
+    for first_id in range(1, plan.users + 1, batch_size):
+        count = min(batch_size, plan.users - first_id + 1)
+        users, favorites, interactions = plan.user_batch(rng, first_id, count, likes)
+        await bulk_insert(User.__table__, users, batch_size)
+        await bulk_insert(Favorite.__table__, favorites, batch_size)
+        await bulk_insert(UserCardInteraction.__table__, interactions, batch_size)
+        totals["favorites"] += len(favorites)
+        totals["interactions"] += len(interactions)
+        progress.add(count)
+    progress.finish()
+    
+    # 卡片点赞数与点赞记录一致
+    progress = Progress("卡片点赞数")
+    table = Card.__table__
+    statement = update(table).where(table.c.id == bindparam("card")).values(likes=bindparam("count"))
+    rows = [{"card": card_id, "count": count} for card_id, count in enumerate(likes) if count]
+    for start in range(0, len(rows), batch_size):
+        async with AsyncSessionLocal() as db:
+            await db.execute(statement, rows[start:start + batch_size])
+            await db.commit()
+        progress.add(len(rows[start:start + batch_size]))
+    progress.finish()
+    
+    for model in (User, Card, Favorite, UserCardInteraction):
+        await reset_sequence(model.__table__)
+    return totals
+
+
+async def main():
+    args = parse_args()
+    config = dict(PRESETS[args.preset])
+    if args.users is not None:
+        config["users"] = args.users
+    if args.years is not None:
+        config["years"] = args.years
+    plan = DatasetPlan(config, args.end_date or date.today(), args.seed)
+    
+    print(f"🚀 生成 {args.preset} 数据集（种子 {args.seed}）")
+    print(f"   用户 {plan.users}, 卡片 {plan.cards}（{plan.start_date} ~ {plan.end_date}, 每天 {plan.per_day} 张）")
+    print("=" * 50)
+    
+    await init_db()
+    try:
+        await ensure_empty()
+        started = time.perf_counter()
+        totals = await generate(plan, args.batch_size)
+    finally:
+        await close_db()
+    
+    print("=" * 50)
+    print(f"🎉 数据集生成完成，耗时 {time.perf_counter() - started:.1f}s")
+    print(f"   用户 {plan.users}, 卡片 {plan.cards}, 收藏 {totals['favorites']}, 交互 {totals['interactions']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -7,34 +7,36 @@
 import os
 import sys
 import random
+import asyncio
 from datetime import date, timedelta
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.database import engine, Base, SessionLocal
+from sqlalchemy import select, func
+
+from app.database import init_db, AsyncSessionLocal
 from app.models.user import User
 from app.models.card import Card
 from app.models.favorite import Favorite
 
 
-def init_database():
+async def init_database():
     """初始化数据库"""
     print("🗄️  开始初始化数据库...")
     
     # 创建所有表
-    Base.metadata.create_all(bind=engine)
-    print("✅ 数据库表创建完成")
+    await init_db()
 
 
-def create_test_users():
+async def create_test_users():
     """创建测试用户"""
-    db = SessionLocal()
+    db = AsyncSessionLocal()
     try:
         print("👤 创建测试用户...")
         
         # 检查是否已有用户
-        user_count = db.query(User).count()
+        user_count = await db.scalar(select(func.count(User.id)))
         if user_count > 0:
             print("⚠️  用户已存在，跳过创建")
             return
@@ -50,24 +52,24 @@ def create_test_users():
         )
         
         db.add(test_user)
-        db.commit()
+        await db.commit()
         print(f"✅ 测试用户创建完成: {test_user.id}")
         
     except Exception as e:
         print(f"❌ 创建测试用户失败: {e}")
-        db.rollback()
+        await db.rollback()
     finally:
-        db.close()
+        await db.close()
 
 
-def create_test_cards():
+async def create_test_cards():
     """创建测试卡片"""
-    db = SessionLocal()
+    db = AsyncSessionLocal()
     try:
         print("🃏 创建测试卡片...")
         
         # 检查是否已有卡片
-        card_count = db.query(Card).count()
+        card_count = await db.scalar(select(func.count(Card.id)))
         if card_count > 0:
             print("⚠️  卡片已存在，跳过创建")
             return
@@ -115,71 +117,73 @@ def create_test_cards():
                 type=card_type,
                 background_style=f"gradient-{['blue', 'purple', 'orange', 'green', 'pink', 'dark', 'light'][i % 7]}",
                 generate_date=card_date,
-                likes=random.randint(10, 100)
+                likes=random.randint(10, 100),
+                is_daily=True
             )
             
             db.add(card)
         
-        db.commit()
+        await db.commit()
         print(f"✅ 测试卡片创建完成: 7张")
         
     except Exception as e:
         print(f"❌ 创建测试卡片失败: {e}")
-        db.rollback()
+        await db.rollback()
     finally:
-        db.close()
+        await db.close()
 
 
-def create_test_favorites():
+async def create_test_favorites():
     """创建测试收藏"""
-    db = SessionLocal()
+    db = AsyncSessionLocal()
     try:
         print("⭐ 创建测试收藏...")
         
         # 获取测试用户
-        test_user = db.query(User).filter(User.openid == "test_openid_123456").first()
+        result = await db.execute(select(User).where(User.openid == "test_openid_123456"))
+        test_user = result.scalar_one_or_none()
         if not test_user:
             print("❌ 测试用户不存在")
             return
         
         # 获取卡片
-        cards = db.query(Card).limit(3).all()
+        cards = (await db.execute(select(Card).limit(3))).scalars().all()
         
         # 创建收藏
         for card in cards:
             # 检查是否已收藏
-            existing = db.query(Favorite).filter(
+            existing = (await db.execute(select(Favorite).where(
                 Favorite.user_id == test_user.id,
                 Favorite.card_id == card.id
-            ).first()
+            ))).scalar_one_or_none()
             
             if not existing:
                 favorite = Favorite(user_id=test_user.id, card_id=card.id)
                 db.add(favorite)
                 test_user.favorite_count += 1
         
-        db.commit()
+        await db.commit()
         print(f"✅ 测试收藏创建完成: {test_user.favorite_count}个")
         
     except Exception as e:
         print(f"❌ 创建测试收藏失败: {e}")
-        db.rollback()
+        await db.rollback()
     finally:
-        db.close()
+        await db.close()
 
 
-def main():
+async def main():
     """主函数"""
     print("🚀 开始数据库初始化...")
     print("=" * 50)
     
     # 初始化数据库
-    init_database()
+    await init_database()
     
     # 创建测试数据
-    create_test_users()
-    create_test_cards()
-    create_test_favorites()
+    await create_test_users()
+    await create_test_cards()
+    await create_test_favorites()
     
     print("=" * 50)
     print("✅ 数据库初始化完成！")
@@ -188,4 +192,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
@@ -5,29 +5,14 @@ FastAPI应用入口文件
 """
 
 import uvicorn
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
 
-from app.database import engine, Base
+from app import create_app
 from app.routers import users, cards, settings
 from app.config import settings as app_settings
 
 
-# 创建FastAPI应用
-app = FastAPI(
-    title="AI每日灵感卡片API",
-    description="微信小程序服务端API",
-    version="1.0.0"
-)
-
-# 配置CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # 生产环境应配置具体域名
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# 创建FastAPI应用（生命周期中初始化数据库并管理上游HTTP连接池）
+app = create_app()
 
 # 注册路由
 app.include_router(users.router, prefix="/api/users", tags=["用户"])
@@ -35,27 +20,6 @@ app.include_router(cards.router, prefix="/api/cards", tags=["卡片"])
 app.include_router(settings.router, prefix="/api/settings", tags=["设置"])
 
 
-@app.on_event("startup")
-def startup_event():
-    """应用启动时执行"""
-    print("🚀 启动AI每日灵感卡片服务...")
-    # 创建数据库表
-    Base.metadata.create_all(bind=engine)
-    # 定时任务将在第三阶段实现
-    pass
-    print("✅ 数据库初始化完成")
-    print("✅ 定时任务已启动")
-
-
-@app.on_event("shutdown")
-def shutdown_event():
-    """应用关闭时执行"""
-    print("🛑 服务关闭中...")
-    # 定时任务将在第三阶段实现
-    pass
-    print("✅ 定时任务已停止")
-
-
 @app.get("/")
 def root():
     """根路由"""
@@ -77,6 +41,40 @@ def health_check():
     }
 
 
+@app.get("/health/ai")
+def ai_health_check():
+    """AI上游调用状态（熔断器、延迟分位数、当前超时、准入控制排队情况）"""
+    from app.utils.resilience import dashscope_guard
+    from app.utils.admission import ai_admission
+    snapshot = dashscope_guard.snapshot()
+    return {
+        "status": "degraded" if snapshot["breaker"]["state"] != "closed" else "healthy",
+        "dashscope": snapshot,
+        "admission": ai_admission.snapshot()
+    }
+
+
+@app.get("/metrics/ai")
+def ai_metrics():
+    """AI调用指标（按内容类型的耗时直方图、token用量、错误类型与降级率，进程启动以来累计）"""
+    from app.utils.telemetry import ai_telemetry
+    return ai_telemetry.snapshot()
+
+
+@app.get("/metrics/db")
+def db_metrics():
+    """按路由汇总的SQL查询次数、数据库耗时与最慢语句（进程启动以来累计）"""
+    from app.utils.sql_metrics import sql_metrics
+    return sql_metrics.snapshot()
+
+
+@app.get("/metrics/ai/daily")
+async def ai_daily_usage(days: int = 7):
+    """最近若干天的AI用量汇总（用于成本跟踪）"""
+    from app.utils.telemetry import ai_telemetry
+    return {"days": await ai_telemetry.daily_summary(max(1, min(days, 90)))}
+
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
@@ -0,0 +1,74 @@
+"""initial schema
+
+与最初版本（引入每日卡片唯一索引、内容池与AI用量汇总之前）Base.metadata.create_all
+创建的表结构一致：users、cards、favorites 三张表。已有数据库可执行 alembic stamp 0001 后再升级。
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("openid", sa.String(length=100), nullable=False),
+        sa.Column("nickname", sa.String(length=50), nullable=True),
+        sa.Column("avatar_url", sa.String(length=255), nullable=True),
+        sa.Column("preference_type", sa.String(length=20), nullable=True),
+        sa.Column("type_preference", sa.String(length=20), nullable=True),
+        sa.Column("auto_update", sa.Boolean(), nullable=True),
+        sa.Column("push_time", sa.String(length=5), nullable=True),
+        sa.Column("total_cards", sa.Integer(), nullable=True),
+        sa.Column("favorite_count", sa.Integer(), nullable=True),
+        sa.Column("consecutive_days", sa.Integer(), nullable=True),
+        sa.Column("total_likes", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id")
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_openid", "users", ["openid"], unique=True)
+    
+    op.create_table(
+        "cards",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("type", sa.String(length=20), nullable=False),
+        sa.Column("background_style", sa.String(length=50), nullable=True),
+        sa.Column("generate_date", sa.Date(), nullable=False),
+        sa.Column("likes", sa.Integer(), nullable=True),
+        sa.Column("is_generated", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("id")
+    )
+    op.create_index("ix_cards_id", "cards", ["id"])
+    
+    op.create_table(
+        "favorites",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("card_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["card_id"], ["cards.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id")
+    )
+    op.create_index("ix_favorites_id", "favorites", ["id"])
+
+
+def downgrade():
+    op.drop_table("favorites")
+    op.drop_table("cards")
+    op.drop_table("users")
@@ -0,0 +1,81 @@
+"""daily cards, content pool and ai usage
+
+引入迁移之前陆续增加、而 0001 不包含的结构：
+- cards.is_daily 与每日卡片唯一索引（同一天同一类型只有一张每日卡片）
+- content_pool：预生成内容池
+- ai_usage_daily：AI调用按天汇总
+
+较早版本的 0001 已包含这些结构，部分数据库也可能在引入迁移前由 create_all 建好了它们，
+因此已存在的列、索引与表跳过不建。
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-18 09:15:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001a"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    
+    if "is_daily" not in {column["name"] for column in inspector.get_columns("cards")}:
+        with op.batch_alter_table("cards") as batch_op:
+            batch_op.add_column(sa.Column("is_daily", sa.Boolean(), server_default=sa.false(), nullable=False))
+    if "uq_cards_daily_date_type" not in {index["name"] for index in inspector.get_indexes("cards")}:
+        op.create_index(
+            "uq_cards_daily_date_type",
+            "cards",
+            ["generate_date", "type"],
+            unique=True,
+            sqlite_where=sa.column("is_daily", sa.Boolean()).is_(True),
+            postgresql_where=sa.column("is_daily", sa.Boolean()).is_(True)
+        )
+    
+    if "content_pool" not in tables:
+        op.create_table(
+            "content_pool",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("type", sa.String(length=20), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.PrimaryKeyConstraint("id")
+        )
+        op.create_index("ix_content_pool_id", "content_pool", ["id"])
+        op.create_index("ix_content_pool_type_id", "content_pool", ["type", "id"])
+    
+    if "ai_usage_daily" not in tables:
+        op.create_table(
+            "ai_usage_daily",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("type", sa.String(length=20), nullable=False),
+            sa.Column("calls", sa.Integer(), nullable=False),
+            sa.Column("errors", sa.Integer(), nullable=False),
+            sa.Column("generations", sa.Integer(), nullable=False),
+            sa.Column("fallbacks", sa.Integer(), nullable=False),
+            sa.Column("prompt_tokens", sa.Integer(), nullable=False),
+            sa.Column("completion_tokens", sa.Integer(), nullable=False),
+            sa.Column("latency_ms_total", sa.Float(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("date", "type", name="uq_ai_usage_daily_date_type")
+        )
+        op.create_index("ix_ai_usage_daily_id", "ai_usage_daily", ["id"])
+
+
+def downgrade():
+    op.drop_table("ai_usage_daily")
+    op.drop_table("content_pool")
+    op.drop_index("uq_cards_daily_date_type", table_name="cards")
+    with op.batch_alter_table("cards") as batch_op:
+        batch_op.drop_column("is_daily")
@@ -0,0 +1,46 @@
+"""hot query indexes
+
+为高频查询补充索引：
+- cards(generate_date)：按日期查当日卡片
+- cards(type, generate_date)：按类型筛选并按日期倒序的历史列表
+- favorites(user_id, card_id) 唯一：收藏状态查询，并防止重复收藏
+- favorites(user_id, created_at)：按收藏时间倒序的收藏列表
+
+Revision ID: 0002
+Revises: 0001a
+Create Date: 2026-10-18 09:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001a"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 建唯一索引前清理重复收藏（保留最早的一条），并按实际收藏数修正用户计数
+    op.execute(
+        "DELETE FROM favorites WHERE id NOT IN "
+        "(SELECT MIN(id) FROM favorites GROUP BY user_id, card_id)"
+    )
+    op.execute(
+        "UPDATE users SET favorite_count = "
+        "(SELECT COUNT(*) FROM favorites WHERE favorites.user_id = users.id)"
+    )
+    
+    op.create_index("ix_cards_generate_date", "cards", ["generate_date"])
+    op.create_index("ix_cards_type_generate_date", "cards", ["type", "generate_date"])
+    op.create_index("uq_favorites_user_card", "favorites", ["user_id", "card_id"], unique=True)
+    op.create_index("ix_favorites_user_created_at", "favorites", ["user_id", "created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_favorites_user_created_at", table_name="favorites")
+    op.drop_index("uq_favorites_user_card", table_name="favorites")
+    op.drop_index("ix_cards_type_generate_date", table_name="cards")
+    op.drop_index("ix_cards_generate_date", table_name="cards")
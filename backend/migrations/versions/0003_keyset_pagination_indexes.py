@@ -0,0 +1,39 @@
+"""keyset pagination indexes
+
+游标分页按 (generate_date, id) / (created_at, id) 倒序定位，
+将id加入对应索引末尾，深页查询直接从索引定位而无需额外排序。
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 11:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_index("ix_cards_generate_date", table_name="cards")
+    op.drop_index("ix_cards_type_generate_date", table_name="cards")
+    op.drop_index("ix_favorites_user_created_at", table_name="favorites")
+    
+    op.create_index("ix_cards_generate_date_id", "cards", ["generate_date", "id"])
+    op.create_index("ix_cards_type_generate_date_id", "cards", ["type", "generate_date", "id"])
+    op.create_index("ix_favorites_user_created_at_id", "favorites", ["user_id", "created_at", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_favorites_user_created_at_id", table_name="favorites")
+    op.drop_index("ix_cards_type_generate_date_id", table_name="cards")
+    op.drop_index("ix_cards_generate_date_id", table_name="cards")
+    
+    op.create_index("ix_favorites_user_created_at", "favorites", ["user_id", "created_at"])
+    op.create_index("ix_cards_type_generate_date", "cards", ["type", "generate_date"])
+    op.create_index("ix_cards_generate_date", "cards", ["generate_date"])
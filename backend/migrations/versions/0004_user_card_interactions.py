@@ -0,0 +1,46 @@
+"""user card interactions
+
+记录每个用户对每张卡片的浏览与点赞状态，(user_id, card_id) 唯一，
+点赞/取消点赞按此记录幂等处理。
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_card_interactions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("card_id", sa.Integer(), nullable=False),
+        sa.Column("viewed", sa.Boolean(), nullable=False),
+        sa.Column("liked", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["card_id"], ["cards.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id")
+    )
+    op.create_index("ix_user_card_interactions_id", "user_card_interactions", ["id"])
+    op.create_index(
+        "uq_user_card_interactions_user_card",
+        "user_card_interactions",
+        ["user_id", "card_id"],
+        unique=True
+    )
+
+
+def downgrade():
+    op.drop_table("user_card_interactions")
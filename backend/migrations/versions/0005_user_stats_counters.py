@@ -0,0 +1,40 @@
+"""user stats counters
+
+users 增加 last_active_date（最近浏览卡片的日期），连续天数据此增量维护；
+并按现有记录一次性回填浏览数、点赞数与收藏数。
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 15:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(sa.Column("last_active_date", sa.Date(), nullable=True))
+    
+    # 此前除收藏数外的统计从未更新过，按交互记录回填；连续天数无历史可依，从0开始累计
+    op.execute(
+        "UPDATE users SET "
+        "total_cards = (SELECT COUNT(*) FROM user_card_interactions "
+        "WHERE user_card_interactions.user_id = users.id AND user_card_interactions.viewed), "
+        "total_likes = (SELECT COUNT(*) FROM user_card_interactions "
+        "WHERE user_card_interactions.user_id = users.id AND user_card_interactions.liked), "
+        "favorite_count = (SELECT COUNT(*) FROM favorites WHERE favorites.user_id = users.id), "
+        "consecutive_days = 0"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("last_active_date")
@@ -9,10 +9,11 @@ import os
 
 from models.database import get_db, Card, Favorite, UserCardInteraction
 from utils.auth import verify_jwt_token
-from services.ai_generator import AIGeneratorService
+from services.ai_generator import AIGeneratorService, preference_cache
 
 router = APIRouter()
 
+
 class CardResponse(BaseModel):
     id: int
     content: str
@@ -23,9 +24,11 @@ class CardResponse(BaseModel):
     is_favorite: bool = False
     is_liked: bool = False
 
+
 class GenerateCardRequest(BaseModel):
     type: str = None  # motivational, poetry, philosophy
 
+
 @router.get("/daily", response_model=CardResponse)
 async def get_daily_card(
     db: AsyncSession = Depends(get_db),
@@ -60,6 +63,7 @@ async def get_daily_card(
         is_liked=is_liked
     )
 
+
 @router.get("/history")
 async def get_card_history(
     skip: int = 0,
@@ -78,12 +82,13 @@ async def get_card_history(
     result = await db.execute(query)
     cards = result.scalars().all()
     
-    # 获取用户的收藏和点赞状态
+    # 获取用户的收藏和点赞状态（整页各一次查询）
+    card_ids = [card.id for card in cards]
+    favorite_ids = await get_favorite_card_ids(db, user_id, card_ids)
+    liked_ids = await get_liked_card_ids(db, user_id, card_ids)
+    
     card_list = []
     for card in cards:
-        is_favorite = await check_if_favorite(db, user_id, card.id)
-        is_liked = await check_if_liked(db, user_id, card.id)
-        
         card_list.append(CardResponse(
             id=card.id,
             content=card.content,
@@ -91,12 +96,13 @@ async def get_card_history(
             background_style=card.background_style,
             generate_date=card.generate_date,
             likes_count=card.likes_count,
-            is_favorite=is_favorite,
-            is_liked=is_liked
+            is_favorite=card.id in favorite_ids,
+            is_liked=card.id in liked_ids
         ))
     
     return {"cards": card_list, "total": len(card_list)}
 
+
 @router.post("/generate")
 async def generate_card(
     request: GenerateCardRequest = None,
@@ -120,6 +126,7 @@ async def generate_card(
         }
     }
 
+
 @router.post("/{card_id}/favorite")
 async def toggle_favorite(
     card_id: int,
@@ -157,6 +164,7 @@ async def toggle_favorite(
     
     return {"success": True, "is_favorite": is_favorite}
 
+
 @router.post("/{card_id}/like")
 async def toggle_like(
     card_id: int,
@@ -201,9 +209,11 @@ async def toggle_like(
         card.likes_count = max(0, card.likes_count - 1)
     
     await db.commit()
+    preference_cache.invalidate(user_id)
     
     return {"success": True, "is_liked": is_liked, "likes_count": card.likes_count}
 
+
 # 辅助函数
 async def check_if_favorite(db: AsyncSession, user_id: int, card_id: int) -> bool:
     """检查用户是否已收藏卡片"""
@@ -215,6 +225,7 @@ async def check_if_favorite(db: AsyncSession, user_id: int, card_id: int) -> boo
     )
     return result.scalar_one_or_none() is not None
 
+
 async def check_if_liked(db: AsyncSession, user_id: int, card_id: int) -> bool:
     """检查用户是否已点赞卡片"""
     result = await db.execute(
@@ -225,4 +236,31 @@ async def check_if_liked(db: AsyncSession, user_id: int, card_id: int) -> bool:
         )
     )
     interaction = result.scalar_one_or_none()
-    return interaction is not None
\ No newline at end of file
+    return interaction is not None
+
+
+async def get_favorite_card_ids(db: AsyncSession, user_id: int, card_ids: list) -> set:
+    """批量查询用户已收藏的卡片ID"""
+    if not card_ids:
+        return set()
+    result = await db.execute(
+        select(Favorite.card_id).where(
+            Favorite.user_id == user_id,
+            Favorite.card_id.in_(card_ids)
+        )
+    )
+    return set(result.scalars().all())
+
+
+async def get_liked_card_ids(db: AsyncSession, user_id: int, card_ids: list) -> set:
+    """批量查询用户已点赞的卡片ID"""
+    if not card_ids:
+        return set()
+    result = await db.execute(
+        select(UserCardInteraction.card_id).where(
+            UserCardInteraction.user_id == user_id,
+            UserCardInteraction.card_id.in_(card_ids),
+            UserCardInteraction.liked == True
+        )
+    )
+    return set(result.scalars().all())
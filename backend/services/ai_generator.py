@@ -4,11 +4,44 @@ import json
 from datetime import date, datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import desc
+from sqlalchemy import desc, func
 import random
+import time
+from typing import Dict, Optional, Tuple
 
 from app.models.card import Card
 from app.models.user import User
+from models.database import Card as InteractionCard, UserCardInteraction
+
+# 用户偏好类型缓存的有效期（秒），点赞状态变化时主动失效
+PREFERENCE_CACHE_TTL = int(os.getenv("PREFERENCE_CACHE_TTL", "600"))
+
+
+class PreferenceCache:
+    """按用户缓存最近点赞最多的卡片类型"""
+    
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[int, Tuple[float, Optional[str]]] = {}
+    
+    def get(self, user_id: int) -> Tuple[bool, Optional[str]]:
+        """返回(是否命中, 偏好类型)，偏好类型为None表示用户没有点赞记录"""
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            return False, None
+        return True, entry[1]
+    
+    def set(self, user_id: int, card_type: Optional[str]):
+        self._entries[user_id] = (time.monotonic() + self.ttl, card_type)
+    
+    def invalidate(self, user_id: int):
+        """用户点赞/取消点赞后调用，下次生成时重新统计"""
+        self._entries.pop(user_id, None)
+
+
+# 服务实例按请求创建，缓存需在进程内共享
+preference_cache = PreferenceCache(PREFERENCE_CACHE_TTL)
+
 
 class AIGeneratorService:
     def __init__(self):
@@ -211,28 +244,37 @@ class AIGeneratorService:
         
         return user.preference_type
 
-    async def get_personalized_content(self, db: AsyncSession, user_id: int) -> str:
-        """获取个性化内容（基于用户历史）"""
-        # 获取用户最近的交互记录
-        result = await db.execute(
-            select(UserCardInteraction)
+    async def get_liked_type(self, db: AsyncSession, user_id: int) -> Optional[str]:
+        """统计用户最近10条交互中点赞最多的卡片类型（单次聚合查询，结果缓存）
+        
+        点赞数相同时按类型名排序，结果不随数据库返回顺序变化。
+        """
+        hit, card_type = preference_cache.get(user_id)
+        if hit:
+            return card_type
+        
+        recent = (
+            select(UserCardInteraction.card_id, UserCardInteraction.liked)
             .where(UserCardInteraction.user_id == user_id)
-            .order_by(desc(UserCardInteraction.created_at))
+            .order_by(desc(UserCardInteraction.created_at), desc(UserCardInteraction.id))
             .limit(10)
+            .subquery()
+        )
+        result = await db.execute(
+            select(InteractionCard.type, func.count().label("likes"))
+            .join(recent, recent.c.card_id == InteractionCard.id)
+            .where(recent.c.liked == True)
+            .group_by(InteractionCard.type)
+            .order_by(desc("likes"), InteractionCard.type)
+            .limit(1)
         )
-        interactions = result.scalars().all()
-        
-        # 分析用户偏好（简化版）
-        liked_types = {}
-        for interaction in interactions:
-            if interaction.liked:
-                card = await db.get(Card, interaction.card_id)
-                if card:
-                    liked_types[card.type] = liked_types.get(card.type, 0) + 1
-        
-        # 根据偏好选择类型
-        if liked_types:
-            most_liked = max(liked_types, key=liked_types.get)
-            return await self.generate_content(most_liked)
-        else:
-            return await self.generate_content("motivational")
\ No newline at end of file
+        row = result.first()
+        card_type = row.type if row else None
+        
+        preference_cache.set(user_id, card_type)
+        return card_type
+
+    async def get_personalized_content(self, db: AsyncSession, user_id: int) -> str:
+        """获取个性化内容（基于用户历史）"""
+        most_liked = await self.get_liked_type(db, user_id)
+        return await self.generate_content(most_liked or "motivational")
@@ -0,0 +1,265 @@
+"""
+Celery后台任务
+将每日卡片生成、内容池补充、历史卡片补生成、推送分发与用户统计校正从API进程移到worker执行
+
+启动:
+    celery -A tasks.celery worker --loglevel=info
+    celery -A tasks.celery beat --loglevel=info    # 定时触发每日卡片、推送、内容池巡检与用户统计校正
+
+测试时设置 CELERY_BROKER_URL=memory:// CELERY_RESULT_BACKEND=cache+memory:// CELERY_TASK_ALWAYS_EAGER=True，
+任务在调用处同步执行。
+"""
+
+import random
+import asyncio
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from celery import Celery
+from celery.schedules import crontab
+from celery.signals import worker_process_shutdown
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import AsyncSessionLocal, close_db
+from app import models  # noqa: F401  注册所有模型到Base.metadata
+from app.models.card import Card
+from app.models.user import User
+from app.utils.http_client import upstream_clients
+from app.utils.daily_card import find_daily_card, get_or_create_daily_card
+from app.utils.content_pool import content_pool
+from app.utils.admission import ai_priority, Priority
+from app.utils.wechat import wechat_client
+from app.utils.user_stats import reconcile_user_stats as _reconcile_user_stats
+
+
+celery = Celery(
+    "daily_inspiration",
+    broker=settings.celery_broker_url,
+    backend=settings.celery_result_backend
+)
+
+celery.conf.update(
+    task_always_eager=settings.celery_task_always_eager,
+    task_eager_propagates=True,
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    result_expires=7 * 24 * 3600,
+    timezone=settings.timezone,
+    # 任务执行完成后再确认，worker异常退出时任务会重新投递
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    beat_schedule={
+        "generate-daily-card": {
+            "task": "tasks.generate_daily_card",
+            "schedule": crontab(hour=8, minute=0)
+        },
+        "push-daily-card": {
+            "task": "tasks.push_daily_card",
+            "schedule": crontab()  # 每分钟检查一次推送时间
+        },
+        "refill-content-pools": {
+            "task": "tasks.refill_all_content_pools",
+            "schedule": 300.0
+        },
+        "reconcile-user-stats": {
+            "task": "tasks.reconcile_user_stats",
+            "schedule": crontab(hour=3, minute=30)
+        }
+    }
+)
+
+
+# worker进程内常驻的事件循环，异步数据库引擎与上游HTTP连接池绑定在该循环上
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def run_async(coro):
+    """在当前worker进程的事件循环中执行协程并返回结果"""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coro)
+
+
+async def _close_resources():
+    await upstream_clients.close()
+    await close_db()
+
+
+@worker_process_shutdown.connect
+def _shutdown_worker_process(**kwargs):
+    """worker进程退出时关闭连接池"""
+    if _loop is not None and not _loop.is_closed():
+        _loop.run_until_complete(_close_resources())
+        _loop.close()
+
+
+async def _ensure_daily_card(card_type: Optional[str], day: date) -> dict:
+    if card_type is None:
+        # 未指定类型时每天只生成一张，已存在任意类型即跳过
+        async with AsyncSessionLocal() as db:
+            card = await find_daily_card(db, day)
+        if card:
+            return card.to_dict()
+        card_type = random.choice(settings.content_types)
+    card = await get_or_create_daily_card(card_type, day)
+    return card.to_dict()
+
+
+@celery.task(
+    name="tasks.generate_daily_card",
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    max_retries=3,
+    rate_limit="30/m"
+)
+def generate_daily_card(card_type: Optional[str] = None, day: Optional[str] = None) -> dict:
+    """生成（或获取已存在的）每日卡片，day为ISO日期字符串，默认为今天"""
+    target = date.fromisoformat(day) if day else celery.now().date()
+    card = run_async(_ensure_daily_card(card_type, target))
+    print(f"🎉 每日卡片就绪: {card['generate_date']} {card['type']}")
+    return card
+
+
+async def _find_missing_daily_cards(days: List[date], types: List[str]) -> List[tuple]:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Card.generate_date, Card.type)
+            .where(Card.is_daily.is_(True), Card.generate_date.in_(days), Card.type.in_(types))
+        )
+        existing = set(result.all())
+    return [(day, card_type) for day in days for card_type in types if (day, card_type) not in existing]
+
+
+@celery.task(name="tasks.backfill_daily_cards")
+def backfill_daily_cards(start: str, end: Optional[str] = None, types: Optional[List[str]] = None) -> dict:
+    """为[start, end]区间内缺失的日期与类型补生成每日卡片（每张卡片单独一个任务）"""
+    start_day = date.fromisoformat(start)
+    end_day = date.fromisoformat(end) if end else celery.now().date()
+    days = [start_day + timedelta(days=i) for i in range((end_day - start_day).days + 1)]
+    types = types or settings.content_types
+    
+    missing = run_async(_find_missing_daily_cards(days, types))
+    for day, card_type in missing:
+        generate_daily_card.delay(card_type, day.isoformat())
+    
+    print(f"📅 补生成每日卡片: {len(missing)} 张已排队")
+    return {"days": len(days), "queued": len(missing)}
+
+
+async def _refill(content_type: str) -> int:
+    with ai_priority(Priority.BACKGROUND):
+        return await content_pool.refill(content_type)
+
+
+@celery.task(
+    name="tasks.refill_content_pool",
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    max_retries=3,
+    rate_limit="12/m"
+)
+def refill_content_pool(content_type: str) -> dict:
+    """补充指定类型的内容池至目标数量"""
+    added = run_async(_refill(content_type))
+    return {"type": content_type, "added": added}
+
+
+@celery.task(name="tasks.refill_all_content_pools")
+def refill_all_content_pools() -> dict:
+    """为所有内容类型排队补充任务"""
+    for content_type in settings.content_types:
+        refill_content_pool.delay(content_type)
+    return {"queued": len(settings.content_types)}
+
+
+async def _plan_push(push_time: str, day: date) -> Dict[int, List[int]]:
+    """查询在push_time推送的用户，按偏好类型对应的每日卡片分组：卡片ID -> 用户ID列表"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(User.id, User.type_preference)
+            .where(User.auto_update.is_(True), User.push_time == push_time)
+            .order_by(User.id)
+        )
+        targets = result.all()
+    
+    plan: Dict[int, List[int]] = {}
+    cards: Dict[str, int] = {}
+    for user_id, preference in targets:
+        card_type = preference if preference in settings.content_types else None
+        key = card_type or "all"
+        if key not in cards:
+            cards[key] = (await _ensure_daily_card(card_type, day))["id"]
+        plan.setdefault(cards[key], []).append(user_id)
+    return plan
+
+
+@celery.task(name="tasks.push_daily_card")
+def push_daily_card(push_time: Optional[str] = None) -> dict:
+    """按推送时间分发每日卡片推送，每批用户一个发送任务"""
+    now = celery.now()
+    push_time = push_time or now.strftime("%H:%M")
+    plan = run_async(_plan_push(push_time, now.date()))
+    
+    batches = 0
+    users = 0
+    for card_id, user_ids in plan.items():
+        for start in range(0, len(user_ids), settings.push_batch_size):
+            send_push_batch.delay(card_id, user_ids[start:start + settings.push_batch_size])
+            batches += 1
+        users += len(user_ids)
+    
+    if users:
+        print(f"📨 {push_time} 推送已排队: {users} 位用户, {batches} 批")
+    return {"push_time": push_time, "users": users, "batches": batches}
+
+
+async def _send_push(card_id: int, user_ids: List[int]) -> dict:
+    async with AsyncSessionLocal() as db:
+        card = await db.get(Card, card_id)
+        result = await db.execute(select(User.openid).where(User.id.in_(user_ids)))
+        openids = result.scalars().all()
+    if card is None:
+        return {"sent": 0, "failed": len(user_ids)}
+    
+    # 模板字段需与小程序后台配置的订阅消息模板一致
+    data = {
+        "thing1": card.content[:20],
+        "date2": card.generate_date.isoformat()
+    }
+    sent = 0
+    for openid in openids:
+        if await wechat_client.send_subscribe_message(
+            openid, settings.wechat_push_template_id, data, page=f"pages/card/detail?id={card.id}"
+        ):
+            sent += 1
+    return {"sent": sent, "failed": len(openids) - sent}
+
+
+@celery.task(
+    name="tasks.send_push_batch",
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    max_retries=3,
+    rate_limit="10/s"
+)
+def send_push_batch(card_id: int, user_ids: List[int]) -> dict:
+    """向一批用户发送每日卡片订阅消息"""
+    return run_async(_send_push(card_id, user_ids))
+
+
+async def _reconcile(day: date) -> int:
+    async with AsyncSessionLocal() as db:
+        users = await _reconcile_user_stats(db, day)
+        await db.commit()
+    return users
+
+
+@celery.task(name="tasks.reconcile_user_stats")
+def reconcile_user_stats() -> dict:
+    """按明细表整体重算用户统计计数，修正增量维护的偏差并将中断的连续天数归零"""
+    users = run_async(_reconcile(celery.now().date()))
+    print(f"📊 用户统计已校正: {users} 位用户")
+    return {"users": users}
@@ -0,0 +1,74 @@
+"""
+测试公共配置
+
+测试使用临时目录中的文件型SQLite（与生产相同的WAL与读写连接池配置）。
+配置在导入app之前写入环境变量；每个用例开始时迁移到最新版本并清空所有表。
+"""
+
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='tests_'), 'test.db')}"
+os.environ["DEBUG"] = "False"
+os.environ["DASHSCOPE_API_KEY"] = ""
+os.environ["CONTENT_POOL_ENABLED"] = "False"
+os.environ["CONTENT_DEDUP_ENABLED"] = "False"
+os.environ["CELERY_ENABLED"] = "False"
+
+import httpx
+import pytest
+
+from app.database import AsyncSessionLocal, Base, close_db, engine, init_db
+from app.models.user import User
+from app.utils.auth import create_access_token
+from app.utils.daily_card import daily_card_cache
+from app.utils.likes import like_buffer
+from app.utils.user_stats import user_stats
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def db_ready():
+    """迁移到最新版本并清空数据，用例结束后关闭连接池"""
+    await init_db()
+    async with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            await conn.execute(table.delete())
+    daily_card_cache.invalidate()
+    like_buffer._deltas.clear()
+    user_stats._deltas.clear()
+    user_stats._views.clear()
+    user_stats._known_views.clear()
+    user_stats._known_days.clear()
+    yield
+    await close_db()
+
+
+@pytest.fixture
+async def user(db_ready) -> User:
+    async with AsyncSessionLocal() as db:
+        user = User(openid="test-user", type_preference="all")
+        db.add(user)
+        await db.commit()
+        return user
+
+
+@pytest.fixture
+async def client(db_ready, user):
+    """带当前用户认证头、已执行应用生命周期的HTTP客户端"""
+    from main import app
+    
+    headers = {"Authorization": f"Bearer {create_access_token({'user_id': user.id})}"}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test", headers=headers
+        ) as http_client:
+            yield http_client
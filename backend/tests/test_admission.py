@@ -0,0 +1,172 @@
+"""
+AI调用准入控制：优先级排队、拒绝条件与配额结算
+"""
+
+import asyncio
+import sys
+
+import pytest
+
+from app.config import settings
+from app.utils.admission import AdmissionController, AdmissionRejectedError, Priority, TokenBucket, ai_priority
+from app.utils.ai_generator import AIGenerator
+from app.utils.resilience import CircuitOpenError, UpstreamGuard, deadline_scope
+
+# app.utils 导出了同名的全局实例，从sys.modules取模块本身
+ai_generator_module = sys.modules["app.utils.ai_generator"]
+
+pytestmark = pytest.mark.anyio
+
+TOKEN_BUDGET = 10000
+
+
+@pytest.fixture
+def admission(monkeypatch):
+    """不限QPS、token桶几乎不补充的准入控制器，便于直接比较结算前后的余量"""
+    controller = AdmissionController()
+    controller.request_bucket = TokenBucket(0, 0)
+    controller.token_bucket = TokenBucket(0.001, TOKEN_BUDGET)
+    monkeypatch.setattr(ai_generator_module, "ai_admission", controller)
+    yield controller
+
+
+@pytest.fixture
+def guard(monkeypatch):
+    upstream_guard = UpstreamGuard("dashscope")
+    monkeypatch.setattr(ai_generator_module, "dashscope_guard", upstream_guard)
+    return upstream_guard
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, body: dict):
+        self.status_code = status_code
+        self._body = body
+    
+    def json(self) -> dict:
+        return self._body
+
+
+class FakeClient:
+    """按顺序返回预设结果的上游客户端：(延迟秒数, 状态码, token用量) 或异常"""
+    
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = 0
+    
+    async def post(self, url, headers=None, json=None, timeout=None):
+        reply = self.replies[min(self.calls, len(self.replies) - 1)]
+        self.calls += 1
+        if isinstance(reply, Exception):
+            raise reply
+        delay, status_code, tokens = reply
+        await asyncio.sleep(delay)
+        return FakeResponse(status_code, {
+            "output": {"choices": [{"message": {"content": "生活不会辜负每一个认真努力的人"}}]},
+            "usage": {"total_tokens": tokens}
+        })
+
+
+def use_client(monkeypatch, client: FakeClient):
+    monkeypatch.setattr(ai_generator_module, "get_upstream_client", lambda name: client)
+
+
+def budget(controller: AdmissionController) -> float:
+    controller.token_bucket.wait_time(0)
+    return controller.token_bucket.tokens
+
+
+async def test_waiters_are_admitted_in_priority_order():
+    controller = AdmissionController()
+    controller.request_bucket = TokenBucket(50, 1)
+    controller.token_bucket = TokenBucket(0, 0)
+    await controller.acquire(1)
+    
+    order = []
+    
+    async def request(priority: Priority):
+        with ai_priority(priority):
+            await controller.acquire(1)
+        order.append(priority)
+    
+    tasks = []
+    for priority in (Priority.BACKGROUND, Priority.USER, Priority.DAILY):
+        tasks.append(asyncio.ensure_future(request(priority)))
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    await controller.stop()
+    
+    assert order == [Priority.DAILY, Priority.USER, Priority.BACKGROUND]
+
+
+async def test_rejects_when_queue_full_or_deadline_too_close(monkeypatch):
+    controller = AdmissionController()
+    controller.request_bucket = TokenBucket(1, 1)
+    controller.token_bucket = TokenBucket(0, 0)
+    await controller.acquire(1)
+    
+    # 预计等待约1秒，剩余时间只有0.1秒：立即拒绝而不是排队
+    with deadline_scope(0.1):
+        with pytest.raises(AdmissionRejectedError):
+            await controller.acquire(1)
+    
+    monkeypatch.setattr(settings, "ai_admission_queue_size", 1)
+    waiter = asyncio.ensure_future(controller.acquire(1))
+    await asyncio.sleep(0)
+    with pytest.raises(AdmissionRejectedError):
+        await controller.acquire(1)
+    
+    waiter.cancel()
+    await controller.stop()
+    assert controller.rejected[Priority.USER] == 2
+
+
+async def test_successful_call_settles_actual_usage(monkeypatch, admission, guard):
+    use_client(monkeypatch, FakeClient((0, 200, 120)))
+    
+    assert await AIGenerator().request_content("inspirational") is not None
+    assert budget(admission) == pytest.approx(TOKEN_BUDGET - 120, abs=1)
+
+
+@pytest.mark.parametrize("reply", [(0, 500, 0), ConnectionError("upstream down")])
+async def test_failed_call_returns_reservation(monkeypatch, admission, guard, reply):
+    use_client(monkeypatch, FakeClient(reply))
+    
+    assert await AIGenerator().request_content("inspirational") is None
+    assert budget(admission) == pytest.approx(TOKEN_BUDGET, abs=1)
+
+
+async def test_stream_rejected_by_breaker_returns_reservation(monkeypatch, admission, guard):
+    monkeypatch.setattr(guard.breaker, "allow_request", lambda: False)
+    
+    with pytest.raises(CircuitOpenError):
+        async for _ in AIGenerator().stream_content("poetry"):
+            pass
+    assert budget(admission) == pytest.approx(TOKEN_BUDGET, abs=1)
+
+
+async def test_hedged_call_pays_for_both_attempts(monkeypatch, admission, guard):
+    monkeypatch.setattr(settings, "ai_hedge_enabled", True)
+    monkeypatch.setattr(settings, "ai_latency_min_samples", 1)
+    guard.latency.record(0.02)
+    # 首个请求很慢，对冲请求先返回
+    use_client(monkeypatch, FakeClient((1.0, 200, 300), (0, 200, 100)))
+    generator = AIGenerator()
+    estimated = generator._estimate_tokens(generator.PROMPTS["inspirational"], {"max_tokens": 200})
+    
+    assert await generator.request_content("inspirational") is not None
+    assert guard.hedged == 1 and guard.hedge_wins == 1
+    # 获胜请求按实际用量计，被取消的首个请求按预估计
+    assert budget(admission) == pytest.approx(TOKEN_BUDGET - 100 - estimated, abs=1)
+
+
+async def test_hedge_skipped_without_quota(monkeypatch, admission, guard):
+    monkeypatch.setattr(settings, "ai_hedge_enabled", True)
+    monkeypatch.setattr(settings, "ai_latency_min_samples", 1)
+    guard.latency.record(0.02)
+    admission.request_bucket = TokenBucket(0.001, 1)
+    client = FakeClient((0.2, 200, 100))
+    use_client(monkeypatch, client)
+    
+    assert await AIGenerator().request_content("inspirational") is not None
+    assert client.calls == 1
+    assert guard.hedged == 0 and guard.hedge_denied == 1
@@ -0,0 +1,102 @@
+"""
+预生成内容池：并发取用不重复、池为空时 /generate 现场生成、补充到目标数量即停止
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.card import Card
+from app.models.content_pool import PooledContent
+from app.routers import cards
+from app.utils.ai_generator import ai_generator
+from app.utils.content_pool import ContentPool
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def pool(db_ready, monkeypatch):
+    """启用的独立内容池，AI批量生成替换为记录每次请求条数的假实现"""
+    monkeypatch.setattr(settings, "content_pool_enabled", True)
+    monkeypatch.setattr(settings, "content_pool_size", 5)
+    monkeypatch.setattr(settings, "content_pool_low_water", 1)
+    monkeypatch.setattr(settings, "ai_batch_size", 2)
+    content_pool = ContentPool()
+    content_pool.batches = []
+    
+    async def fake_batch(content_type, count):
+        content_pool.batches.append(count)
+        start = sum(content_pool.batches) - count
+        return [f"{content_type}预生成{start + i}" for i in range(count)]
+    
+    monkeypatch.setattr(ai_generator, "generate_batch", fake_batch)
+    monkeypatch.setattr(cards, "content_pool", content_pool)
+    yield content_pool
+    await content_pool.stop()
+
+
+async def add_pooled(content_type: str, count: int):
+    async with AsyncSessionLocal() as db:
+        db.add_all([PooledContent(type=content_type, content=f"{content_type}库存{i}") for i in range(count)])
+        await db.commit()
+
+
+async def pooled_count(content_type: str) -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(PooledContent).where(PooledContent.type == content_type))
+
+
+async def test_concurrent_pops_never_share_a_row(pool, monkeypatch):
+    monkeypatch.setattr(pool, "ensure_refill", lambda content_type: None)
+    await add_pooled("poetry", 10)
+    
+    results = await asyncio.gather(*[pool.pop("poetry") for _ in range(20)])
+    popped = [content for content in results if content is not None]
+    assert len(popped) == len(set(popped))
+    # 每条取出的内容都已从池中删除，未取出的仍在池中
+    assert len(popped) + await pooled_count("poetry") == 10
+    assert pool.hits["poetry"] == len(popped)
+
+
+async def test_generate_uses_pool_then_falls_back_to_live(client, pool, monkeypatch):
+    live = []
+    
+    async def generate(card_type):
+        live.append(card_type)
+        return "现场生成的内容"
+    
+    monkeypatch.setattr(cards, "generate_card_content", generate)
+    monkeypatch.setattr(pool, "ensure_refill", lambda content_type: None)
+    await add_pooled("poetry", 1)
+    
+    first = (await client.post("/api/cards/generate", json={"type": "poetry"})).json()["data"]
+    assert first["content"] == "poetry库存0" and live == []
+    
+    second = (await client.post("/api/cards/generate", json={"type": "poetry"})).json()["data"]
+    assert second["content"] == "现场生成的内容" and live == ["poetry"]
+    assert (pool.hits["poetry"], pool.misses["poetry"]) == (1, 1)
+    async with AsyncSessionLocal() as db:
+        assert await db.scalar(select(func.count()).select_from(Card)) == 2
+
+
+async def test_refill_stops_at_target_size(pool):
+    await add_pooled("poetry", 2)
+    assert await pool.refill("poetry") == 3
+    assert pool.batches == [2, 1]
+    assert await pooled_count("poetry") == 5
+    
+    # 已达目标数量时不再调用AI
+    assert await pool.refill("poetry") == 0
+    assert pool.batches == [2, 1]
+    assert pool.stats()["types"]["poetry"]["depth"] == 5
+
+
+async def test_pop_below_low_water_refills_in_background(pool):
+    await add_pooled("poetry", 2)
+    assert await pool.pop("poetry") == "poetry库存0"
+    await pool._refill_tasks["poetry"]
+    assert await pooled_count("poetry") == 5
@@ -0,0 +1,81 @@
+"""
+每日卡片：并发首次请求合并生成、唯一索引兜底与连接占用
+"""
+
+import asyncio
+from datetime import date
+
+import anyio
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.card import Card
+from app.utils import daily_card
+from app.utils.daily_card import get_or_create_daily_card
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def slow_generation(monkeypatch):
+    """替换AI生成：耗时0.3秒，记录调用次数"""
+    calls = []
+    
+    async def fake_generate(card_type):
+        calls.append(card_type)
+        await asyncio.sleep(0.3)
+        return f"今日{card_type}卡片"
+    
+    monkeypatch.setattr(daily_card, "generate_card_content", fake_generate)
+    return calls
+
+
+async def count_daily_cards() -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(Card).where(Card.is_daily.is_(True)))
+
+
+async def test_concurrent_first_requests_exceeding_pool(client, slow_generation):
+    """并发数超过读连接池大小时，首次请求仍全部成功且只生成一次"""
+    concurrency = settings.sqlite_read_pool_size * 2 + 5
+    with anyio.fail_after(20):
+        responses = await asyncio.gather(*[client.get("/api/cards/daily") for _ in range(concurrency)])
+    
+    assert [response.status_code for response in responses] == [200] * concurrency
+    assert len({response.json()["data"]["id"] for response in responses}) == 1
+    assert slow_generation == ["inspirational"]
+    assert await count_daily_cards() == 1
+
+
+async def test_unique_index_rejects_second_daily_card(db_ready):
+    today = date.today()
+    async with AsyncSessionLocal() as db:
+        db.add(Card(content="a", type="poetry", generate_date=today, is_daily=True))
+        await db.commit()
+        db.add(Card(content="b", type="poetry", generate_date=today, is_daily=True))
+        with pytest.raises(IntegrityError):
+            await db.commit()
+        await db.rollback()
+        # 非每日卡片不受唯一索引限制
+        db.add(Card(content="c", type="poetry", generate_date=today, is_daily=False))
+        await db.commit()
+
+
+async def test_conflict_returns_card_written_by_other_process(db_ready, monkeypatch):
+    """AI生成期间其他进程写入了同一（日期, 类型）的卡片：返回已写入的卡片而不是报错"""
+    today = date.today()
+    
+    async def generate_while_other_process_inserts(card_type):
+        async with AsyncSessionLocal() as db:
+            db.add(Card(content="其他进程", type=card_type, generate_date=today, is_daily=True))
+            await db.commit()
+        return "本进程"
+    
+    monkeypatch.setattr(daily_card, "generate_card_content", generate_while_other_process_inserts)
+    card = await get_or_create_daily_card("poetry", today)
+    
+    assert card.content == "其他进程"
+    assert await count_daily_cards() == 1
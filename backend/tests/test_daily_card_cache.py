@@ -0,0 +1,132 @@
+"""
+每日卡片缓存：次日零点过期、返回副本、关闭缓存，以及点赞写入后的失效
+"""
+
+from datetime import date
+
+import pytest
+from sqlalchemy import update
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.card import Card
+from app.utils import daily_card
+from app.utils.daily_card import DailyCardCache, daily_card_cache, next_midnight
+from app.utils.likes import like_buffer
+
+pytestmark = pytest.mark.anyio
+
+
+async def add_daily_card(likes: int = 0) -> Card:
+    async with AsyncSessionLocal() as db:
+        card = Card(content="今日卡片", type="poetry", generate_date=date.today(), is_daily=True, likes=likes)
+        db.add(card)
+        await db.commit()
+        return card
+
+
+async def set_card_content(card_id: int, content: str):
+    """绕过应用直接修改数据库中的卡片（模拟其他进程的写入）"""
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Card).where(Card.id == card_id).values(content=content))
+        await db.commit()
+
+
+async def get_daily(client) -> dict:
+    response = await client.get("/api/cards/daily")
+    assert response.status_code == 200
+    return response.json()["data"]
+
+
+def test_entry_expires_at_next_midnight(monkeypatch):
+    cache = DailyCardCache()
+    today = date.today()
+    cache.set(today, None, {"id": 1, "likes": 0})
+    
+    monkeypatch.setattr(daily_card.time, "time", lambda: next_midnight(today) - 1)
+    assert cache.get(today) == {"id": 1, "likes": 0}
+    monkeypatch.setattr(daily_card.time, "time", lambda: next_midnight(today))
+    assert cache.get(today) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_get_returns_copy():
+    cache = DailyCardCache()
+    today = date.today()
+    cache.set(today, "poetry", {"id": 1, "likes": 0})
+    
+    cache.get(today, "poetry")["is_liked"] = True
+    assert cache.get(today, "poetry") == {"id": 1, "likes": 0}
+    assert cache.get(today) is None
+
+
+def test_disabled_cache_stores_nothing(monkeypatch):
+    monkeypatch.setattr(settings, "daily_card_cache_enabled", False)
+    cache = DailyCardCache()
+    cache.set(date.today(), None, {"id": 1, "likes": 0})
+    
+    assert cache.get(date.today()) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidate_by_card_id():
+    cache = DailyCardCache()
+    today = date.today()
+    cache.set(today, None, {"id": 1, "likes": 0})
+    cache.set(today, "poetry", {"id": 1, "likes": 0})
+    cache.set(today, "philosophy", {"id": 2, "likes": 0})
+    
+    cache.invalidate(1)
+    assert cache.get(today) is None and cache.get(today, "poetry") is None
+    assert cache.get(today, "philosophy") is not None
+
+
+async def test_warm_cache_skips_card_query(client):
+    card = await add_daily_card()
+    assert (await get_daily(client))["content"] == "今日卡片"
+    
+    # 命中缓存时不再读取卡片表，数据库中的改动在失效前不可见
+    await set_card_content(card.id, "已修改")
+    hits = daily_card_cache.hits
+    assert (await get_daily(client))["content"] == "今日卡片"
+    assert daily_card_cache.hits == hits + 1
+
+
+async def test_like_invalidates_cached_card(client):
+    card = await add_daily_card()
+    await get_daily(client)
+    await set_card_content(card.id, "已修改")
+    
+    response = await client.post(f"/api/cards/{card.id}/like", json={"action": "like"})
+    assert response.json()["data"] == {"likes": 1, "is_liked": True}
+    assert daily_card_cache.stats()["entries"] == 0
+    
+    data = await get_daily(client)
+    assert (data["content"], data["likes"], data["is_liked"]) == ("已修改", 1, True)
+
+
+async def test_repeated_like_keeps_cache(client):
+    card = await add_daily_card(likes=3)
+    await client.post(f"/api/cards/{card.id}/like", json={"action": "like"})
+    await get_daily(client)
+    
+    # 重复点赞不改变卡片，缓存保留
+    await client.post(f"/api/cards/{card.id}/like", json={"action": "like"})
+    assert daily_card_cache.stats()["entries"] == 1
+    assert (await get_daily(client))["likes"] == 4
+
+
+async def test_buffered_likes_adjust_then_flush_invalidates(client, monkeypatch):
+    monkeypatch.setattr(settings, "like_buffer_enabled", True)
+    card = await add_daily_card()
+    await get_daily(client)
+    
+    # 增量写入数据库之前，缓存的卡片按增量同步
+    await client.post(f"/api/cards/{card.id}/like", json={"action": "like"})
+    assert (await get_daily(client))["likes"] == 1
+    
+    await set_card_content(card.id, "已修改")
+    assert await like_buffer.flush() == 1
+    assert daily_card_cache.stats()["entries"] == 0
+    data = await get_daily(client)
+    assert (data["content"], data["likes"]) == ("已修改", 1)
@@ -0,0 +1,42 @@
+"""
+数据导入：导入明细表后用户统计计数立即按明细表重算
+"""
+
+import json
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
+from app.models.card import Card
+from app.models.user import User
+from data_io import import_table
+
+pytestmark = pytest.mark.anyio
+
+
+def write_ndjson(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return str(path)
+
+
+async def test_import_interactions_and_favorites_reconciles_stats(db_ready, user, tmp_path):
+    async with AsyncSessionLocal() as db:
+        cards = [Card(content=f"卡片{i}", type="poetry", generate_date=date.today()) for i in range(3)]
+        db.add_all(cards)
+        await db.commit()
+    
+    interactions = write_ndjson(tmp_path / "interactions.ndjson", [
+        {"user_id": user.id, "card_id": card.id, "viewed": True, "liked": index < 2}
+        for index, card in enumerate(cards)
+    ])
+    await import_table("interactions", interactions, "ndjson", 2, False)
+    favorites = write_ndjson(tmp_path / "favorites.ndjson", [{"user_id": user.id, "card_id": cards[0].id}])
+    await import_table("favorites", favorites, "ndjson", 2, False)
+    
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(select(User).where(User.id == user.id))).scalar_one()
+    assert (row.total_cards, row.total_likes, row.favorite_count) == (3, 2, 1)
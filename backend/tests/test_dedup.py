@@ -0,0 +1,140 @@
+"""
+近似重复检测：索引查询、检查与登记分离，以及启动时从数据库加载
+"""
+
+import asyncio
+import random
+import time
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.config import settings
+from app.database import AsyncSessionLocal, get_db
+from app.models.card import Card
+from app.routers import cards
+from app.utils.dedup import ContentDeduplicator, MinHashLSHIndex, minhash
+
+pytestmark = pytest.mark.anyio
+
+TEXT = "生活不会辜负每一个认真努力的人，愿你在平凡的日子里发现光亮"
+
+
+def test_index_finds_near_duplicates_only():
+    index = MinHashLSHIndex(0.5)
+    index.add(minhash(TEXT))
+    
+    assert len(index) == 1
+    assert index.find_similar(minhash(TEXT.replace("光亮", "光芒"))) is not None
+    assert index.find_similar(minhash("春眠不觉晓，处处闻啼鸟，夜来风雨声，花落知多少")) is None
+
+
+def test_colliding_band_keys_are_all_checked():
+    """同一段哈希下的多个条目都参与比较"""
+    index = MinHashLSHIndex(0.5)
+    for text in ["今天天气很好适合出门散步", "今天天气很好适合在家读书", TEXT]:
+        index.add(minhash(text))
+    
+    assert len(index) == 3
+    assert index.find_similar(minhash(TEXT + "。")) is not None
+
+
+@pytest.fixture
+def dedup(monkeypatch):
+    """启用近似重复检测的独立索引"""
+    monkeypatch.setattr(settings, "content_dedup_enabled", True)
+    deduplicator = ContentDeduplicator()
+    monkeypatch.setattr(cards, "content_dedup", deduplicator)
+    return deduplicator
+
+
+def test_check_does_not_register(dedup):
+    assert not dedup.is_duplicate(TEXT)
+    assert not dedup.is_duplicate(TEXT)
+    assert len(dedup.index) == 0
+    
+    dedup.register(TEXT)
+    assert dedup.is_duplicate(TEXT.replace("光亮", "光芒"))
+    assert (dedup.accepted, dedup.rejected) == (1, 1)
+
+
+def test_filter_drops_duplicates_within_batch_and_pending(dedup):
+    dedup.register("春眠不觉晓，处处闻啼鸟，夜来风雨声，花落知多少")
+    batch = [TEXT, TEXT + "。", "春眠不觉晓，处处闻啼鸟，夜来风雨声，花落知多少呀", "今天天气很好适合出门散步"]
+    assert dedup.filter(batch) == [TEXT, "今天天气很好适合出门散步"]
+    assert dedup.filter(batch, pending=[TEXT]) == ["今天天气很好适合出门散步"]
+    assert len(dedup.index) == 1
+
+
+async def test_failed_save_is_not_registered(client, dedup, monkeypatch):
+    from main import app
+    
+    async def generate(card_type):
+        return TEXT
+    
+    async def failing_db():
+        async with AsyncSessionLocal() as db:
+            async def fail():
+                raise RuntimeError("写入失败")
+            db.commit = fail
+            yield db
+    
+    monkeypatch.setattr(cards, "generate_card_content", generate)
+    app.dependency_overrides[get_db] = failing_db
+    try:
+        response = await client.post("/api/cards/generate", json={"type": "poetry"})
+    finally:
+        app.dependency_overrides.pop(get_db)
+    assert not response.json()["success"]
+    assert not dedup.is_duplicate(TEXT)
+    
+    assert (await client.post("/api/cards/generate", json={"type": "poetry"})).json()["success"]
+    assert dedup.is_duplicate(TEXT)
+
+
+async def test_load_window_skips_old_cards(db_ready, monkeypatch):
+    monkeypatch.setattr(settings, "content_dedup_enabled", True)
+    monkeypatch.setattr(settings, "content_dedup_window_days", 7)
+    async with AsyncSessionLocal() as db:
+        db.add_all([
+            Card(content=TEXT, type="poetry", generate_date=date.today() - timedelta(days=30)),
+            Card(content="今天天气很好适合出门散步", type="poetry", generate_date=date.today())
+        ])
+        await db.commit()
+    
+    dedup = ContentDeduplicator()
+    assert await dedup.load() == 1
+    assert not dedup.is_duplicate(TEXT)
+
+
+async def test_load_indexes_existing_cards_without_blocking_loop(db_ready, monkeypatch):
+    monkeypatch.setattr(settings, "content_dedup_enabled", True)
+    rng = random.Random(0)
+    chars = "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所"
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(Card.__table__), [
+            {"content": "".join(rng.choices(chars, k=30)), "type": "poetry", "generate_date": date.today(), "is_daily": False}
+            for _ in range(5000)
+        ] + [{"content": TEXT, "type": "poetry", "generate_date": date.today(), "is_daily": False}])
+        await db.commit()
+    
+    # 加载期间事件循环应持续响应：记录定时协程的最大延迟
+    delays = []
+    
+    async def ticker():
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            delays.append(time.perf_counter() - started - 0.005)
+    
+    dedup = ContentDeduplicator()
+    ticker_task = asyncio.get_running_loop().create_task(ticker())
+    try:
+        indexed = await dedup.load()
+    finally:
+        ticker_task.cancel()
+    
+    assert indexed == 5001
+    assert dedup.is_duplicate(TEXT.replace("光亮", "光芒"))
+    assert max(delays) < 0.2
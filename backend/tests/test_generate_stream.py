@@ -0,0 +1,118 @@
+"""
+流式生成（SSE）：增量、重置与完成事件，保存卡片，以及卡片类型校验
+
+上游为进程内的 fake_dashscope 模拟服务（经ASGI传输调用，不占用端口）。
+"""
+
+import json
+import sys
+
+import httpx
+import pytest
+from sqlalchemy import select
+
+import fake_dashscope
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.card import Card
+from app.routers import cards
+from app.utils.dedup import ContentDeduplicator
+from app.utils.resilience import UpstreamGuard
+
+# app.utils 导出了同名的全局实例，从sys.modules取模块本身
+ai_generator_module = sys.modules["app.utils.ai_generator"]
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def fake_upstream(monkeypatch):
+    """AI调用经ASGI传输发往进程内的模拟服务，输出不加延迟"""
+    fake_dashscope.configure(token_delay=0)
+    upstream = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_dashscope.app))
+    monkeypatch.setattr(ai_generator_module, "get_upstream_client", lambda name: upstream)
+    monkeypatch.setattr(ai_generator_module, "dashscope_guard", UpstreamGuard("dashscope"))
+    monkeypatch.setattr(ai_generator_module.ai_generator, "api_key", "test-key")
+    monkeypatch.setattr(ai_generator_module.ai_generator, "base_url", "http://fake-dashscope/api/v1")
+    yield fake_dashscope
+    fake_dashscope.configure()
+    await upstream.aclose()
+
+
+@pytest.fixture
+def dedup(monkeypatch):
+    """启用近似重复检测的独立索引"""
+    monkeypatch.setattr(settings, "content_dedup_enabled", True)
+    deduplicator = ContentDeduplicator()
+    monkeypatch.setattr(cards, "content_dedup", deduplicator)
+    return deduplicator
+
+
+async def stream_events(client, card_type: str = "poetry") -> list:
+    response = await client.get("/api/cards/generate/stream", params={"type": card_type})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def shown_text(events: list) -> str:
+    """客户端按事件显示的文本：delta追加，reset清空"""
+    text = ""
+    for event, data in events:
+        if event == "delta":
+            text += data["text"]
+        elif event == "reset":
+            text = ""
+    return text
+
+
+async def saved_cards() -> list:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(Card.id, Card.content, Card.type))).all()
+
+
+async def test_stream_deltas_then_done_with_saved_card(client, fake_upstream):
+    events = await stream_events(client)
+    kinds = [event for event, _ in events]
+    assert kinds[-1] == "done" and set(kinds[:-1]) == {"delta"} and len(kinds) > 2
+    
+    card = events[-1][1]
+    assert card["content"] == shown_text(events)
+    assert card["content"] in fake_dashscope.SAMPLE_CONTENTS
+    assert [tuple(row) for row in await saved_cards()] == [(card["id"], card["content"], "poetry")]
+
+
+async def test_duplicate_content_resets_then_falls_back(client, fake_upstream, dedup, monkeypatch):
+    monkeypatch.setattr(settings, "content_dedup_max_attempts", 2)
+    for content in fake_dashscope.SAMPLE_CONTENTS:
+        dedup.register(content)
+    
+    events = await stream_events(client)
+    assert [event for event, _ in events].count("reset") == 2
+    card = events[-1][1]
+    assert card["content"] == shown_text(events)
+    assert card["content"] not in fake_dashscope.SAMPLE_CONTENTS
+    assert len(await saved_cards()) == 1
+
+
+async def test_upstream_error_falls_back(client, fake_upstream):
+    fake_upstream.configure(token_delay=0, error_rate=1.0)
+    events = await stream_events(client, "philosophy")
+    assert [event for event, _ in events] == ["delta", "done"]
+    assert events[-1][1]["content"] == events[0][1]["text"]
+    assert events[-1][1]["type"] == "philosophy"
+
+
+@pytest.mark.parametrize("method, path, params, body", [
+    ("GET", "/api/cards/generate/stream", {"type": "unknown"}, None),
+    ("POST", "/api/cards/generate", None, {"type": "unknown"}),
+    ("POST", "/api/cards/generate/batch", None, {"type": "unknown", "count": 2})
+])
+async def test_unknown_type_rejected(client, method, path, params, body):
+    response = await client.request(method, path, params=params, json=body)
+    assert response.status_code == 400
+    assert await saved_cards() == []
@@ -0,0 +1,172 @@
+"""
+点赞幂等与用户统计计数：只有状态真正变化时才改变点赞数与计数，批量写入与每晚校正
+"""
+
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.card import Card
+from app.models.interaction import UserCardInteraction
+from app.models.user import User
+from app.utils.likes import like_buffer
+from app.utils.user_stats import reconcile_user_stats, user_stats
+
+pytestmark = pytest.mark.anyio
+
+
+async def add_card(likes: int = 0) -> Card:
+    async with AsyncSessionLocal() as db:
+        card = Card(content="测试卡片", type="poetry", generate_date=date.today(), likes=likes)
+        db.add(card)
+        await db.commit()
+        return card
+
+
+async def card_likes(card_id: int) -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(Card.likes).where(Card.id == card_id))
+
+
+async def like(client, card_id: int, action: str = "like") -> dict:
+    response = await client.post(f"/api/cards/{card_id}/like", json={"action": action})
+    assert response.json()["success"]
+    return response.json()["data"]
+
+
+async def stats(client) -> dict:
+    await user_stats.flush()
+    return (await client.get("/api/users/stats")).json()["data"]
+
+
+async def test_repeated_like_and_unlike_change_count_once(client):
+    card = await add_card(likes=5)
+    
+    for _ in range(3):
+        assert await like(client, card.id) == {"likes": 6, "is_liked": True}
+    assert (await client.get(f"/api/cards/{card.id}")).json()["data"]["is_liked"] is True
+    
+    for _ in range(2):
+        assert await like(client, card.id, "unlike") == {"likes": 5, "is_liked": False}
+    assert await card_likes(card.id) == 5
+    assert (await client.get(f"/api/cards/{card.id}")).json()["data"]["is_liked"] is False
+
+
+async def test_unlike_without_like_keeps_count(client, user):
+    card = await add_card()
+    assert await like(client, card.id, "unlike") == {"likes": 0, "is_liked": False}
+    assert user_stats.pending(user.id) == {}
+
+
+async def test_concurrent_likes_by_same_user_count_once(client):
+    card = await add_card()
+    await asyncio.gather(*[like(client, card.id) for _ in range(10)])
+    
+    assert await card_likes(card.id) == 1
+    async with AsyncSessionLocal() as db:
+        rows = await db.scalar(select(func.count()).select_from(UserCardInteraction))
+    assert rows == 1
+
+
+async def test_buffered_likes_are_written_on_flush(client, monkeypatch):
+    monkeypatch.setattr(settings, "like_buffer_enabled", True)
+    card = await add_card(likes=2)
+    
+    assert await like(client, card.id) == {"likes": 3, "is_liked": True}
+    assert await like(client, card.id) == {"likes": 3, "is_liked": True}
+    assert like_buffer.pending(card.id) == 1 and await card_likes(card.id) == 2
+    
+    assert await like_buffer.flush() == 1
+    assert await card_likes(card.id) == 3 and like_buffer.pending(card.id) == 0
+
+
+async def test_counters_follow_state_changes(client):
+    first, second = await add_card(), await add_card()
+    await like(client, first.id)
+    await like(client, first.id)
+    await like(client, second.id)
+    await like(client, second.id, "unlike")
+    await client.post(f"/api/cards/{first.id}/favorite")
+    assert not (await client.post(f"/api/cards/{first.id}/favorite")).json()["success"]
+    
+    # 未写入的增量已体现在统计中
+    data = (await client.get("/api/users/stats")).json()["data"]
+    assert (data["total_likes"], data["favorite_count"]) == (1, 1)
+    
+    await client.delete(f"/api/cards/{first.id}/favorite")
+    assert not (await client.delete(f"/api/cards/{first.id}/favorite")).json()["success"]
+    data = await stats(client)
+    assert (data["total_likes"], data["favorite_count"]) == (1, 0)
+
+
+async def test_first_views_count_once_and_advance_streak(client, user):
+    card = await add_card()
+    today = date.today()
+    user_stats.record_view(user.id, card.id, today - timedelta(days=1))
+    user_stats.record_view(user.id, card.id, today)
+    await client.get(f"/api/cards/{card.id}")
+    
+    data = await stats(client)
+    assert (data["total_cards"], data["consecutive_days"]) == (1, 2)
+    
+    # 再次写入同样的浏览事件不重复计数
+    user_stats.record_view(user.id, card.id, today)
+    data = await stats(client)
+    assert (data["total_cards"], data["consecutive_days"]) == (1, 2)
+
+
+async def test_reconcile_recomputes_counters_from_detail_tables(client, user):
+    card = await add_card()
+    await like(client, card.id)
+    await client.post(f"/api/cards/{card.id}/favorite")
+    await client.get(f"/api/cards/{card.id}")
+    await user_stats.flush()
+    
+    # 计数与明细表不一致（如进程退出丢失了增量），连续天数已中断
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(User).values(
+            total_cards=7, total_likes=0, favorite_count=3,
+            consecutive_days=4, last_active_date=date.today() - timedelta(days=3)
+        ))
+        await db.commit()
+    
+    async with AsyncSessionLocal() as db:
+        assert await reconcile_user_stats(db) == 1
+        await db.commit()
+        row = (await db.execute(select(User).where(User.id == user.id))).scalar_one()
+        assert (row.total_cards, row.total_likes, row.favorite_count, row.consecutive_days) == (1, 1, 1, 0)
+
+
+async def test_view_after_like_counts_as_first_view(client, user):
+    card = await add_card()
+    await like(client, card.id)
+    await client.get(f"/api/cards/{card.id}")
+    
+    data = await stats(client)
+    assert (data["total_cards"], data["total_likes"]) == (1, 1)
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(select(UserCardInteraction))).scalar_one()
+    assert row.viewed and row.liked
+
+
+async def test_repeat_views_skip_writes(client, user):
+    first, second = await add_card(), await add_card()
+    await client.get(f"/api/cards/{first.id}")
+    await stats(client)
+    
+    # 已写入的浏览不再进入待写入集合，写入时不产生任何语句
+    await client.get(f"/api/cards/{first.id}")
+    assert user_stats.stats()["pending_views"] == 0
+    assert await user_stats.flush() == 0
+    
+    # 进程内记录丢失（如重启）后重复写入同一浏览，数据库中已浏览的记录不再计数
+    user_stats._known_views.clear()
+    user_stats._known_days.clear()
+    await client.get(f"/api/cards/{first.id}")
+    await client.get(f"/api/cards/{second.id}")
+    data = await stats(client)
+    assert (data["total_cards"], data["consecutive_days"]) == (2, 1)
@@ -0,0 +1,117 @@
+"""
+数据库迁移：从引入迁移之前的数据库升级，升级后表结构与模型一致
+"""
+
+import os
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, ForeignKey, Integer, MetaData, String, Table, Text,
+    create_engine, func, inspect, text
+)
+
+from app.database import Base, get_alembic_config
+
+
+def baseline_metadata() -> MetaData:
+    """引入迁移之前的模型（users、cards、favorites），create_all 按此建表"""
+    metadata = MetaData()
+    Table(
+        "users", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("openid", String(100), unique=True, index=True, nullable=False),
+        Column("nickname", String(50), nullable=True),
+        Column("avatar_url", String(255), nullable=True),
+        Column("preference_type", String(20), default="all"),
+        Column("type_preference", String(20), default="all"),
+        Column("auto_update", Boolean, default=True),
+        Column("push_time", String(5), default="08:00"),
+        Column("total_cards", Integer, default=0),
+        Column("favorite_count", Integer, default=0),
+        Column("consecutive_days", Integer, default=0),
+        Column("total_likes", Integer, default=0),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        Column("updated_at", DateTime(timezone=True), onupdate=func.now())
+    )
+    Table(
+        "cards", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("content", Text, nullable=False),
+        Column("type", String(20), nullable=False),
+        Column("background_style", String(50), nullable=True),
+        Column("generate_date", Date, nullable=False),
+        Column("likes", Integer, default=0),
+        Column("is_generated", Boolean, default=True),
+        Column("created_at", DateTime(timezone=True), server_default=func.now())
+    )
+    Table(
+        "favorites", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+        Column("card_id", Integer, ForeignKey("cards.id"), nullable=False),
+        Column("created_at", DateTime(timezone=True), server_default=func.now())
+    )
+    return metadata
+
+
+@pytest.fixture
+def sync_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_path, 'migrate.db')}")
+    yield engine
+    engine.dispose()
+
+
+def run_alembic(engine, action, revision):
+    config = get_alembic_config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        getattr(command, action)(config, revision)
+
+
+def schema_diff(engine) -> list:
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={"compare_type": True})
+        return compare_metadata(context, Base.metadata)
+
+
+def test_baseline_database_upgrades_to_head(sync_engine):
+    """README中的流程：create_all 建立的数据库 stamp 0001 后 upgrade head"""
+    baseline_metadata().create_all(sync_engine)
+    with sync_engine.begin() as connection:
+        connection.execute(text("INSERT INTO users (id, openid) VALUES (1, 'u1')"))
+        connection.execute(text(
+            "INSERT INTO cards (id, content, type, generate_date) VALUES (1, '旧卡片', 'poetry', '2026-01-01')"
+        ))
+        connection.execute(text("INSERT INTO favorites (user_id, card_id) VALUES (1, 1)"))
+    
+    run_alembic(sync_engine, "stamp", "0001")
+    run_alembic(sync_engine, "upgrade", "head")
+    
+    assert schema_diff(sync_engine) == []
+    with sync_engine.connect() as connection:
+        assert connection.execute(text("SELECT is_daily FROM cards WHERE id = 1")).scalar() in (0, False)
+        assert connection.execute(text("SELECT favorite_count FROM users WHERE id = 1")).scalar() == 1
+    assert {"content_pool", "ai_usage_daily", "user_card_interactions"} <= set(inspect(sync_engine).get_table_names())
+
+
+def test_empty_database_upgrade_downgrade_roundtrip(sync_engine):
+    run_alembic(sync_engine, "upgrade", "head")
+    assert schema_diff(sync_engine) == []
+    
+    run_alembic(sync_engine, "downgrade", "base")
+    assert set(inspect(sync_engine).get_table_names()) == {"alembic_version"}
+    
+    run_alembic(sync_engine, "upgrade", "head")
+    assert schema_diff(sync_engine) == []
+
+
+def test_database_stamped_by_earlier_0001_upgrades(sync_engine):
+    """较早版本的 0001 已建好每日卡片列、内容池与AI用量表：0001a 跳过已存在的结构"""
+    run_alembic(sync_engine, "upgrade", "0001a")
+    run_alembic(sync_engine, "stamp", "0001")
+    run_alembic(sync_engine, "upgrade", "head")
+    
+    assert schema_diff(sync_engine) == []
@@ -0,0 +1,111 @@
+"""
+游标分页：翻页完整性、并列排序键、预取与参数校验
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select
+
+from app.database import AsyncSessionLocal
+from app.models.card import Card
+from app.models.favorite import Favorite
+from app.utils.pagination import paginate
+
+pytestmark = pytest.mark.anyio
+
+
+async def add_cards(count: int, cards_per_day: int = 3) -> list:
+    """每天cards_per_day张卡片（同一日期的卡片只能按id区分先后），返回按分页顺序排列的id"""
+    today = date.today()
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(Card.__table__), [
+            {"content": f"卡片{i}", "type": "poetry", "generate_date": today - timedelta(days=i // cards_per_day),
+             "is_daily": False}
+            for i in range(count)
+        ])
+        await db.commit()
+        rows = await db.execute(select(Card.id).order_by(Card.generate_date.desc(), Card.id.desc()))
+        return list(rows.scalars())
+
+
+async def walk(client, path: str, limit: int) -> list:
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        body = (await client.get(path, params=params)).json()
+        ids.extend(card["id"] for card in body["data"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+async def test_cursor_walk_returns_every_card_once_in_order(client):
+    expected = await add_cards(25)
+    
+    assert await walk(client, "/api/cards/history", 4) == expected
+    # 恰好整除时最后一页之后不再返回游标
+    assert await walk(client, "/api/cards/history", 5) == expected
+
+
+async def test_pages_do_not_shift_when_new_cards_arrive(client):
+    expected = await add_cards(10)
+    first = (await client.get("/api/cards/history", params={"limit": 4})).json()
+    await add_cards(3)
+    
+    second = (await client.get("/api/cards/history", params={"limit": 4, "cursor": first["next_cursor"]})).json()
+    assert [card["id"] for card in first["data"] + second["data"]] == expected[:8]
+
+
+async def test_prefetch_returns_next_page(client):
+    expected = await add_cards(12)
+    body = (await client.get("/api/cards/history", params={"limit": 4, "prefetch": "true"})).json()
+    
+    assert [card["id"] for card in body["data"]] == expected[:4]
+    assert [card["id"] for card in body["prefetched"]] == expected[4:8]
+    following = (await client.get("/api/cards/history", params={"limit": 4, "cursor": body["next_cursor"]})).json()
+    assert [card["id"] for card in following["data"]] == expected[8:]
+
+
+async def test_legacy_page_parameter_still_works(client):
+    expected = await add_cards(10)
+    body = (await client.get("/api/cards/history", params={"limit": 4, "page": 2})).json()
+    
+    assert [card["id"] for card in body["data"]] == expected[4:8]
+
+
+async def test_invalid_cursor_is_rejected(client):
+    response = await client.get("/api/cards/history", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("path", ["/api/cards/history", "/api/cards/favorites", "/api/users/favorites"])
+@pytest.mark.parametrize("params", [{"limit": 0}, {"limit": 101}, {"page": 0}])
+async def test_out_of_range_parameters_are_rejected(client, path, params):
+    response = await client.get(path, params=params)
+    assert response.status_code == 422
+
+
+async def test_users_favorites_cursor_in_header(client, user):
+    card_ids = await add_cards(5)
+    now = datetime.now()
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(Favorite.__table__), [
+            {"user_id": user.id, "card_id": card_id, "created_at": now - timedelta(minutes=i)}
+            for i, card_id in enumerate(card_ids)
+        ])
+        await db.commit()
+    
+    first = await client.get("/api/users/favorites", params={"limit": 3})
+    second = await client.get("/api/users/favorites", params={"limit": 3, "cursor": first.headers["X-Next-Cursor"]})
+    
+    assert [card["id"] for card in first.json() + second.json()] == card_ids
+    assert "X-Next-Cursor" not in second.headers
+
+
+async def test_paginate_with_zero_limit_returns_empty_page(db_ready):
+    await add_cards(3)
+    async with AsyncSessionLocal() as db:
+        rows, prefetched, next_cursor = await paginate(db, select(Card), [Card.generate_date, Card.id], 0)
+    
+    assert rows == [] and prefetched == [] and next_cursor is None
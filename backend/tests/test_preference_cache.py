@@ -0,0 +1,82 @@
+"""
+旧版服务的用户偏好类型：最近交互中点赞最多的类型、并列时的确定顺序，以及缓存命中与失效
+"""
+
+import importlib
+from datetime import date
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+pytestmark = pytest.mark.anyio
+
+USER_ID = 1
+
+
+@pytest.fixture
+def legacy(monkeypatch):
+    """旧版模块导入时按DATABASE_URL创建异步引擎，导入前换成异步驱动"""
+    monkeypatch.setenv("DATABASE_URL", "sqlite+aiosqlite://")
+    database = importlib.import_module("models.database")
+    service = importlib.import_module("services.ai_generator")
+    monkeypatch.setattr(service, "preference_cache", service.PreferenceCache(600))
+    return database, service
+
+
+@pytest.fixture
+async def legacy_db(legacy, tmp_path):
+    """旧版模型建表的独立临时数据库"""
+    database, _ = legacy
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(database.Base.metadata.create_all)
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as db:
+        yield db
+    await engine.dispose()
+
+
+async def like_cards(db, database, *card_types: str):
+    for card_type in card_types:
+        card = database.Card(content=f"{card_type}卡片", type=card_type, generate_date=date.today())
+        db.add(card)
+        await db.flush()
+        db.add(database.UserCardInteraction(user_id=USER_ID, card_id=card.id, viewed=True, liked=True))
+    await db.commit()
+
+
+async def test_most_liked_type_is_cached_until_invalidated(legacy, legacy_db):
+    database, service = legacy
+    generator = service.AIGeneratorService()
+    await like_cards(legacy_db, database, "poetry", "poetry", "philosophy")
+    assert await generator.get_liked_type(legacy_db, USER_ID) == "poetry"
+    
+    # 命中缓存时不重新统计
+    await like_cards(legacy_db, database, "philosophy", "philosophy")
+    assert await generator.get_liked_type(legacy_db, USER_ID) == "poetry"
+    assert service.preference_cache.get(USER_ID) == (True, "poetry")
+    
+    service.preference_cache.invalidate(USER_ID)
+    assert service.preference_cache.get(USER_ID) == (False, None)
+    assert await generator.get_liked_type(legacy_db, USER_ID) == "philosophy"
+
+
+async def test_user_without_likes_is_cached_as_none(legacy, legacy_db):
+    _, service = legacy
+    assert await service.AIGeneratorService().get_liked_type(legacy_db, USER_ID) is None
+    assert service.preference_cache.get(USER_ID) == (True, None)
+
+
+async def test_tied_types_resolve_by_name(legacy, legacy_db):
+    database, service = legacy
+    await like_cards(legacy_db, database, "poetry", "motivational", "philosophy")
+    assert await service.AIGeneratorService().get_liked_type(legacy_db, USER_ID) == "motivational"
+
+
+def test_entries_expire_after_ttl(legacy, monkeypatch):
+    _, service = legacy
+    cache = service.PreferenceCache(ttl=60)
+    now = service.time.monotonic()
+    cache.set(USER_ID, "poetry")
+    
+    monkeypatch.setattr(service.time, "monotonic", lambda: now + 61)
+    assert cache.get(USER_ID) == (False, None)
@@ -0,0 +1,72 @@
+"""
+列表接口SQL查询次数：每页的查询次数固定，不随分页大小增长
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.database import AsyncSessionLocal, engine, read_engine
+from app.models.card import Card
+from app.models.favorite import Favorite
+
+pytestmark = pytest.mark.anyio
+
+PAGE_SIZES = [1, 10, 100]
+
+# 每页查询次数上限（含认证查询用户）
+QUERY_BUDGETS = {
+    "/api/cards/history": 5,
+    "/api/cards/favorites": 3
+}
+
+
+class QueryCounter:
+    """统计引擎上执行的SQL语句数"""
+    
+    def __init__(self, *engines):
+        self.count = 0
+        self.engines = [target.sync_engine for target in set(engines)]
+    
+    def _on_execute(self, *args):
+        self.count += 1
+    
+    def __enter__(self):
+        for target in self.engines:
+            event.listen(target, "before_cursor_execute", self._on_execute)
+        return self
+    
+    def __exit__(self, *exc):
+        for target in self.engines:
+            event.remove(target, "before_cursor_execute", self._on_execute)
+
+
+@pytest.fixture
+async def cards(user):
+    """两倍最大分页大小的卡片，收藏其中偶数序号的一半"""
+    async with AsyncSessionLocal() as db:
+        for i in range(max(PAGE_SIZES) * 2):
+            card = Card(content=f"测试卡片{i}", type="inspirational", generate_date=date.today() - timedelta(days=i))
+            db.add(card)
+            await db.flush()
+            if i % 2 == 0:
+                db.add(Favorite(user_id=user.id, card_id=card.id))
+        await db.commit()
+
+
+@pytest.mark.parametrize("path", list(QUERY_BUDGETS))
+async def test_queries_per_page_are_fixed(client, cards, path):
+    counts = {}
+    for limit in PAGE_SIZES:
+        with QueryCounter(engine, read_engine) as counter:
+            response = await client.get(path, params={"limit": limit})
+        assert response.status_code == 200
+        page = response.json()["data"]
+        assert len(page) == limit
+        if path.endswith("history"):
+            favorited = {card["id"] for card in page if int(card["content"].removeprefix("测试卡片")) % 2 == 0}
+            assert {card["id"] for card in page if card["is_favorited"]} == favorited
+        counts[limit] = counter.count
+    
+    assert set(counts.values()) == {QUERY_BUDGETS[path]}, counts
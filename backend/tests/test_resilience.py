@@ -0,0 +1,186 @@
+"""
+上游调用弹性策略：熔断器状态转换、自适应超时、对冲请求与截止时间
+"""
+
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.utils.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceededError,
+    UpstreamGuard,
+    deadline_scope,
+    remaining_time,
+)
+
+pytestmark = pytest.mark.anyio
+
+MAX_TIMEOUT = 1.0
+
+
+@pytest.fixture
+def guard(monkeypatch):
+    """超时上限1秒、5个样本即启用自适应超时与对冲的保护器"""
+    monkeypatch.setattr(settings, "upstream_timeouts", {**settings.upstream_timeouts, "test": MAX_TIMEOUT})
+    monkeypatch.setattr(settings, "ai_breaker_failure_threshold", 3)
+    monkeypatch.setattr(settings, "ai_latency_min_samples", 5)
+    monkeypatch.setattr(settings, "ai_timeout_min", 0.05)
+    monkeypatch.setattr(settings, "ai_timeout_multiplier", 2)
+    return UpstreamGuard("test")
+
+
+def warm_up(guard: UpstreamGuard, latency: float, samples: int = 5):
+    for _ in range(samples):
+        guard.latency.record(latency)
+
+
+def expire_cooldown(breaker: CircuitBreaker):
+    breaker.opened_at -= breaker.reset_timeout
+
+
+def reply_after(delay: float, value=None, error: Exception = None):
+    async def func(timeout):
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return value
+    return func
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow_request()
+    
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    assert breaker.snapshot()["rejected"] == 1 and breaker.open_count == 1
+
+
+def test_half_open_allows_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    expire_cooldown(breaker)
+    
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+    
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request() and breaker.allow_request()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure()
+    expire_cooldown(breaker)
+    assert breaker.allow_request()
+    
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and breaker.open_count == 2
+    assert not breaker.allow_request()
+
+
+def test_released_probe_can_be_retried():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    expire_cooldown(breaker)
+    assert breaker.allow_request()
+    
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_timeout_follows_latency_percentile(guard):
+    # 样本不足时使用配置的超时上限
+    warm_up(guard, 0.1, samples=4)
+    assert guard.current_timeout() == MAX_TIMEOUT
+    
+    guard.latency.record(0.1)
+    assert guard.current_timeout() == pytest.approx(0.2)
+    
+    # 不低于下限、不超过上限
+    warm_up(guard, 0.01, samples=200)
+    assert guard.current_timeout() == settings.ai_timeout_min
+    warm_up(guard, 5, samples=200)
+    assert guard.current_timeout() == MAX_TIMEOUT
+
+
+async def test_failures_open_breaker_and_reject_calls(guard):
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            await guard.call(reply_after(0, error=ConnectionError("上游断开")))
+    
+    with pytest.raises(CircuitOpenError):
+        await guard.call(reply_after(0, "不会执行"))
+    assert (guard.calls, guard.failures) == (3, 3)
+
+
+async def test_slow_call_times_out(guard):
+    warm_up(guard, 0.05)
+    with pytest.raises(asyncio.TimeoutError):
+        await guard.call(reply_after(0.5, "太慢"))
+    assert guard.timeouts == 1
+    assert guard.breaker.consecutive_failures == 1
+
+
+async def test_hedge_wins_when_primary_is_slow(guard, monkeypatch):
+    monkeypatch.setattr(settings, "ai_hedge_enabled", True)
+    warm_up(guard, 0.1)
+    replies = iter([reply_after(0.5, "首个请求"), reply_after(0.01, "对冲请求")])
+    
+    async def func(timeout):
+        return await next(replies)(timeout)
+    
+    assert await guard.call(func) == "对冲请求"
+    assert (guard.hedged, guard.hedge_wins) == (1, 1)
+
+
+async def test_hedge_not_sent_when_primary_is_fast(guard, monkeypatch):
+    monkeypatch.setattr(settings, "ai_hedge_enabled", True)
+    warm_up(guard, 0.1)
+    assert await guard.call(reply_after(0.01, "首个请求")) == "首个请求"
+    assert guard.hedged == 0
+
+
+async def test_hedge_falls_back_to_primary_after_hedge_failure(guard, monkeypatch):
+    monkeypatch.setattr(settings, "ai_hedge_enabled", True)
+    warm_up(guard, 0.1)
+    replies = iter([reply_after(0.15, "首个请求"), reply_after(0, error=ConnectionError("对冲失败"))])
+    
+    async def func(timeout):
+        return await next(replies)(timeout)
+    
+    assert await guard.call(func) == "首个请求"
+    assert (guard.hedged, guard.hedge_wins) == (1, 0)
+
+
+async def test_deadline_scope_keeps_earliest_deadline():
+    assert remaining_time() is None
+    with deadline_scope(0.5):
+        with deadline_scope(10):
+            assert remaining_time() <= 0.5
+        with deadline_scope(None):
+            assert remaining_time() is None
+    assert remaining_time() is None
+
+
+async def test_deadline_limits_timeout_and_rejects_when_too_close(guard):
+    with deadline_scope(0.3):
+        assert 0.05 < guard.before_call() <= 0.3
+    
+    with deadline_scope(0.01):
+        with pytest.raises(DeadlineExceededError):
+            await guard.call(reply_after(0, "不会执行"))
+    assert guard.calls == 1
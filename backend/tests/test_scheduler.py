@@ -0,0 +1,54 @@
+"""
+定时任务调度器：启动的任务在完成前保持引用，异常退出时记录日志
+"""
+
+import asyncio
+
+import pytest
+
+from app.utils.scheduler import SchedulerManager
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_spawned_jobs_are_held_until_done(capsys):
+    manager = SchedulerManager()
+    release = asyncio.Event()
+    
+    async def job():
+        await release.wait()
+    
+    manager._spawn(job)
+    manager._spawn(job)
+    assert len(manager._tasks) == 2
+    
+    release.set()
+    await asyncio.gather(*manager._tasks)
+    await asyncio.sleep(0)
+    assert manager._tasks == set()
+    assert "❌" not in capsys.readouterr().out
+
+
+async def test_failed_job_is_logged(capsys):
+    manager = SchedulerManager()
+    
+    async def job():
+        raise RuntimeError("生成失败")
+    
+    manager._spawn(job)
+    await asyncio.gather(*manager._tasks, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert manager._tasks == set()
+    assert "定时任务异常退出: RuntimeError('生成失败')" in capsys.readouterr().out
+
+
+async def test_stop_cancels_running_jobs(capsys):
+    manager = SchedulerManager()
+    manager._spawn(asyncio.Event().wait)
+    task = next(iter(manager._tasks))
+    
+    manager.stop_scheduler()
+    await asyncio.gather(task, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert task.cancelled() and manager._tasks == set()
+    assert "❌" not in capsys.readouterr().out
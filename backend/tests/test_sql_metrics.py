@@ -0,0 +1,64 @@
+"""
+请求级SQL统计：DEBUG模式下的 Server-Timing 响应头、按路由模板汇总与慢查询日志的参数脱敏
+"""
+
+from datetime import date
+
+import pytest
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.card import Card
+from app.utils.sql_metrics import redact_parameters, sql_metrics
+
+pytestmark = pytest.mark.anyio
+
+
+async def add_card() -> Card:
+    async with AsyncSessionLocal() as db:
+        card = Card(content="测试卡片", type="poetry", generate_date=date.today())
+        db.add(card)
+        await db.commit()
+        return card
+
+
+async def test_server_timing_header_only_in_debug(client, monkeypatch):
+    await add_card()
+    assert "Server-Timing" not in (await client.get("/api/cards/history")).headers
+    
+    monkeypatch.setattr(settings, "debug", True)
+    response = await client.get("/api/cards/history")
+    assert response.status_code == 200
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("db;dur=") and 'desc="5 queries"' in timing
+    assert "db-slowest;dur=" in timing
+
+
+async def test_requests_are_grouped_by_route_template(client, monkeypatch):
+    monkeypatch.setattr(sql_metrics, "routes", {})
+    first, second = await add_card(), await add_card()
+    await client.get(f"/api/cards/{first.id}")
+    await client.get(f"/api/cards/{second.id}")
+    await client.get("/api/cards/no-such-route/extra")
+    
+    routes = (await client.get("/metrics/db")).json()["routes"]
+    detail = routes["GET /api/cards/{card_id}"]
+    assert detail["requests"] == 2 and detail["max_queries_per_request"] > 0
+    assert not any("no-such-route" in route for route in routes)
+
+
+async def test_slow_query_log_redacts_bound_values(client, monkeypatch, capsys):
+    monkeypatch.setattr(settings, "sql_slow_query_ms", 0)
+    capsys.readouterr()
+    await client.get("/api/cards/history", params={"type": "secret-type-value"})
+    
+    logged = [line for line in capsys.readouterr().out.splitlines() if line.startswith("🐢 慢查询")]
+    assert any("FROM cards" in line for line in logged)
+    assert all("secret-type-value" not in line for line in logged)
+    assert any("'str'" in line for line in logged)
+
+
+def test_redact_parameters_keeps_only_types():
+    assert redact_parameters(("用户数据", 3, None)) == ["str", "int", "NoneType"]
+    assert redact_parameters({"openid": "o-123"}) == {"openid": "str"}
+    assert redact_parameters([("a", 1), ("b", 2)]) == {"rows": 2, "first": ["str", "int"]}
@@ -0,0 +1,201 @@
+"""
+Celery任务：以eager模式（memory:// broker）在调用处同步执行
+
+任务通过 run_async 在worker常驻事件循环中访问数据库，用例同样在该循环中准备与清理数据，
+不使用依赖测试事件循环的异步夹具。
+"""
+
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+import tasks
+from app.config import settings
+from app.database import AsyncSessionLocal, Base, close_db, engine, init_db
+from app.models.card import Card
+from app.models.content_pool import PooledContent
+from app.models.user import User
+from app.utils import daily_card
+from app.utils.ai_generator import ai_generator
+from app.utils.content_pool import content_pool
+from app.utils.daily_card import daily_card_cache
+from app.utils.wechat import wechat_client
+from tasks import (
+    backfill_daily_cards,
+    celery,
+    generate_daily_card,
+    push_daily_card,
+    reconcile_user_stats,
+    refill_all_content_pools,
+    refill_content_pool,
+    run_async,
+)
+
+
+@pytest.fixture(autouse=True)
+def eager_celery(monkeypatch):
+    monkeypatch.setattr(celery.conf, "task_always_eager", True)
+    monkeypatch.setattr(celery.conf, "broker_url", "memory://")
+    monkeypatch.setattr(celery.conf, "result_backend", "cache+memory://")
+
+
+@pytest.fixture
+def worker_db():
+    """在worker事件循环中迁移并清空数据库，结束时在同一循环中关闭连接池"""
+    async def reset():
+        await init_db()
+        async with engine.begin() as conn:
+            for table in reversed(Base.metadata.sorted_tables):
+                await conn.execute(table.delete())
+    
+    run_async(reset())
+    daily_card_cache.invalidate()
+    yield
+    run_async(close_db())
+
+
+@pytest.fixture
+def generated(monkeypatch):
+    """替换每日卡片的AI生成，记录生成的类型"""
+    calls = []
+    
+    async def fake_generate(card_type):
+        calls.append(card_type)
+        return f"{card_type}每日卡片{len(calls)}"
+    
+    monkeypatch.setattr(daily_card, "generate_card_content", fake_generate)
+    return calls
+
+
+async def count(model, *conditions) -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(model).where(*conditions))
+
+
+async def current_loop():
+    return asyncio.get_running_loop()
+
+
+def test_run_async_reuses_worker_loop():
+    loop = run_async(current_loop())
+    assert run_async(current_loop()) is loop and not loop.is_closed()
+    
+    # 循环被关闭后重新创建
+    loop.close()
+    assert run_async(current_loop()) is tasks._loop is not loop
+
+
+def test_generate_daily_card_is_idempotent(worker_db, generated):
+    today = date.today().isoformat()
+    first = generate_daily_card.delay(day=today).get()
+    second = generate_daily_card.delay(day=today).get()
+    assert first["id"] == second["id"] and len(generated) == 1
+    
+    poetry = generate_daily_card.delay("poetry", today).get()
+    assert generate_daily_card.delay("poetry", today).get()["id"] == poetry["id"]
+    assert run_async(count(Card, Card.is_daily.is_(True))) == (1 if first["type"] == "poetry" else 2)
+
+
+def test_backfill_skips_existing_dates(worker_db, generated):
+    start = date.today() - timedelta(days=2)
+    generate_daily_card.delay("poetry", start.isoformat()).get()
+    
+    result = backfill_daily_cards.delay(start.isoformat(), types=["poetry", "philosophy"]).get()
+    assert result == {"days": 3, "queued": 5}
+    assert backfill_daily_cards.delay(start.isoformat(), types=["poetry", "philosophy"]).get()["queued"] == 0
+    assert run_async(count(Card, Card.is_daily.is_(True))) == 6
+    assert len(generated) == 6
+
+
+def test_refill_content_pool_stops_at_target(worker_db, monkeypatch):
+    monkeypatch.setattr(settings, "content_pool_size", 5)
+    monkeypatch.setattr(settings, "ai_batch_size", 2)
+    # 信号量绑定创建它的事件循环，换到worker循环后重新创建
+    monkeypatch.setattr(content_pool, "_semaphore", None)
+    produced = []
+    
+    async def fake_batch(content_type, count):
+        produced.extend(range(count))
+        return [f"{content_type}内容{len(produced) - i}" for i in range(count)]
+    
+    monkeypatch.setattr(ai_generator, "generate_batch", fake_batch)
+    assert refill_content_pool.delay("poetry").get() == {"type": "poetry", "added": 5}
+    assert refill_content_pool.delay("poetry").get() == {"type": "poetry", "added": 0}
+    assert run_async(count(PooledContent, PooledContent.type == "poetry")) == 5
+    
+    assert refill_all_content_pools.delay().get() == {"queued": len(settings.content_types)}
+    assert run_async(count(PooledContent)) == 5 * len(settings.content_types)
+
+
+def test_push_fans_out_batches_per_card(worker_db, generated, monkeypatch):
+    monkeypatch.setattr(settings, "push_batch_size", 2)
+    sent = []
+    
+    async def fake_send(openid, template_id, data, page=None):
+        sent.append((openid, page))
+        return True
+    
+    monkeypatch.setattr(wechat_client, "send_subscribe_message", fake_send)
+    
+    async def add_users():
+        async with AsyncSessionLocal() as db:
+            db.add_all([User(openid=f"poetry-{i}", type_preference="poetry", push_time="08:00") for i in range(3)])
+            db.add_all([
+                User(openid="philosophy-0", type_preference="philosophy", push_time="08:00"),
+                User(openid="all-0", type_preference="all", push_time="08:00"),
+                User(openid="later", type_preference="poetry", push_time="09:00"),
+                User(openid="disabled", type_preference="poetry", push_time="08:00", auto_update=False)
+            ])
+            await db.commit()
+    
+    run_async(add_users())
+    result = push_daily_card.delay("08:00").get()
+    # 每张卡片的用户按批次拆分：诗词3人2批、哲理1人1批，不限类型的用户并入已有卡片的批次
+    assert result == {"push_time": "08:00", "users": 5, "batches": 3}
+    assert sorted(openid for openid, _ in sent) == ["all-0", "philosophy-0", "poetry-0", "poetry-1", "poetry-2"]
+    
+    pages = {openid: page for openid, page in sent}
+    assert len({pages[f"poetry-{i}"] for i in range(3)}) == 1
+    assert pages["philosophy-0"] != pages["poetry-0"]
+    assert pages["all-0"] in {pages["philosophy-0"], pages["poetry-0"]}
+    assert sorted(generated) == ["philosophy", "poetry"]
+
+
+def test_send_push_batch_reports_failures(worker_db, generated, monkeypatch):
+    monkeypatch.setattr(wechat_client, "send_subscribe_message", _fail_for("b"))
+    card = generate_daily_card.delay("poetry", date.today().isoformat()).get()
+    
+    async def add_users():
+        async with AsyncSessionLocal() as db:
+            users = [User(openid=openid) for openid in ("a", "b", "c")]
+            db.add_all(users)
+            await db.commit()
+            return [user.id for user in users]
+    
+    user_ids = run_async(add_users())
+    assert tasks.send_push_batch.delay(card["id"], user_ids).get() == {"sent": 2, "failed": 1}
+    assert tasks.send_push_batch.delay(card["id"] + 1000, user_ids).get() == {"sent": 0, "failed": 3}
+
+
+def _fail_for(failing_openid):
+    async def send(openid, template_id, data, page=None):
+        return openid != failing_openid
+    return send
+
+
+def test_reconcile_user_stats_task(worker_db):
+    async def add_user():
+        async with AsyncSessionLocal() as db:
+            db.add(User(openid="stale", total_likes=4, favorite_count=2))
+            await db.commit()
+    
+    run_async(add_user())
+    assert reconcile_user_stats.delay().get() == {"users": 1}
+    
+    async def counters():
+        async with AsyncSessionLocal() as db:
+            return (await db.execute(select(User.total_likes, User.favorite_count))).one()
+    
+    assert tuple(run_async(counters())) == (0, 0)
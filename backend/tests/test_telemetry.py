@@ -0,0 +1,78 @@
+"""
+AI调用遥测：按天增量写入 ai_usage_daily，多次写入与多进程写入累加而不重复、不覆盖
+"""
+
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
+from app.models.ai_usage import AIUsageDaily
+from app.utils import telemetry
+from app.utils.telemetry import AITelemetry
+
+pytestmark = pytest.mark.anyio
+
+USAGE = {"input_tokens": 30, "output_tokens": 20}
+
+
+async def usage_rows() -> dict:
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(select(AIUsageDaily))).scalars().all()
+        return {(row.date, row.type): row.to_dict() for row in rows}
+
+
+async def test_flushes_accumulate_without_doubling(db_ready):
+    recorder = AITelemetry()
+    recorder.record_call("poetry", 0.1, USAGE)
+    recorder.record_call("poetry", 0.3, USAGE)
+    recorder.record_call("poetry", 0.2, error=TimeoutError())
+    recorder.record_generation("poetry", fallback=False)
+    recorder.record_call("philosophy", 0.1, USAGE)
+    assert await recorder.flush() == 2
+    
+    # 已写入的增量不再重复写入
+    assert await recorder.flush() == 0
+    
+    recorder.record_call("poetry", 0.2, USAGE)
+    recorder.record_generation("poetry", fallback=True)
+    assert await recorder.flush() == 1
+    
+    rows = await usage_rows()
+    poetry = rows[(date.today(), "poetry")]
+    assert (poetry["calls"], poetry["errors"], poetry["generations"], poetry["fallbacks"]) == (4, 1, 2, 1)
+    assert (poetry["prompt_tokens"], poetry["completion_tokens"]) == (90, 60)
+    assert poetry["avg_latency_ms"] == pytest.approx(200)
+    assert rows[(date.today(), "philosophy")]["calls"] == 1
+
+
+async def test_flushes_from_several_processes_add_up(db_ready):
+    first, second = AITelemetry(), AITelemetry()
+    first.record_call("poetry", 0.1, USAGE)
+    second.record_call("poetry", 0.1, USAGE)
+    second.record_call("poetry", 0.1, USAGE)
+    
+    await first.flush()
+    await second.flush()
+    poetry = (await usage_rows())[(date.today(), "poetry")]
+    assert (poetry["calls"], poetry["prompt_tokens"], poetry["completion_tokens"]) == (3, 90, 60)
+    
+    # 内存中的累计指标只含本进程的调用
+    assert first.snapshot()["total"]["calls"] == 1
+
+
+async def test_failed_flush_keeps_deltas(db_ready, monkeypatch):
+    recorder = AITelemetry()
+    recorder.record_call("poetry", 0.1, USAGE)
+    
+    def unavailable():
+        raise ConnectionError("数据库不可用")
+    
+    monkeypatch.setattr(telemetry, "AsyncSessionLocal", unavailable)
+    assert await recorder.flush() == 0
+    monkeypatch.undo()
+    
+    recorder.record_call("poetry", 0.1, USAGE)
+    assert await recorder.flush() == 1
+    assert (await usage_rows())[(date.today(), "poetry")]["calls"] == 2